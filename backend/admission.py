@@ -0,0 +1,321 @@
+import asyncio
+import contextlib
+import contextvars
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from instrumentation import ADMISSIONS, model_label
+from model_registry import get_model_registry
+
+
+class Overloaded(Exception):
+    """A request shed by admission control; maps to 429 with Retry-After"""
+
+    def __init__(self, model_id: str, reason: str, retry_after: float,
+                 queue_position: Optional[int] = None, estimated_wait: Optional[float] = None):
+        messages = {
+            "queue_full": f"{model_id} is at capacity; its queue is full",
+            "deadline": f"{model_id} is overloaded; the estimated wait exceeds the request deadline"
+        }
+        super().__init__(messages.get(reason, f"{model_id} is overloaded"))
+        self.model_id = model_id
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.queue_position = queue_position
+        self.estimated_wait = estimated_wait
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": str(self),
+            "reason": self.reason,
+            "model_id": self.model_id,
+            "retry_after": self.retry_after,
+            "queue_position": self.queue_position,
+            "estimated_wait": round(self.estimated_wait, 2) if self.estimated_wait is not None else None
+        }
+
+
+class Client:
+    """Who a request is for: its fair-share weight and the deadline its model calls must meet"""
+
+    def __init__(self, client_id: str, weight: float = 1.0, deadline: Optional[float] = None):
+        self.client_id = client_id
+        self.weight = weight
+        # Absolute time.monotonic() deadline; None for background work that waits as long as it takes
+        self.deadline_at = time.monotonic() + deadline if deadline is not None else None
+
+    def remaining(self) -> Optional[float]:
+        return self.deadline_at - time.monotonic() if self.deadline_at is not None else None
+
+
+# Set around each request's coroutine (like the trace) so nested model calls inherit it
+current_client = contextvars.ContextVar("current_client", default=None)
+
+BACKGROUND_CLIENT = Client("background")
+
+
+async def run_as(coro, client: Optional[Client]):
+    """Await a coroutine on the shared loop on behalf of a client"""
+    current_client.set(client)
+    return await coro
+
+
+class Ticket:
+    def __init__(self, client: Client, start_tag: float, finish_tag: float, future: asyncio.Future):
+        self.client = client
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class ModelQueue:
+    """
+    Admission for one model: at most `concurrency` calls run, up to `max_queue`
+    more wait, and waiting calls are dispatched in weighted fair order.
+
+    Each client's calls get virtual finish tags spaced 1/weight apart, starting
+    from the later of the client's last tag and the queue's virtual time (the
+    start tag of the last dispatched call). Dispatching the smallest finish tag
+    first interleaves clients in proportion to their weights, so one client's
+    burst waits behind its own earlier calls instead of in front of everyone
+    else's. Only touched from the event loop.
+    """
+
+    def __init__(self, model_id: str, concurrency: int, max_queue: int, initial_service_time: float):
+        self.model_id = model_id
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.service_time = initial_service_time  # EWMA of admitted call durations
+        self.active = 0
+        self._heap = []
+        self._sequence = itertools.count()
+        self._finish_tags = {}
+        self._virtual_time = 0.0
+        self.stats = {"admitted": 0, "queued": 0, "shed_queue_full": 0, "shed_deadline": 0, "expired": 0}
+
+    @property
+    def queued(self) -> int:
+        return len(self._heap)
+
+    def estimate_wait(self, position: int) -> float:
+        """Seconds until the call at this 1-based queue position starts"""
+        if position <= 0:
+            return 0.0
+        return math.ceil(position / self.concurrency) * self.service_time
+
+    def _position(self, entry) -> int:
+        return 1 + sum(1 for other in self._heap if other[:2] < entry[:2])
+
+    def _shed(self, reason: str, retry_after: float, position=None, estimated_wait=None) -> Overloaded:
+        self.stats[f"shed_{reason}"] += 1
+        ADMISSIONS.labels(model_label(self.model_id), f"shed_{reason}").inc()
+        return Overloaded(self.model_id, reason, retry_after, position, estimated_wait)
+
+    def check(self, client: Client):
+        """Raise Overloaded if a new call for this client would be shed"""
+        if self.active < self.concurrency and not self._heap:
+            return
+        remaining = client.remaining()
+        if remaining is None:
+            return
+        if len(self._heap) >= self.max_queue:
+            raise self._shed("queue_full", self.estimate_wait(1), len(self._heap) + 1)
+        position = len(self._heap) + 1
+        estimated_wait = self.estimate_wait(position)
+        if estimated_wait + self.service_time > remaining:
+            raise self._shed("deadline", estimated_wait + self.service_time - remaining, position, estimated_wait)
+
+    async def acquire(self, client: Client,
+                      on_queued: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Wait for a slot; returns the queue position and wait time this call saw"""
+        # Picks up a concurrency limit raised by a registry reload
+        self.dispatch()
+        if self.active < self.concurrency and not self._heap:
+            self.active += 1
+            self.stats["admitted"] += 1
+            ADMISSIONS.labels(model_label(self.model_id), "admitted").inc()
+            return {"queue_position": 0, "queue_wait": 0.0}
+
+        self.check(client)
+        start_tag = max(self._virtual_time, self._finish_tags.get(client.client_id, 0.0))
+        finish_tag = start_tag + 1.0 / client.weight
+        self._finish_tags[client.client_id] = finish_tag
+        ticket = Ticket(client, start_tag, finish_tag, asyncio.get_running_loop().create_future())
+        entry = (finish_tag, next(self._sequence), ticket)
+        heapq.heappush(self._heap, entry)
+        position = self._position(entry)
+        estimated_wait = self.estimate_wait(position)
+        self.stats["queued"] += 1
+        ADMISSIONS.labels(model_label(self.model_id), "queued").inc()
+        if on_queued is not None:
+            on_queued({
+                "model_id": self.model_id, "queue_position": position, "estimated_wait": round(estimated_wait, 2)
+            })
+
+        remaining = client.remaining()
+        try:
+            await asyncio.wait_for(asyncio.shield(ticket.future), timeout=remaining)
+        except asyncio.TimeoutError:
+            if not (ticket.future.done() and not ticket.future.cancelled()):
+                self._remove(ticket)
+                self.stats["expired"] += 1
+                raise self._shed("deadline", self.estimate_wait(self.queued), position, estimated_wait)
+            # Granted just as the deadline passed; the slot is already ours
+        except BaseException:
+            # Cancelled while waiting: give up the place, or the slot if it was just granted
+            if ticket.future.done() and not ticket.future.cancelled():
+                self.release()
+            else:
+                self._remove(ticket)
+            raise
+        self.stats["admitted"] += 1
+        ADMISSIONS.labels(model_label(self.model_id), "admitted").inc()
+        return {"queue_position": position, "queue_wait": round(time.monotonic() - ticket.enqueued_at, 3)}
+
+    def _remove(self, ticket: Ticket):
+        ticket.future.cancel()
+        self._heap = [entry for entry in self._heap if entry[2] is not ticket]
+        heapq.heapify(self._heap)
+
+    def release(self, service_time: Optional[float] = None):
+        """Free a slot and hand it to the next waiting call in fair order"""
+        if service_time is not None:
+            self.service_time = 0.8 * self.service_time + 0.2 * service_time
+        self.active -= 1
+        self.dispatch()
+
+    def dispatch(self):
+        while self.active < self.concurrency and self._heap:
+            _, _, ticket = heapq.heappop(self._heap)
+            if ticket.future.done():
+                continue
+            self._virtual_time = ticket.start_tag
+            if self._finish_tags.get(ticket.client.client_id, 0.0) <= self._virtual_time:
+                # The client has nothing left queued ahead of the virtual clock
+                self._finish_tags.pop(ticket.client.client_id, None)
+            self.active += 1
+            ticket.future.set_result(None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(
+            self.stats,
+            concurrency=self.concurrency,
+            max_queue=self.max_queue,
+            active=self.active,
+            waiting=self.queued,
+            service_time=round(self.service_time, 3),
+            estimated_wait=round(self.estimate_wait(self.queued + 1) if self.active >= self.concurrency else 0.0, 2)
+        )
+
+
+class AdmissionController:
+    """
+    Per-model bounded queues with weighted fair scheduling across clients.
+
+    Model calls on a cache miss pass through admit(). Interactive requests
+    carry a deadline: a call whose estimated queue wait plus service time
+    would exceed it is shed up front (check(), before any work starts) or
+    when it gets there, and surfaces as a 429 with Retry-After. Calls
+    without a client context (batch runs, the CLI) are never shed on
+    deadline and are not bounded by max_queue; they still queue fairly.
+    """
+
+    def __init__(self, enabled: bool = True, max_concurrency: int = 8, max_queue: int = 32,
+                 deadline: float = 30.0, initial_service_time: float = 2.0,
+                 weights: Optional[Dict[str, float]] = None):
+        self.enabled = enabled
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.initial_service_time = initial_service_time
+        self.weights = weights or {}
+        self._queues = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """Build the controller from ADMISSION_* environment variables"""
+        weights = {}
+        for entry in os.getenv("ADMISSION_CLIENT_WEIGHTS", "").split(","):
+            client_id, _, weight = entry.partition("=")
+            if client_id.strip() and weight.strip():
+                weights[client_id.strip()] = float(weight)
+        return cls(
+            enabled=os.getenv("ADMISSION_CONTROL", "1") == "1",
+            max_concurrency=int(os.getenv("ADMISSION_MAX_CONCURRENCY", "8")),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+            deadline=float(os.getenv("ADMISSION_DEADLINE_SECONDS", "30")),
+            initial_service_time=float(os.getenv("ADMISSION_INITIAL_SERVICE_SECONDS", "2")),
+            weights=weights
+        )
+
+    def client(self, client_id: str, deadline: Optional[float] = None, background: bool = False) -> Client:
+        """
+        A client context for a request. The weight comes from ADMISSION_CLIENT_WEIGHTS
+        (default 1); background clients have no deadline and are never shed.
+        """
+        weight = self.weights.get(client_id, 1.0)
+        if background:
+            return Client(client_id, weight)
+        return Client(client_id, weight, self.deadline if deadline is None else deadline)
+
+    def queue_for(self, model_id: str) -> ModelQueue:
+        """The model's queue, with limits from its registry entry (max_concurrency, max_queue)"""
+        spec = get_model_registry().find(model_id)
+        concurrency = (spec.max_concurrency if spec else None) or self.max_concurrency
+        max_queue = (spec.max_queue if spec else None) or self.max_queue
+        with self._lock:
+            queue = self._queues.get(model_id)
+            if queue is None:
+                queue = self._queues[model_id] = ModelQueue(model_id, concurrency, max_queue, self.initial_service_time)
+        # A registry change applies to the next admission
+        queue.concurrency, queue.max_queue = concurrency, max_queue
+        return queue
+
+    async def check(self, model_ids: List[str], client: Client):
+        """
+        Shed a request before starting it if any of its models can't meet the
+        deadline. A coroutine so request threads run it on the loop (runtime.run),
+        which owns the queues.
+        """
+        if not self.enabled:
+            return
+        for model_id in model_ids:
+            # Unknown ids fail later with their own error; don't create queues for them
+            if get_model_registry().find(model_id) is not None:
+                self.queue_for(model_id).check(client)
+
+    @contextlib.asynccontextmanager
+    async def admit(self, model_id: str, on_queued: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """Hold an admission slot for one model call; yields the queue position and wait"""
+        if not self.enabled:
+            yield {"queue_position": 0, "queue_wait": 0.0}
+            return
+        queue = self.queue_for(model_id)
+        admission = await queue.acquire(current_client.get() or BACKGROUND_CLIENT, on_queued)
+        start = time.monotonic()
+        try:
+            yield admission
+        except BaseException:
+            queue.release()
+            raise
+        queue.release(time.monotonic() - start)
+
+    async def get_stats_async(self) -> Dict[str, Any]:
+        """get_stats() read on the loop, so counters and depths are from one consistent moment"""
+        return self.get_stats()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queues = dict(self._queues)
+        return {
+            "enabled": self.enabled,
+            "deadline": self.deadline,
+            "models": {model_id: queue.get_stats() for model_id, queue in queues.items()}
+        }
@@ -1,87 +1,142 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import os
-from dotenv import load_dotenv
-import asyncio
-import concurrent.futures
-from threading import Thread
-import time
+from startup import startup_report
+
+with startup_report.phase("import:web"):
+    from flask import Flask, Response, request, jsonify
+    from flask_cors import CORS
+    import os
+    import json
+    import queue
+    from dotenv import load_dotenv
+    import time
 
 # Load environment variables
 load_dotenv()
 
-# Import model handlers
-from models.openai_model import OpenAIModel
-from models.gemini_model import GeminiModel
-from models.huggingface_models import HuggingFaceModels
-from sample_texts import get_sample_texts, get_sample_by_id
+# Model SDKs (torch, transformers, openai, google-generativeai) are not imported
+# here; the provider registry loads each family on first use
+with startup_report.phase("import:app"):
+    from sample_texts import get_sample_texts, get_sample_listing, get_sample_by_id
+    from http_cache import PayloadCache, ResponseCompressor
+    from batch_runner import load_texts, run_batch_async
+    from models.decoding import PROFILES
+    from model_registry import get_model_registry
+    from preprocessing import get_preprocessor, prepare
+    from instrumentation import REQUESTS, Trace, current_trace, render_metrics, run_traced, stage
+    from admission import Overloaded, current_client, run_as
+    from serving import serving_state
+    from battle import (
+        runtime, providers, summary_cache, coalescer, battle_history, quality_scorer, admission,
+        get_cache_key, validate_text, summarize_battle_async, stream_battle_async, record_battle, evaluate_battle
+    )
 
 app = Flask(__name__)
 CORS(app)
+# Requests count as in flight until their response is closed, so shutdown can drain them
+app.wsgi_app = serving_state.track(app.wsgi_app)
 
-# Initialize model handlers
-openai_model = OpenAIModel()
-gemini_model = GeminiModel()
-hf_models = HuggingFaceModels()
-
-def get_model_handler(model_id):
-    """Get the appropriate model handler based on model ID"""
-    if model_id.startswith("gpt"):
-        return openai_model
-    elif model_id.startswith("gemini"):
-        return gemini_model
-    elif model_id.startswith("facebook/") or model_id.startswith("google/"):
-        return hf_models
-    else:
-        raise ValueError(f"Unknown model: {model_id}")
+model_registry = get_model_registry()
 
-def summarize_with_model(text, model_id):
-    """Helper function to summarize text with a specific model"""
-    try:
-        handler = get_model_handler(model_id)
-        return handler.summarize(text, model_id)
-    except Exception as e:
-        return {
-            "summary": f"Error: {str(e)}",
-            "model_name": model_id,
-            "processing_time": 0,
-            "success": False,
-            "error": str(e)
-        }
+# Static payloads are serialized and compressed once, with ETags; results are compressed per response
+payloads = PayloadCache()
+compressor = ResponseCompressor.from_env()
+SAMPLE_CACHE_CONTROL = f"public, max-age={int(os.getenv('SAMPLE_TEXTS_MAX_AGE', '3600'))}"
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "message": "LLM Battle API is running"})
+    hf_models = providers.peek("huggingface")
+    if not providers.is_ready():
+        return jsonify({
+            "status": "warming",
+            "message": "Prewarming models",
+            "providers": providers.get_stats(),
+            "prewarm": hf_models.get_model_stats()["prewarm"] if hf_models else None
+        }), 503
+    
+    runtime_stats = runtime.get_stats()
+    open_circuits = [
+        provider for provider, stats in runtime_stats["providers"].items()
+        if stats.get("breaker", {}).get("state") == "open"
+    ]
+    health = {
+        "status": "degraded" if open_circuits else "healthy",
+        "message": "LLM Battle API is running",
+        "runtime": runtime_stats,
+        "providers": providers.get_stats()
+    }
+    if open_circuits:
+        health["open_circuits"] = open_circuits
+    workers = hf_models.get_worker_stats() if hf_models else None
+    if workers:
+        health["hf_workers"] = {key: workers[key] for key in ("num_workers", "alive", "ready", "outstanding")}
+    return jsonify(health)
+
+@app.route('/api/live', methods=['GET'])
+def liveness():
+    """Liveness probe: the process can still serve (its event loop is running)"""
+    if not runtime.is_alive():
+        return jsonify({"status": "dead", "message": "Event loop stopped"}), 500
+    return jsonify({"status": "alive", "pid": os.getpid()})
+
+@app.route('/api/ready', methods=['GET'])
+def readiness():
+    """Readiness probe: 503 while models warm up or the process drains for shutdown"""
+    if serving_state.draining:
+        status = "draining"
+    elif not providers.is_ready():
+        status = "warming"
+    else:
+        status = "ready"
+    body = {"status": status, "serving": serving_state.get_stats(), "providers": providers.get_stats()}
+    return jsonify(body), 200 if status == "ready" else 503
+
+@app.route('/api/startup', methods=['GET'])
+def get_startup_report():
+    """Time spent in each import and initialization phase, and which providers are loaded"""
+    return jsonify(dict(startup_report.get_report(), providers=providers.get_stats()))
 
 @app.route('/api/models', methods=['GET'])
 def get_available_models():
-    """Get all available models organized by type"""
+    """Get all available models organized by type, from the model registry"""
     try:
-        models = {
-            "closed_source": [],
-            "open_source": []
-        }
-        
-        # Add OpenAI models
-        models["closed_source"].extend(openai_model.get_available_models())
-        
-        # Add Gemini models
-        models["closed_source"].extend(gemini_model.get_available_models())
-        
-        # Add HuggingFace models
-        models["open_source"].extend(hf_models.get_available_models())
-        
-        return jsonify(models)
+        # Rebuilt when a registry reload produces a new listing; clients revalidate with If-None-Match
+        return payloads.get("models", model_registry.get_listing()).respond(request)
     
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/models/registry', methods=['GET'])
+def get_model_registry_entries():
+    """Every registered model with its adapter and per-model settings"""
+    try:
+        return jsonify({
+            "models": [spec.to_dict() for spec in model_registry.list_models()],
+            "registry": model_registry.get_stats()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/models/reload', methods=['POST'])
+def reload_model_registry():
+    """Reload the model registry file now instead of waiting for the change check"""
+    try:
+        reloaded = model_registry.load()
+        stats = model_registry.get_stats()
+        if not reloaded:
+            return jsonify(dict(stats, error=f"Registry not reloaded: {stats['last_error']}")), 400
+        return jsonify(dict(stats, message="Model registry reloaded"))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/sample-texts', methods=['GET'])
 def get_sample_texts_endpoint():
-    """Get all sample texts"""
+    """Get all sample texts (?view=list for metadata only)"""
     try:
-        return jsonify(get_sample_texts())
+        if request.args.get('view') == 'list':
+            name, samples = "sample-listing", get_sample_listing()
+        else:
+            name, samples = "sample-texts", get_sample_texts()
+        return payloads.get(name, samples, cache_control=SAMPLE_CACHE_CONTROL).respond(request)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -91,74 +146,422 @@ def get_sample_text_by_id(text_id):
     try:
         sample = get_sample_by_id(text_id)
         if sample:
-            return jsonify(sample)
+            return payloads.get(f"sample-{text_id}", sample, cache_control=SAMPLE_CACHE_CONTROL).respond(request)
         else:
             return jsonify({"error": "Sample text not found"}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def request_client(data, background=False):
+    """The admission-control client for this request: X-Client-Id (else the remote address) and its deadline"""
+    client_id = request.headers.get('X-Client-Id') or request.remote_addr or "-"
+    if background:
+        return admission.client(f"batch:{client_id}", background=True)
+    deadline = (data or {}).get('deadline')
+    if deadline is not None:
+        deadline = float(deadline)
+        if deadline <= 0:
+            raise ValueError("deadline must be a positive number of seconds")
+    return admission.client(client_id, deadline)
+
+def overloaded_response(error):
+    """429 with Retry-After for a request shed by admission control"""
+    response = jsonify(error.to_dict())
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 429
+
+def parse_battle_request(data, allow_long_document=True):
+    """Validate a battle request; returns (text, model1_id, model2_id, error)"""
+    if data is not None and not isinstance(data, dict):
+        return None, None, None, "Expected a JSON object"
+    
+    # Validate required fields
+    if not data or 'text' not in data or 'model1' not in data or 'model2' not in data:
+        return None, None, None, "Missing required fields: text, model1, model2"
+    
+    if not all(isinstance(data[field], str) for field in ('text', 'model1', 'model2')):
+        return None, None, None, "text, model1 and model2 must be strings"
+    
+    text = data['text'].strip()
+    model1_id = data['model1']
+    model2_id = data['model2']
+    
+    for model_id in (model1_id, model2_id):
+        if model_registry.find(model_id) is None:
+            return None, None, None, f"Unknown model: {model_id}"
+    
+    error = validate_text(text, long_document=allow_long_document and bool(data.get('long_document')))
+    if error:
+        return None, None, None, error
+    
+    return text, model1_id, model2_id, None
+
+def parse_batch_request(data):
+    """Check the shape of a batch request's list fields; returns an error message or None"""
+    if not isinstance(data, dict):
+        return "Expected a JSON object"
+    
+    for field in ('texts', 'sample_ids', 'models', 'completed'):
+        if data.get(field) is not None and not isinstance(data[field], list):
+            return f"{field} must be a list"
+    
+    if not all(isinstance(model_id, str) for model_id in data.get('models') or []):
+        return "models must be a list of model ids"
+    
+    for pair in data.get('completed') or []:
+        if not isinstance(pair, dict) or not isinstance(pair.get('text_hash'), str) \
+                or not isinstance(pair.get('model_id'), str):
+            return "Each completed entry needs a text_hash and a model_id string"
+    
+    return None
+
 @app.route('/api/summarize', methods=['POST'])
 def summarize_text():
     """Main endpoint to summarize text with two models"""
+    trace = Trace()
+    trace_token = current_trace.set(trace)
+    
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        if not data or 'text' not in data or 'model1' not in data or 'model2' not in data:
-            return jsonify({
-                "error": "Missing required fields: text, model1, model2"
-            }), 400
+        with stage("request_parse"):
+            data = request.get_json()
+            text, model1_id, model2_id, error = parse_battle_request(data)
+            options = data if isinstance(data, dict) else {}
+            debug = bool(options.get('debug')) or request.args.get('debug') == '1'
+            profile = options.get('profile')
+            if not error and profile and profile not in PROFILES:
+                error = f"Unknown profile '{profile}'. Choose one of: {', '.join(PROFILES)}"
+            if not error:
+                try:
+                    client = request_client(data)
+                except (TypeError, ValueError) as e:
+                    error = f"Invalid deadline: {str(e)}"
+        if error:
+            REQUESTS.labels("summarize", "invalid").inc()
+            return jsonify({"error": error}), 400
         
-        text = data['text'].strip()
-        model1_id = data['model1']
-        model2_id = data['model2']
+        # Shed up front when either model's queue can't meet the deadline
+        runtime.run(admission.check([model1_id, model2_id], client))
         
-        # Validate text length
-        if len(text) < 50:
-            return jsonify({
-                "error": "Text is too short. Please provide at least 50 characters."
-            }), 400
+        # Tokenize the source for quality scoring while the models run
+        source = quality_scorer.prepare(text)
         
-        if len(text) > 10000:
-            return jsonify({
-                "error": "Text is too long. Please limit to 10,000 characters."
-            }), 400
-        
-        # Use ThreadPoolExecutor to run both models in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
-            # Submit both summarization tasks
-            future1 = executor.submit(summarize_with_model, text, model1_id)
-            future2 = executor.submit(summarize_with_model, text, model2_id)
-            
-            # Get results
-            result1 = future1.result()
-            result2 = future2.result()
+        # Run both models concurrently on the shared event loop
+        result1, result2 = runtime.run(run_traced(run_as(summarize_battle_async(
+            text, [model1_id, model2_id], long_document=bool(data.get('long_document')), profile=profile
+        ), client), trace))
         
         # Prepare response
         response = {
             "model1": result1,
             "model2": result2,
             "text_length": len(text),
-            "word_count": len(text.split()),
+            "word_count": prepare(text).word_count,
             "timestamp": int(time.time())
         }
         
-        return jsonify(response)
+        # Persisted by a background writer; the id is what votes refer to
+        battle_id = record_battle(
+            text, [model1_id, model2_id], [result1, result2], profile=profile,
+            mode="long_document" if data.get('long_document') else "summarize"
+        )
+        if battle_id:
+            response["battle_id"] = battle_id
+        
+        # Scored in the background; fetch from /api/evaluations/<evaluation_id>
+        evaluation_id = evaluate_battle(text, [model1_id, model2_id], [result1, result2], source)
+        if evaluation_id:
+            response["evaluation_id"] = evaluation_id
+        
+        with stage("serialization"):
+            body = json.dumps(response)
+        if debug:
+            response["trace"] = trace.to_dict()
+            body = json.dumps(response)
+        
+        REQUESTS.labels("summarize", "success").inc()
+        with stage("compression"):
+            return compressor.respond(request, body)
     
+    except Overloaded as e:
+        REQUESTS.labels("summarize", "shed").inc()
+        return overloaded_response(e)
     except Exception as e:
+        REQUESTS.labels("summarize", "error").inc()
         return jsonify({
             "error": f"Summarization failed: {str(e)}"
         }), 500
+    finally:
+        current_trace.reset(trace_token)
+
+def stream_from_runtime(start):
+    """
+    Bridge events from a coroutine on the shared loop to a (sync) Flask response.
+    start(events) must return a coroutine that puts items on events and ends with (None, None).
+    """
+    events = queue.Queue()
+    future = runtime.submit(start(events))
+    try:
+        while True:
+            event, payload = events.get()
+            if event is None:
+                break
+            yield event, payload
+    finally:
+        # Stop work if the client disconnects
+        future.cancel()
+
+def format_sse(event, data):
+    """Format one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.route('/api/summarize/stream', methods=['GET', 'POST'])
+def summarize_text_stream():
+    """Stream tokens from both models over Server-Sent Events"""
+    data = request.get_json(silent=True) if request.method == 'POST' else request.args.to_dict()
+    
+    text, model1_id, model2_id, error = parse_battle_request(data, allow_long_document=False)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    try:
+        client = request_client(data)
+        runtime.run(admission.check([model1_id, model2_id], client))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid deadline: {str(e)}"}), 400
+    except Overloaded as e:
+        return overloaded_response(e)
+    
+    def generate():
+        for event, payload in stream_from_runtime(
+            lambda events: run_as(stream_battle_async(text, model1_id, model2_id, events), client)
+        ):
+            yield format_sse(event, payload)
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.route('/api/battle/batch', methods=['POST'])
+def battle_batch():
+    """Summarize many texts with many models, streaming one JSON line per pair"""
+    data = request.get_json(silent=True) or {}
+    error = parse_batch_request(data)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    model_ids = data.get('models') or []
+    completed_pairs = data.get('completed') or []
+    
+    try:
+        items = load_texts(data.get('texts'), data.get('sample_ids'))
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid texts: {str(e)}"}), 400
+    
+    if not items or not model_ids:
+        return jsonify({"error": "Provide at least one of texts/sample_ids and a non-empty models list"}), 400
+    
+    profile = data.get('profile')
+    if profile and profile not in PROFILES:
+        return jsonify({"error": f"Unknown profile '{profile}'. Choose one of: {', '.join(PROFILES)}"}), 400
+    
+    # Pairs finished by an earlier (interrupted) run are skipped
+    completed = {(pair['text_hash'], pair['model_id']) for pair in completed_pairs}
+    
+    # Batch pairs queue fairly behind interactive requests but are never shed
+    client = request_client(data, background=True)
+    
+    async def run(events):
+        current_client.set(client)
+        try:
+            stats = await run_batch_async(
+                items, model_ids, lambda record: events.put(("result", record)), completed,
+                long_document=bool(data.get('long_document')), profile=profile
+            )
+            events.put(("summary", dict(stats, type="summary")))
+        except Exception as e:
+            events.put(("error", {"type": "error", "error": str(e)}))
+        finally:
+            events.put((None, None))
+    
+    def generate():
+        for _, payload in stream_from_runtime(run):
+            yield json.dumps(payload) + "\n"
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics"""
+    payload, content_type = render_metrics()
+    return Response(payload, mimetype=content_type)
 
 @app.route('/api/clear-cache', methods=['POST'])
 def clear_model_cache():
     """Clear HuggingFace model cache to free memory"""
     try:
-        hf_models.clear_model_cache()
+        hf_models = providers.peek("huggingface")
+        if hf_models:
+            hf_models.clear_model_cache()
         return jsonify({"message": "Model cache cleared successfully"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/models/loaded', methods=['GET'])
+def get_loaded_models():
+    """Get resident HuggingFace models and memory budget usage"""
+    try:
+        hf_models = providers.peek("huggingface")
+        if hf_models is None:
+            return jsonify({"models": [], "provider": "deferred", "message": "HuggingFace models load on first use"})
+        return jsonify(hf_models.get_model_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/batching', methods=['GET'])
+def get_batching_stats():
+    """Get HuggingFace micro-batching queue metrics"""
+    try:
+        hf_models = providers.peek("huggingface")
+        return jsonify(hf_models.get_batching_stats() if hf_models else {})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/workers', methods=['GET'])
+def get_worker_stats():
+    """Get HuggingFace worker process health and utilization"""
+    try:
+        hf_models = providers.peek("huggingface")
+        workers = hf_models.get_worker_stats() if hf_models else None
+        if workers is None:
+            return jsonify({"enabled": False, "message": "HF inference runs in-process (HF_WORKERS=0)"})
+        return jsonify(dict(workers, enabled=True))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    """Per-model admission queues: running and waiting calls, shed counts and the estimated wait for a new call"""
+    try:
+        return jsonify(runtime.run(admission.get_stats_async()))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/cache', methods=['GET'])
+def get_summary_cache_stats():
+    """Inspect the summary cache"""
+    try:
+        return jsonify(summary_cache.get_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/preprocessing', methods=['GET'])
+def get_preprocessing_stats():
+    """Inspect the shared text/token preprocessing cache"""
+    try:
+        return jsonify(get_preprocessor().get_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/coalescing', methods=['GET'])
+def get_coalescing_stats():
+    """Get counts of requests that shared an identical in-flight summary"""
+    try:
+        return jsonify(coalescer.get_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/history', methods=['GET'])
+def get_battle_history():
+    """Paginated battle history, newest first, filterable by model, text hash and time"""
+    try:
+        args = request.args
+        limit = min(max(int(args.get('limit', 20)), 1), 200)
+        history = battle_history.get_history(
+            limit=limit,
+            before=int(args['before']) if args.get('before') else None,
+            model_id=args.get('model_id'),
+            text_hash=args.get('text_hash'),
+            since=float(args['since']) if args.get('since') else None,
+            until=float(args['until']) if args.get('until') else None,
+            include_summaries=args.get('summaries') == '1'
+        )
+        return jsonify(history)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/leaderboard', methods=['GET'])
+def get_leaderboard():
+    """Per-model latency percentiles, success rates and vote tallies"""
+    try:
+        return jsonify({
+            "models": battle_history.get_leaderboard(),
+            "history": battle_history.get_stats()
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/battles/<battle_id>/vote', methods=['POST'])
+def vote_battle(battle_id):
+    """Record which summary won a battle ("model1", "model2" or "tie")"""
+    data = request.get_json(silent=True) or {}
+    try:
+        if not battle_history.enabled:
+            return jsonify({"error": "Battle history is disabled"}), 503
+        if not battle_history.vote(battle_id, data.get('winner'), data.get('ratings')):
+            return jsonify({"error": "Battle not found"}), 404
+        return jsonify({"message": "Vote recorded", "battle_id": battle_id, "winner": data.get('winner')})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/evaluations', methods=['GET'])
+def get_evaluation_stats():
+    """Quality scoring counters and average scoring time"""
+    try:
+        return jsonify(quality_scorer.get_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/evaluations/<evaluation_id>', methods=['GET'])
+def get_evaluation(evaluation_id):
+    """Quality scores of a battle; ?wait=N waits up to N seconds for pending scores"""
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), 10)
+        evaluation = quality_scorer.get(evaluation_id, timeout=wait)
+        if evaluation is None:
+            return jsonify({"error": "Evaluation not found"}), 404
+        return jsonify(evaluation), 202 if evaluation["status"] == "pending" else 200
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query parameter: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def invalidate_summary_cache():
+    """Invalidate cached summaries for a text/model pair, a model, or everything"""
+    try:
+        data = request.get_json(silent=True) or {}
+        text = data.get('text')
+        model_id = data.get('model_id')
+        
+        if text and not model_id:
+            return jsonify({"error": "model_id is required when text is given"}), 400
+        
+        if text:
+            removed = summary_cache.invalidate(key=get_cache_key(text.strip(), model_id))
+        else:
+            removed = summary_cache.invalidate(model_id=model_id)
+        
+        return jsonify({"message": "Summary cache invalidated", "removed": removed})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -167,6 +570,9 @@ def not_found(error):
 def internal_error(error):
     return jsonify({"error": "Internal server error"}), 500
 
+# Anything recorded in the startup report after this point ran lazily
+startup_report.mark_ready()
+
 if __name__ == '__main__':
     # Check environment variables
     if not os.getenv('OPENAI_API_KEY'):
@@ -178,10 +584,32 @@ if __name__ == '__main__':
     print("🚀 Starting LLM Battle API...")
     print("📚 Available endpoints:")
     print("   GET  /api/health - Health check")
+    print("   GET  /api/live - Liveness probe")
+    print("   GET  /api/ready - Readiness probe (waits on model warmup)")
+    print("   GET  /api/startup - Startup time by phase")
     print("   GET  /api/models - Get available models")
-    print("   GET  /api/sample-texts - Get sample texts")
+    print("   GET  /api/models/registry - Registered models and their settings")
+    print("   POST /api/models/reload - Reload the model registry")
+    print("   GET  /api/sample-texts - Get sample texts (?view=list for metadata only)")
     print("   POST /api/summarize - Compare summaries")
+    print("   POST /api/summarize/stream - Stream summaries (SSE)")
+    print("   POST /api/battle/batch - Many texts x many models (JSONL)")
     print("   POST /api/clear-cache - Clear model cache")
+    print("   GET  /metrics - Prometheus metrics")
+    print("   GET  /api/models/loaded - Resident HF models")
+    print("   GET  /api/batching - HF batching metrics")
+    print("   GET  /api/workers - HF worker health and utilization")
+    print("   GET  /api/cache - Summary cache stats")
+    print("   POST /api/cache/invalidate - Invalidate cached summaries")
+    print("   GET  /api/preprocessing - Shared tokenization cache")
+    print("   GET  /api/coalescing - Deduplicated in-flight requests")
+    print("   GET  /api/admission - Admission queues and estimated waits")
+    print("   GET  /api/history - Paginated battle history")
+    print("   GET  /api/leaderboard - Model latency, success and vote leaderboard")
+    print("   POST /api/battles/<battle_id>/vote - Vote for a battle's winner")
+    print("   GET  /api/evaluations/<evaluation_id> - Quality scores of a battle")
     print()
+    startup_report.print_summary()
     
-    app.run(debug=True, host='0.0.0.0', port=5001) 
\ No newline at end of file
+    # Development server; production runs under gunicorn (gunicorn -c gunicorn.conf.py app:app)
+    app.run(debug=True, host='0.0.0.0', port=int(os.getenv('PORT', '5001'))) 
\ No newline at end of file
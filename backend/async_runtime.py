@@ -0,0 +1,220 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from instrumentation import record_stage, stage
+from model_registry import get_model_registry
+from provider_client import ProviderClient
+
+
+class AsyncRuntime:
+    """
+    Process-wide event loop that owns the async provider clients.
+
+    Flask views hand coroutines to the loop with run(); provider calls share
+    pooled connections and per-provider concurrency limits instead of each
+    request spawning its own threads. Blocking HuggingFace inference is
+    offloaded to one bounded executor.
+    """
+
+    def __init__(self, hf_max_workers: int = 2):
+        self.hf_max_workers = hf_max_workers
+        self._start()
+        self._limits = {}
+        self._clients = {}
+        self._limits_lock = threading.Lock()
+        # A server worker forked from a preloaded app (gunicorn.conf.py) gets its own loop
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="async-runtime", daemon=True)
+        self._thread.start()
+        self.hf_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.hf_max_workers,
+            thread_name_prefix="hf-inference"
+        )
+        self._sessions = {}
+
+    def _after_fork(self):
+        """
+        Threads don't survive fork: restart the loop and executor and open fresh
+        connection pools. Limits and clients are rebuilt too, since their
+        semaphores may be bound to the parent's loop and their breaker and
+        latency state describe the parent's calls.
+        """
+        self._limits_lock = threading.Lock()
+        self._limits = {}
+        self._clients = {}
+        self._start()
+
+    def is_alive(self) -> bool:
+        """Whether the loop thread is running (the liveness probe)"""
+        return self._thread.is_alive() and self.loop.is_running()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and block until it finishes"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def submit(self, coro) -> concurrent.futures.Future:
+        """Schedule a coroutine on the shared loop without waiting for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run_blocking(self, fn, *args):
+        """Await a blocking call on the bounded HuggingFace executor"""
+        return asyncio.get_running_loop().run_in_executor(self.hf_executor, fn, *args)
+
+    def get_limit(self, provider: str) -> "ProviderLimit":
+        """Get the concurrency limit and timeout configured for a provider"""
+        with self._limits_lock:
+            if provider not in self._limits:
+                prefix = provider.upper()
+                self._limits[provider] = ProviderLimit(
+                    provider,
+                    max_concurrency=int(os.getenv(f"{prefix}_MAX_CONCURRENCY", "16")),
+                    timeout=float(os.getenv(f"{prefix}_TIMEOUT", "60"))
+                )
+            return self._limits[provider]
+
+    def get_client(self, provider: str) -> ProviderClient:
+        """Get the retry/hedging/circuit-breaker policy for a provider's calls"""
+        limit = self.get_limit(provider)
+        with self._limits_lock:
+            if provider not in self._clients:
+                self._clients[provider] = ProviderClient.from_env(provider, limit)
+            return self._clients[provider]
+
+    def get_session(self, provider: str):
+        """Long-lived keep-alive HTTP connection pool for a provider (call on the loop)"""
+        import aiohttp
+
+        session = self._sessions.get(provider)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.get_limit(provider).max_concurrency,
+                keepalive_timeout=float(os.getenv(f"{provider.upper()}_KEEPALIVE", "60"))
+            )
+            session = self._sessions[provider] = aiohttp.ClientSession(connector=connector)
+        return session
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return per-provider in-flight counts, limits and resilience counters"""
+        with self._limits_lock:
+            limits = list(self._limits.values())
+            clients = dict(self._clients)
+        providers = {}
+        for limit in limits:
+            providers[limit.provider] = limit.get_stats()
+            if limit.provider in clients:
+                providers[limit.provider].update(clients[limit.provider].get_stats())
+        return {
+            "hf_max_workers": self.hf_max_workers,
+            "providers": providers
+        }
+
+
+class ProviderLimit:
+    """
+    Concurrency limit and per-call timeout for one provider, plus any tighter
+    per-model limits from the model registry
+    """
+
+    def __init__(self, provider: str, max_concurrency: int, timeout: float):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.timeouts = 0
+        self._model_semaphores = {}  # model_id -> (max_concurrency, semaphore)
+
+    def _model_semaphore(self, model_id: str) -> Optional[asyncio.Semaphore]:
+        spec = get_model_registry().find(model_id)
+        limit = spec.max_concurrency if spec else None
+        if not limit:
+            return None
+        current = self._model_semaphores.get(model_id)
+        if current is None or current[0] != limit:
+            # A changed limit applies to new calls; calls holding the old semaphore finish normally
+            current = (limit, asyncio.Semaphore(limit))
+            self._model_semaphores[model_id] = current
+        return current[1]
+
+    def timeout_for(self, model_id: str = "-") -> float:
+        """The model's own timeout from the registry, else the provider's"""
+        spec = get_model_registry().find(model_id)
+        return spec.timeout if spec and spec.timeout else self.timeout
+
+    @contextlib.asynccontextmanager
+    async def slot(self, model_id: str = "-"):
+        """Hold one of the provider's (and the model's) concurrency slots, e.g. for a whole stream"""
+        model_semaphore = self._model_semaphore(model_id)
+        self.waiting += 1
+        wait_start = time.perf_counter()
+        acquired_model = False
+        try:
+            if model_semaphore is not None:
+                await model_semaphore.acquire()
+                acquired_model = True
+            await self.semaphore.acquire()
+        except BaseException:
+            if acquired_model:
+                model_semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+        record_stage("queue_wait", time.perf_counter() - wait_start, model_id)
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+            if model_semaphore is not None:
+                model_semaphore.release()
+
+    async def wait(self, coro, model_id: str = "-", timeout: Optional[float] = None):
+        """Await a coroutine under the model's timeout (or a shorter one)"""
+        timeout = self.timeout_for(model_id) if timeout is None else timeout
+        try:
+            with stage("provider_network", model_id):
+                return await asyncio.wait_for(coro, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise TimeoutError(f"{self.provider} call timed out after {timeout:.1f}s")
+
+    async def call(self, coro, model_id: str = "-", timeout: Optional[float] = None):
+        """Await a provider coroutine under the concurrency limit and timeout"""
+        async with self.slot(model_id):
+            return await self.wait(coro, model_id, timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "timeout": self.timeout,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts
+        }
+
+
+_runtime = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> AsyncRuntime:
+    """Return the process-wide runtime, starting it on first use"""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AsyncRuntime(hf_max_workers=int(os.getenv("HF_MAX_WORKERS", "2")))
+        return _runtime
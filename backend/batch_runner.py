@@ -0,0 +1,170 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables before the model handlers are created
+load_dotenv()
+
+from battle import runtime, summarize_with_model_async, validate_text
+from models.decoding import PROFILES
+from sample_texts import get_sample_texts, get_sample_by_id
+from summary_cache import text_hash
+
+
+def load_texts(texts: Optional[Iterable[Any]] = None, sample_ids: Optional[Iterable[Any]] = None,
+               jsonl_path: Optional[str] = None) -> List[Dict[str, str]]:
+    """
+    Collect battle inputs as {"text_id", "text"} dicts.
+
+    texts may hold plain strings or {"id", "text"} objects; sample_ids may contain
+    "all"; JSONL lines need a "text" field and may carry an "id".
+    """
+    items = []
+
+    for index, entry in enumerate(texts or []):
+        if isinstance(entry, dict):
+            items.append({"text_id": str(entry.get("id", f"inline-{index}")), "text": entry["text"]})
+        else:
+            items.append({"text_id": f"inline-{index}", "text": entry})
+
+    for sample_id in sample_ids or []:
+        if str(sample_id) == "all":
+            samples = get_sample_texts()
+        else:
+            sample = get_sample_by_id(int(sample_id))
+            if not sample:
+                raise ValueError(f"Unknown sample text id: {sample_id}")
+            samples = [sample]
+        for sample in samples:
+            items.append({"text_id": f"sample-{sample['id']}", "text": sample["text"]})
+
+    if jsonl_path:
+        with open(jsonl_path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                items.append({
+                    "text_id": str(record.get("id", f"{os.path.basename(jsonl_path)}:{line_number}")),
+                    "text": record["text"]
+                })
+
+    for item in items:
+        if not isinstance(item["text"], str):
+            raise ValueError(f"Text {item['text_id']} must be a string")
+        item["text"] = item["text"].strip()
+    return items
+
+
+def load_completed(output_path: str) -> Set[Tuple[str, str]]:
+    """Return (text_hash, model_id) pairs that already succeeded in a previous run"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A crash can leave a partial last line
+                continue
+            if record.get("success"):
+                completed.add((record["text_hash"], record["model_id"]))
+    return completed
+
+
+async def run_batch_async(items: List[Dict[str, str]], model_ids: List[str], emit: Callable[[Dict[str, Any]], None],
+                          completed: Optional[Set[Tuple[str, str]]] = None, max_in_flight: int = 64,
+                          long_document: bool = False, profile: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Summarize every text with every model and emit one record per pair as it finishes.
+
+    Per-provider concurrency limits and HF micro-batching apply as for single
+    battles; max_in_flight caps how many pairs are scheduled at once.
+    """
+    completed = completed or set()
+    in_flight = asyncio.Semaphore(max_in_flight)
+    stats = {"scheduled": 0, "skipped": 0, "succeeded": 0, "failed": 0}
+    start_time = time.time()
+
+    async def run_pair(item, digest, model_id):
+        try:
+            result = await summarize_with_model_async(item["text"], model_id, long_document, profile)
+        finally:
+            in_flight.release()
+        stats["succeeded" if result.get("success") else "failed"] += 1
+        emit(dict(result, text_id=item["text_id"], text_hash=digest, model_id=model_id))
+
+    tasks = []
+    for item in items:
+        digest = text_hash(item["text"])
+        error = validate_text(item["text"], long_document)
+        for model_id in model_ids:
+            if (digest, model_id) in completed:
+                stats["skipped"] += 1
+                continue
+            if error:
+                stats["failed"] += 1
+                emit({"text_id": item["text_id"], "text_hash": digest, "model_id": model_id,
+                      "success": False, "error": error})
+                continue
+            await in_flight.acquire()
+            stats["scheduled"] += 1
+            tasks.append(asyncio.ensure_future(run_pair(item, digest, model_id)))
+
+    await asyncio.gather(*tasks)
+    stats["elapsed"] = round(time.time() - start_time, 2)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many texts x many models and write results as JSONL")
+    parser.add_argument("--text", action="append", default=[], help="Inline text to summarize (repeatable)")
+    parser.add_argument("--sample-ids", default="", help='Comma-separated sample text ids, or "all"')
+    parser.add_argument("--input", help="JSONL file with a \"text\" (and optional \"id\") per line")
+    parser.add_argument("--models", required=True, help="Comma-separated model ids")
+    parser.add_argument("--output", required=True, help="JSONL file to write results to")
+    parser.add_argument("--resume", action="store_true", help="Skip pairs already completed in --output and append")
+    parser.add_argument("--long-document", action="store_true", help="Map-reduce texts longer than a model's context")
+    parser.add_argument("--profile", choices=PROFILES, help="HF decoding profile (default: HF_DEFAULT_PROFILE)")
+    parser.add_argument("--max-in-flight", type=int, default=int(os.getenv("BATCH_MAX_IN_FLIGHT", "64")))
+    args = parser.parse_args(argv)
+
+    sample_ids = [s.strip() for s in args.sample_ids.split(",") if s.strip()]
+    model_ids = [m.strip() for m in args.models.split(",") if m.strip()]
+    items = load_texts(args.text, sample_ids, args.input)
+    if not items:
+        parser.error("No texts given; use --text, --sample-ids or --input")
+
+    completed = load_completed(args.output) if args.resume else set()
+    print(f"🚀 {len(items)} texts x {len(model_ids)} models ({len(completed)} pairs already done)", file=sys.stderr)
+
+    with open(args.output, "a" if args.resume else "w", encoding="utf-8") as out:
+        if out.tell() > 0:
+            # Terminate a partial line left behind by a crash
+            with open(args.output, "rb") as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b"\n":
+                    out.write("\n")
+
+        def emit(record):
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+            status = "✅" if record.get("success") else "❌"
+            print(f"{status} {record['text_id']} / {record['model_id']}", file=sys.stderr)
+
+        stats = runtime.run(run_batch_async(
+            items, model_ids, emit, completed, args.max_in_flight, args.long_document, args.profile
+        ))
+
+    print(f"🏁 Done: {json.dumps(stats)}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
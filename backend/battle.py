@@ -0,0 +1,283 @@
+import asyncio
+import os
+import time
+
+# Import model handlers
+from providers import ProviderRegistry, default_warm_families
+from summary_cache import SummaryCache, make_cache_key
+from preprocessing import prepare, token_usage
+from battle_history import BattleHistory
+from quality import QualityScorer
+from admission import AdmissionController, Overloaded
+from serving import serving_state
+from async_runtime import get_runtime
+from long_document import summarize_long_async
+from single_flight import SingleFlight
+from instrumentation import COALESCED_CALLS, model_label, record_model_call
+
+# Shared event loop for provider calls
+runtime = get_runtime()
+
+# Model handlers are created on first use; configured families load in the background
+providers = ProviderRegistry()
+if os.getenv("SERVER_PRELOAD") == "1":
+    # Preloaded by the production server: load and warm now, before it forks its workers,
+    # so they start ready and share the weights copy-on-write
+    providers.warm(default_warm_families(), background=False)
+    providers.wait_ready()
+else:
+    providers.warm(default_warm_families())
+
+# Content-addressed cache for summaries
+summary_cache = SummaryCache.from_env()
+
+# Every battle is persisted in the background for history and leaderboards
+battle_history = BattleHistory.from_env()
+# A server shutting down writes out the battles it finished
+serving_state.on_drain(battle_history.flush)
+
+# Summaries are scored against their source off the request path
+quality_scorer = QualityScorer.from_env()
+
+# Model calls queue per model and are scheduled fairly across clients
+admission = AdmissionController.from_env()
+
+# Identical requests in flight at the same time share one model call
+coalescer = SingleFlight(enabled=os.getenv("COALESCE_REQUESTS", "1") == "1")
+
+def get_model_handler(model_id):
+    """Get the appropriate model handler based on model ID"""
+    return providers.handler_for(model_id)
+
+async def get_model_handler_async(model_id):
+    """Get a model handler without blocking the event loop on a first-time load"""
+    handler = providers.peek_for(model_id)
+    if handler is not None:
+        return handler
+    return await asyncio.to_thread(providers.handler_for, model_id)
+
+def get_decoding_options(handler, profile=None):
+    """Keyword arguments selecting a decoding profile, for handlers that have them"""
+    if not hasattr(handler, "resolve_profile"):
+        return {}
+    return {"profile": handler.resolve_profile(profile)}
+
+def get_cache_key(text, model_id, stream=False, profile=None):
+    """Build the summary cache key for a text/model pair"""
+    handler = get_model_handler(model_id)
+    params = handler.get_generation_params(model_id, **get_decoding_options(handler, profile))
+    if stream and hasattr(handler, "get_stream_params"):
+        # Streaming may decode differently (e.g. greedy for HF)
+        params = handler.get_stream_params(model_id)
+    if hasattr(handler, "get_cache_params"):
+        params = dict(params, **handler.get_cache_params(model_id))
+    return make_cache_key(text, model_id, params)
+
+async def summarize_with_model_async(text, model_id, long_document=False, profile=None):
+    """Summarize text with a specific model on the shared event loop"""
+    start = time.perf_counter()
+    result = await _summarize_with_model_async(text, model_id, long_document, profile)
+    record_model_call(model_id, result, time.perf_counter() - start)
+    return result
+
+async def _summarize_with_model_async(text, model_id, long_document=False, profile=None):
+    try:
+        handler = await get_model_handler_async(model_id)
+        options = get_decoding_options(handler, profile)
+        if long_document:
+            # Chunks go back through this function, so they are cached individually
+            return await summarize_long_async(
+                text, model_id, handler,
+                lambda chunk, chunk_model_id: summarize_with_model_async(chunk, chunk_model_id, profile=profile)
+            )
+        
+        cache_key = get_cache_key(text, model_id, profile=profile)
+        
+        cached = await asyncio.to_thread(summary_cache.get, cache_key)
+        if cached:
+            cached["cached"] = True
+            return cached
+        
+        result, shared = await coalescer.do(
+            cache_key, lambda: _summarize_and_cache(handler, text, model_id, cache_key, options)
+        )
+        if shared:
+            COALESCED_CALLS.labels(model_label(model_id), "summarize").inc()
+        return dict(result, cached=False, coalesced=shared)
+    except Overloaded:
+        # Shed by admission control: the whole request gets a 429
+        raise
+    except Exception as e:
+        return {
+            "summary": f"Error: {str(e)}",
+            "model_name": model_id,
+            "processing_time": 0,
+            "success": False,
+            "error": str(e)
+        }
+
+async def _summarize_and_cache(handler, text, model_id, cache_key, options):
+    # Only calls that reach the model are admitted; cache hits and coalesced joiners skip the queue
+    async with admission.admit(model_id) as queue:
+        result = await handler.summarize_async(text, model_id, **options)
+    await asyncio.to_thread(summary_cache.set, cache_key, model_id, result)
+    return dict(result, queue=queue)
+
+async def _admitted_stream(handler, text, model_id, on_queued):
+    async with admission.admit(model_id, on_queued):
+        async for chunk in handler.stream_summary(text, model_id):
+            yield chunk
+
+async def summarize_battle_async(text, model_ids, long_document=False, profile=None):
+    """Run several models concurrently on the same text"""
+    return await asyncio.gather(*(
+        summarize_with_model_async(text, model_id, long_document, profile) for model_id in model_ids
+    ))
+
+def record_battle(text, model_ids, results, profile=None, mode="summarize"):
+    """Queue a finished battle for the history store; returns its battle_id (or None)"""
+    # Only registered models get history and leaderboard rows
+    if any(providers.models.find(model_id) is None for model_id in model_ids):
+        return None
+    try:
+        prepared = prepare(text)
+        return battle_history.record(
+            prepared.text_hash, prepared.char_count, prepared.word_count, model_ids, results,
+            profile=profile, mode=mode
+        )
+    except Exception as e:
+        print(f"⚠️  Failed to record battle: {e}")
+        return None
+
+def evaluate_battle(text, model_ids, results, source=None):
+    """Queue quality scoring of a finished battle; returns its evaluation_id (or None)"""
+    try:
+        return quality_scorer.submit(text, model_ids, results, source)
+    except Exception as e:
+        print(f"⚠️  Failed to queue quality scoring: {e}")
+        return None
+
+def summarize_with_model(text, model_id):
+    """Helper function to summarize text with a specific model"""
+    return runtime.run(summarize_with_model_async(text, model_id))
+
+MIN_TEXT_LENGTH = 50
+MAX_TEXT_LENGTH = 10000
+LONG_DOC_MAX_LENGTH = int(os.getenv("LONG_DOC_MAX_CHARS", "200000"))
+
+def validate_text(text, long_document=False):
+    """Return an error message if the text can't be summarized, else None"""
+    max_length = LONG_DOC_MAX_LENGTH if long_document else MAX_TEXT_LENGTH
+    
+    # Validate text length
+    if len(text) < MIN_TEXT_LENGTH:
+        return f"Text is too short. Please provide at least {MIN_TEXT_LENGTH} characters."
+    
+    if len(text) > max_length:
+        hint = "" if long_document else " or enable long_document mode"
+        return f"Text is too long. Please limit to {max_length:,} characters{hint}."
+    
+    return None
+
+async def stream_model_async(slot, text, model_id, events):
+    """Stream one contestant's summary into the event queue and return its final result"""
+    start_time = time.time()
+    first_token_time = None
+    chunks = []
+    
+    try:
+        handler = await get_model_handler_async(model_id)
+        cache_key = get_cache_key(text, model_id, stream=True)
+        
+        cached = await asyncio.to_thread(summary_cache.get, cache_key)
+        if cached:
+            first_token_time = time.time()
+            events.put(("token", {"model": slot, "model_id": model_id, "text": cached["summary"]}))
+            result = dict(cached, cached=True)
+        else:
+            # Late joiners of an identical stream replay its buffered tokens first
+            # A queued stream reports its position before its first token
+            on_queued = lambda queue: events.put(("queued", dict(queue, model=slot)))
+            subscription = coalescer.stream(cache_key, lambda: _admitted_stream(handler, text, model_id, on_queued))
+            if subscription.shared:
+                COALESCED_CALLS.labels(model_label(model_id), "stream").inc()
+            async for chunk in subscription:
+                if first_token_time is None:
+                    first_token_time = time.time()
+                chunks.append(chunk)
+                events.put(("token", {"model": slot, "model_id": model_id, "text": chunk}))
+            
+            result = {
+                "summary": "".join(chunks).strip(),
+                "model_name": handler.get_readable_name(model_id),
+                "processing_time": round(time.time() - start_time, 2),
+                "success": True
+            }
+            result.update(await stream_token_usage(handler, text, result["summary"], model_id))
+            if not subscription.shared:
+                await asyncio.to_thread(summary_cache.set, cache_key, model_id, result)
+            result["cached"] = False
+            result["coalesced"] = subscription.shared
+    except Overloaded as e:
+        result = {
+            "summary": f"Error: {str(e)}",
+            "model_name": model_id,
+            "processing_time": round(time.time() - start_time, 2),
+            "success": False,
+            "error": str(e),
+            "overloaded": e.to_dict()
+        }
+    except Exception as e:
+        result = {
+            "summary": f"Error: {str(e)}",
+            "model_name": model_id,
+            "processing_time": round(time.time() - start_time, 2),
+            "success": False,
+            "error": str(e)
+        }
+    
+    result["time_to_first_token"] = round(first_token_time - start_time, 3) if first_token_time else None
+    result["total_time"] = round(time.time() - start_time, 3)
+    record_model_call(model_id, result, result["total_time"])
+    events.put(("done", dict(result, model=slot, model_id=model_id)))
+    return result
+
+async def stream_token_usage(handler, text, summary, model_id):
+    """Token counts and cost for a streamed summary (streams don't report usage; counted locally)"""
+    # The input ids were memoized when the stream prepared its prompt
+    prepared = await asyncio.to_thread(handler.prepare_input, text, model_id)
+    output_tokens = await asyncio.to_thread(handler.count_tokens, summary, model_id)
+    return token_usage(model_id, prepared["input_tokens"], output_tokens, prepared["truncated_from"])
+
+async def stream_battle_async(text, model1_id, model2_id, events):
+    """Stream both contestants concurrently, then emit the final comparison and its quality scores"""
+    try:
+        # The source is profiled while the models are still streaming
+        source = quality_scorer.prepare(text)
+        result1, result2 = await asyncio.gather(
+            stream_model_async("model1", text, model1_id, events),
+            stream_model_async("model2", text, model2_id, events)
+        )
+        complete = {
+            "model1": result1,
+            "model2": result2,
+            "text_length": len(text),
+            "word_count": prepare(text).word_count,
+            "timestamp": int(time.time())
+        }
+        battle_id = record_battle(text, [model1_id, model2_id], [result1, result2], mode="stream")
+        if battle_id:
+            complete["battle_id"] = battle_id
+        evaluation_id = evaluate_battle(text, [model1_id, model2_id], [result1, result2], source)
+        if evaluation_id:
+            complete["evaluation_id"] = evaluation_id
+        events.put(("complete", complete))
+        
+        # Scores follow as a separate event so they never hold up the results
+        future = quality_scorer.future(evaluation_id) if evaluation_id else None
+        if future is not None:
+            events.put(("evaluation", await asyncio.wrap_future(future)))
+    except Exception as e:
+        events.put(("error", {"error": f"Summarization failed: {str(e)}"}))
+    finally:
+        events.put((None, None))
@@ -0,0 +1,460 @@
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+# Latency histogram buckets grow geometrically from 10ms, so percentiles come
+# from bucket counts (within ~10%) instead of sorting every stored sample
+LATENCY_BASE_MS = 10.0
+LATENCY_GROWTH = 1.1
+LATENCY_BUCKETS = 100
+
+VOTE_WINNERS = ("model1", "model2", "tie")
+# Relative paths resolve next to this file, like models.toml, wherever the server is started from
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(BACKEND_DIR, "battle_history.db")
+# _apply_vote outcome for a battle whose two sides are the same model
+SAME_MODEL = "same_model"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS battles (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    created_at REAL NOT NULL,
+    text_hash TEXT NOT NULL,
+    text_length INTEGER NOT NULL,
+    word_count INTEGER NOT NULL,
+    profile TEXT,
+    mode TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_battles_created ON battles (created_at);
+CREATE INDEX IF NOT EXISTS idx_battles_text_hash ON battles (text_hash, seq);
+
+CREATE TABLE IF NOT EXISTS battle_results (
+    battle_seq INTEGER NOT NULL,
+    slot TEXT NOT NULL,
+    model_id TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    processing_time REAL,
+    cached INTEGER NOT NULL,
+    summary TEXT,
+    error TEXT,
+    PRIMARY KEY (battle_seq, slot)
+);
+CREATE INDEX IF NOT EXISTS idx_battle_results_model ON battle_results (model_id, battle_seq);
+
+CREATE TABLE IF NOT EXISTS votes (
+    battle_seq INTEGER PRIMARY KEY,
+    winner TEXT NOT NULL,
+    ratings TEXT,
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS model_stats (
+    model_id TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL DEFAULT 0,
+    successes INTEGER NOT NULL DEFAULT 0,
+    cached INTEGER NOT NULL DEFAULT 0,
+    latency_count INTEGER NOT NULL DEFAULT 0,
+    latency_sum REAL NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    ties INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS latency_buckets (
+    model_id TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (model_id, bucket)
+);
+"""
+
+
+def latency_bucket(seconds: float) -> int:
+    """Histogram bucket for a latency"""
+    ms = max(seconds * 1000, LATENCY_BASE_MS)
+    return min(LATENCY_BUCKETS - 1, int(math.log(ms / LATENCY_BASE_MS, LATENCY_GROWTH)))
+
+
+def bucket_latency(bucket: int) -> float:
+    """Representative latency in seconds (geometric midpoint) for a bucket"""
+    return LATENCY_BASE_MS * LATENCY_GROWTH ** (bucket + 0.5) / 1000
+
+
+def histogram_percentile(buckets: Dict[int, int], total: int, pct: float) -> Optional[float]:
+    """Nearest-rank percentile from bucket counts"""
+    if not total:
+        return None
+    rank = max(1, math.ceil(pct / 100 * total))
+    seen = 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen >= rank:
+            return round(bucket_latency(bucket), 3)
+    return None
+
+
+class BattleHistory:
+    """
+    Persistent record of every battle, its results and votes.
+
+    Writes are queued and applied by a background thread in batched
+    transactions, so the request path never waits on disk. The database runs in
+    WAL mode so the read endpoints don't block the writer. Leaderboard counters
+    and latency histograms are updated in the same transactions, so reading the
+    leaderboard never scans the history.
+    """
+
+    def __init__(self, db_path: Optional[str], batch_size: int = 200, flush_interval: float = 0.2,
+                 max_queue: int = 10000):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stats = {"recorded": 0, "written": 0, "dropped": 0, "batches": 0, "write_errors": 0, "votes": 0}
+        self._writer = None
+
+        if db_path:
+            try:
+                self._init_db()
+            except Exception as e:
+                print(f"⚠️  Warning: Failed to open battle history database {db_path}: {e}")
+                self.db_path = None
+
+        self._start_writer()
+        # A forked server worker writes through its own thread
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _start_writer(self):
+        if self.db_path:
+            self._writer = threading.Thread(target=self._write_loop, name="battle-history-writer", daemon=True)
+            self._writer.start()
+
+    def _after_fork(self):
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._lock = threading.Lock()
+        self._start_writer()
+
+    @classmethod
+    def from_env(cls):
+        """Build the store from BATTLE_HISTORY_* environment variables"""
+        db_path = os.getenv("BATTLE_HISTORY_DB", DEFAULT_DB_PATH)
+        return cls(
+            db_path=os.path.join(BACKEND_DIR, db_path) if db_path else None,
+            batch_size=int(os.getenv("BATTLE_HISTORY_BATCH_SIZE", "200")),
+            flush_interval=float(os.getenv("BATTLE_HISTORY_FLUSH_MS", "200")) / 1000,
+            max_queue=int(os.getenv("BATTLE_HISTORY_MAX_QUEUE", "10000"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.db_path)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            # WAL lets readers run alongside the writer; NORMAL sync is durable across app crashes
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _enqueue(self, item) -> bool:
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            return False
+
+    def record(self, text_hash: str, text_length: int, word_count: int, model_ids: List[str],
+               results: List[Dict[str, Any]], profile: Optional[str] = None, mode: str = "summarize") -> Optional[str]:
+        """Queue a finished battle for writing; returns its id (None when disabled or the queue is full)"""
+        if not self.db_path:
+            return None
+        battle_id = uuid.uuid4().hex
+        battle = {
+            "id": battle_id,
+            "created_at": time.time(),
+            "text_hash": text_hash,
+            "text_length": text_length,
+            "word_count": word_count,
+            "profile": profile,
+            "mode": mode,
+            "results": [
+                (f"model{index}", model_id, result) for index, (model_id, result) in enumerate(zip(model_ids, results), 1)
+            ]
+        }
+        if not self._enqueue(("battle", battle, None)):
+            print("⚠️  Battle history queue is full; dropping a battle")
+            return None
+        self._count("recorded")
+        return battle_id
+
+    def vote(self, battle_id: str, winner: str, ratings: Optional[Dict[str, Any]] = None, timeout: float = 5) -> bool:
+        """
+        Record (or change) the vote for a battle and wait until it is written.
+        Returns False when the battle doesn't exist; raises ValueError for an
+        unknown winner or a battle between a model and itself.
+        """
+        if not self.db_path:
+            raise RuntimeError("Battle history is disabled")
+        if winner not in VOTE_WINNERS:
+            raise ValueError(f"Invalid winner '{winner}'; expected one of {', '.join(VOTE_WINNERS)}")
+        done = Future()
+        # Queued behind the battle itself, so voting right after a summary works
+        if not self._enqueue(("vote", {"battle_id": battle_id, "winner": winner, "ratings": ratings}, done)):
+            raise RuntimeError("Battle history queue is full")
+        outcome = done.result(timeout=timeout)
+        if outcome == SAME_MODEL:
+            raise ValueError("Both sides of this battle are the same model, so it can't be voted on")
+        return outcome
+
+    def flush(self, timeout: float = 5):
+        """Block until everything queued so far is written"""
+        if not self.db_path:
+            return
+        done = Future()
+        self._queue.put(("flush", None, done))
+        done.result(timeout=timeout)
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            items = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or items[-1][0] != "battle":
+                    # Votes and flushes are waited on; don't hold them for the batch window
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write_batch(conn, items)
+
+    def _write_batch(self, conn, items):
+        outcomes = []
+        try:
+            with conn:
+                for kind, payload, _ in items:
+                    if kind == "battle":
+                        self._insert_battle(conn, payload)
+                        outcomes.append(None)
+                    elif kind == "vote":
+                        outcomes.append(self._apply_vote(conn, payload))
+                    else:
+                        outcomes.append(None)
+            written = sum(1 for kind, _, _ in items if kind == "battle")
+            with self._lock:
+                self._stats["written"] += written
+                self._stats["votes"] += sum(1 for outcome in outcomes if outcome is True)
+                self._stats["batches"] += 1
+        except Exception as e:
+            print(f"⚠️  Battle history write failed: {e}")
+            self._count("write_errors")
+            for _, _, done in items:
+                if done is not None:
+                    done.set_exception(e)
+            return
+
+        for (_, _, done), outcome in zip(items, outcomes):
+            if done is not None:
+                done.set_result(outcome)
+
+    def _insert_battle(self, conn, battle):
+        cursor = conn.execute(
+            "INSERT INTO battles (id, created_at, text_hash, text_length, word_count, profile, mode) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (battle["id"], battle["created_at"], battle["text_hash"], battle["text_length"],
+             battle["word_count"], battle["profile"], battle["mode"])
+        )
+        seq = cursor.lastrowid
+        for slot, model_id, result in battle["results"]:
+            success = bool(result.get("success"))
+            cached = bool(result.get("cached"))
+            latency = result.get("total_time", result.get("processing_time"))
+            conn.execute(
+                "INSERT INTO battle_results (battle_seq, slot, model_id, success, processing_time, cached, summary, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (seq, slot, model_id, success, latency, cached,
+                 result.get("summary") if success else None, result.get("error"))
+            )
+            # Cache hits carry the original call's time, so they don't count towards latency
+            timed = success and not cached and latency is not None
+            conn.execute(
+                "INSERT INTO model_stats (model_id, calls, successes, cached, latency_count, latency_sum) "
+                "VALUES (?, 1, ?, ?, ?, ?) "
+                "ON CONFLICT (model_id) DO UPDATE SET calls = calls + 1, successes = successes + excluded.successes, "
+                "cached = cached + excluded.cached, latency_count = latency_count + excluded.latency_count, "
+                "latency_sum = latency_sum + excluded.latency_sum",
+                (model_id, int(success), int(cached), int(timed), latency if timed else 0.0)
+            )
+            if timed:
+                conn.execute(
+                    "INSERT INTO latency_buckets (model_id, bucket, count) VALUES (?, ?, 1) "
+                    "ON CONFLICT (model_id, bucket) DO UPDATE SET count = count + 1",
+                    (model_id, latency_bucket(latency))
+                )
+
+    def _apply_vote(self, conn, vote) -> bool:
+        row = conn.execute("SELECT seq FROM battles WHERE id = ?", (vote["battle_id"],)).fetchone()
+        if row is None:
+            return False
+        seq = row[0]
+        models = dict(conn.execute("SELECT slot, model_id FROM battle_results WHERE battle_seq = ?", (seq,)).fetchall())
+        if len(set(models.values())) < len(models):
+            # A model against itself would be tallied as both winner and loser
+            return SAME_MODEL
+        previous = conn.execute("SELECT winner FROM votes WHERE battle_seq = ?", (seq,)).fetchone()
+        if previous is not None:
+            self._tally(conn, models, previous[0], -1)
+        conn.execute(
+            "INSERT OR REPLACE INTO votes (battle_seq, winner, ratings, created_at) VALUES (?, ?, ?, ?)",
+            (seq, vote["winner"], json.dumps(vote["ratings"]) if vote["ratings"] else None, time.time())
+        )
+        self._tally(conn, models, vote["winner"], 1)
+        return True
+
+    def _tally(self, conn, models, winner, delta):
+        for slot, model_id in models.items():
+            if winner == "tie":
+                column = "ties"
+            else:
+                column = "wins" if slot == winner else "losses"
+            conn.execute(f"UPDATE model_stats SET {column} = {column} + ? WHERE model_id = ?", (delta, model_id))
+
+    def get_history(self, limit: int = 20, before: Optional[int] = None, model_id: Optional[str] = None,
+                    text_hash: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+                    include_summaries: bool = False) -> Dict[str, Any]:
+        """
+        Most recent battles first, filtered by model, text hash and time range.
+        Pages by cursor: pass the returned next_before to get the following page.
+        """
+        if not self.db_path:
+            return {"battles": [], "next_before": None}
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("seq < ?")
+            params.append(before)
+        if text_hash:
+            clauses.append("text_hash = ?")
+            params.append(text_hash)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            params.append(until)
+        if model_id:
+            clauses.append("seq IN (SELECT battle_seq FROM battle_results WHERE model_id = ?)")
+            params.append(model_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM battles {where} ORDER BY seq DESC LIMIT ?", params + [limit]
+            ).fetchall()
+            seqs = [row["seq"] for row in rows]
+            marks = ",".join("?" * len(seqs))
+            results, votes = {}, {}
+            if seqs:
+                for result in conn.execute(
+                    f"SELECT * FROM battle_results WHERE battle_seq IN ({marks}) ORDER BY slot", seqs
+                ):
+                    entry = {
+                        "model_id": result["model_id"],
+                        "success": bool(result["success"]),
+                        "processing_time": result["processing_time"],
+                        "cached": bool(result["cached"]),
+                        "error": result["error"]
+                    }
+                    if include_summaries:
+                        entry["summary"] = result["summary"]
+                    results.setdefault(result["battle_seq"], {})[result["slot"]] = entry
+                for vote in conn.execute(f"SELECT * FROM votes WHERE battle_seq IN ({marks})", seqs):
+                    votes[vote["battle_seq"]] = {
+                        "winner": vote["winner"],
+                        "ratings": json.loads(vote["ratings"]) if vote["ratings"] else None,
+                        "created_at": vote["created_at"]
+                    }
+
+        battles = [{
+            "battle_id": row["id"],
+            "seq": row["seq"],
+            "created_at": row["created_at"],
+            "text_hash": row["text_hash"],
+            "text_length": row["text_length"],
+            "word_count": row["word_count"],
+            "profile": row["profile"],
+            "mode": row["mode"],
+            "results": results.get(row["seq"], {}),
+            "vote": votes.get(row["seq"])
+        } for row in rows]
+        next_before = seqs[-1] if len(seqs) == limit else None
+        return {"battles": battles, "next_before": next_before}
+
+    def get_leaderboard(self) -> List[Dict[str, Any]]:
+        """Per-model success rate, latency percentiles and vote tallies, best win rate first"""
+        if not self.db_path:
+            return []
+        with self._connect() as conn:
+            stats = conn.execute("SELECT * FROM model_stats").fetchall()
+            histograms = {}
+            for row in conn.execute("SELECT model_id, bucket, count FROM latency_buckets"):
+                histograms.setdefault(row["model_id"], {})[row["bucket"]] = row["count"]
+
+        leaderboard = []
+        for row in stats:
+            buckets = histograms.get(row["model_id"], {})
+            timed = row["latency_count"]
+            decided = row["wins"] + row["losses"]
+            votes = decided + row["ties"]
+            leaderboard.append({
+                "model_id": row["model_id"],
+                "calls": row["calls"],
+                "successes": row["successes"],
+                "success_rate": round(row["successes"] / row["calls"], 4) if row["calls"] else 0.0,
+                "cached": row["cached"],
+                "latency_samples": timed,
+                "latency_mean": round(row["latency_sum"] / timed, 3) if timed else None,
+                "latency_p50": histogram_percentile(buckets, timed, 50),
+                "latency_p95": histogram_percentile(buckets, timed, 95),
+                "latency_p99": histogram_percentile(buckets, timed, 99),
+                "votes": votes,
+                "wins": row["wins"],
+                "losses": row["losses"],
+                "ties": row["ties"],
+                "win_rate": round(row["wins"] / decided, 4) if decided else None
+            })
+        leaderboard.sort(key=lambda entry: (entry["win_rate"] or 0, entry["votes"], entry["success_rate"]), reverse=True)
+        return leaderboard
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Writer counters and queue depth"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            "enabled": self.enabled,
+            "db_path": self.db_path,
+            "queued": self._queue.qsize(),
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval
+        })
+        return stats
@@ -0,0 +1,114 @@
+"""
+Compare HuggingFace inference backends against the eager float32 baseline.
+
+Run from the backend directory:
+    python -m benchmarks.hf_backends --models facebook/bart-large-cnn --backends eager,int8,bf16,compile
+"""
+import argparse
+import json
+import statistics
+import time
+
+from evaluation import rouge_scores
+from models.hf_backends import BACKENDS, build_pipeline
+from models.huggingface_models import HuggingFaceModels
+from sample_texts import get_sample_texts
+
+
+def benchmark_backend(model_name, backend, texts, params, repeats=1):
+    """Time per-text latency and batched throughput for one backend"""
+    load_start = time.time()
+    summarizer = build_pipeline(model_name, backend)
+    load_time = time.time() - load_start
+
+    # One untimed pass so lazy initialisation / compilation isn't counted
+    summarizer(texts[0], truncation=True, **params)
+
+    latencies = []
+    summaries = []
+    for _ in range(repeats):
+        summaries = []
+        for text in texts:
+            start = time.perf_counter()
+            result = summarizer(text, truncation=True, **params)
+            latencies.append(time.perf_counter() - start)
+            summaries.append(result[0]["summary_text"].strip())
+
+    start = time.perf_counter()
+    summarizer(texts, batch_size=len(texts), truncation=True, **params)
+    batch_time = time.perf_counter() - start
+
+    return {
+        "backend": getattr(summarizer, "inference_backend", backend),
+        "load_time": round(load_time, 2),
+        "latency_mean": round(statistics.mean(latencies), 3),
+        "latency_p50": round(statistics.median(latencies), 3),
+        "latency_max": round(max(latencies), 3),
+        "throughput_texts_per_sec": round(len(texts) / batch_time, 3),
+        "summaries": summaries
+    }
+
+
+def rouge_drift(summaries, baseline_summaries):
+    """Mean ROUGE F1 of each backend summary against the float32 summary of the same text"""
+    scores = [rouge_scores(candidate, reference) for candidate, reference in zip(summaries, baseline_summaries)]
+    return {
+        metric: round(statistics.mean(score[metric]["f1"] for score in scores), 4)
+        for metric in ("rouge1", "rouge2", "rougeL")
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="facebook/bart-large-cnn", help="Comma-separated HF model ids")
+    parser.add_argument("--backends", default="eager,int8,bf16,compile", help=f"Comma-separated subset of {','.join(BACKENDS)}")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    texts = [sample["text"].strip() for sample in get_sample_texts()]
+    hf_models = HuggingFaceModels()
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "eager" in backends:
+        backends.remove("eager")
+    # The eager float32 run is the reference for drift, so always run it first
+    backends.insert(0, "eager")
+
+    report = {"texts": len(texts), "models": {}}
+    for model_name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        params = hf_models.get_generation_params(model_name)
+        results = {}
+        for backend in backends:
+            print(f"⏱️  {model_name} / {backend}")
+            try:
+                results[backend] = benchmark_backend(model_name, backend, texts, params, args.repeats)
+            except Exception as e:
+                print(f"❌ {backend} failed: {str(e)}")
+                results[backend] = {"error": str(e)}
+
+        baseline = results["eager"]
+        for backend, result in results.items():
+            if "summaries" in result and "summaries" in baseline:
+                result["rouge_vs_fp32"] = rouge_drift(result["summaries"], baseline["summaries"])
+                result["speedup_vs_fp32"] = round(baseline["latency_mean"] / result["latency_mean"], 2)
+        report["models"][model_name] = results
+
+    for model_name, results in report["models"].items():
+        print(f"\n{model_name}")
+        print(f"{'backend':<10}{'mean s':>10}{'p50 s':>10}{'texts/s':>10}{'speedup':>10}{'ROUGE-L':>10}")
+        for backend, result in results.items():
+            if "error" in result:
+                print(f"{backend:<10}  error: {result['error']}")
+                continue
+            print(f"{backend:<10}{result['latency_mean']:>10}{result['latency_p50']:>10}"
+                  f"{result['throughput_texts_per_sec']:>10}{result.get('speedup_vs_fp32', '-'):>10}"
+                  f"{result.get('rouge_vs_fp32', {}).get('rougeL', '-'):>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
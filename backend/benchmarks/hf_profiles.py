@@ -0,0 +1,102 @@
+"""
+Compare HuggingFace decoding profiles (quality / balanced / fast) on the sample texts.
+
+Reports per-text latency, generated tokens per second, speedup over the quality
+profile and ROUGE of each profile's summaries against the quality summaries (how
+much output quality the faster settings give up) and against the source text.
+
+Run from the backend directory:
+    python -m benchmarks.hf_profiles --models facebook/bart-large-cnn --profiles quality,balanced,fast
+"""
+import argparse
+import json
+import statistics
+import time
+
+from benchmarks.hf_backends import rouge_drift
+from evaluation import rouge_scores
+from models.decoding import PROFILES
+from models.huggingface_models import HuggingFaceModels
+from sample_texts import get_sample_texts
+
+
+def benchmark_profile(hf_models, model_name, profile, texts, repeats=1):
+    """Summarize each text one at a time with a decoding profile"""
+    # One untimed pass so model (and draft model) loading isn't counted
+    hf_models._summarize_batch([hf_models.prepare_input(texts[0], model_name)["input_ids"]], model_name, profile)
+
+    latencies, rates, summaries = [], [], []
+    for _ in range(repeats):
+        summaries = []
+        for text in texts:
+            start = time.perf_counter()
+            inputs = [hf_models.prepare_input(text, model_name)["input_ids"]]
+            result = hf_models._summarize_batch(inputs, model_name, profile)[0]
+            latencies.append(time.perf_counter() - start)
+            rates.append(result["tokens_per_second"])
+            summaries.append(result["summary"])
+
+    source_rouge = [rouge_scores(summary, text)["rougeL"]["precision"] for summary, text in zip(summaries, texts)]
+    return {
+        "draft_model": hf_models.get_generation_params(model_name, profile).get("draft_model"),
+        "latency_mean": round(statistics.mean(latencies), 3),
+        "latency_p50": round(statistics.median(latencies), 3),
+        "latency_max": round(max(latencies), 3),
+        "tokens_per_second": round(statistics.mean(rates), 2),
+        # Share of the summary's word sequence found in the source (extractiveness)
+        "rougeL_precision_vs_source": round(statistics.mean(source_rouge), 4),
+        "summaries": summaries
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", default="facebook/bart-large-cnn", help="Comma-separated HF model ids")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help=f"Comma-separated subset of {','.join(PROFILES)}")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    texts = [sample["text"].strip() for sample in get_sample_texts()]
+    hf_models = HuggingFaceModels(use_worker_pool=False)
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip() and p.strip() != "quality"]
+    # The quality profile is the reference for drift, so always run it first
+    profiles.insert(0, "quality")
+
+    report = {"texts": len(texts), "models": {}}
+    for model_name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        results = {}
+        for profile in profiles:
+            print(f"⏱️  {model_name} / {profile}")
+            try:
+                results[profile] = benchmark_profile(hf_models, model_name, profile, texts, args.repeats)
+            except Exception as e:
+                print(f"❌ {profile} failed: {str(e)}")
+                results[profile] = {"error": str(e)}
+
+        baseline = results["quality"]
+        for profile, result in results.items():
+            if "summaries" in result and "summaries" in baseline:
+                result["rouge_vs_quality"] = rouge_drift(result["summaries"], baseline["summaries"])
+                result["speedup_vs_quality"] = round(baseline["latency_mean"] / result["latency_mean"], 2)
+        report["models"][model_name] = results
+
+    for model_name, results in report["models"].items():
+        print(f"\n{model_name}")
+        print(f"{'profile':<10}{'mean s':>10}{'p50 s':>10}{'tok/s':>10}{'speedup':>10}{'ROUGE-L':>10}")
+        for profile, result in results.items():
+            if "error" in result:
+                print(f"{profile:<10}  error: {result['error']}")
+                continue
+            print(f"{profile:<10}{result['latency_mean']:>10}{result['latency_p50']:>10}"
+                  f"{result['tokens_per_second']:>10}{result.get('speedup_vs_quality', '-'):>10}"
+                  f"{result.get('rouge_vs_quality', {}).get('rougeL', '-'):>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Exercise the provider client layer (deadlines, retries, hedging, circuit breaker)
+against the local stub providers.
+
+Runs the OpenAI and Gemini adapters through three phases:
+  steady   - heavy-tailed latency with some injected 500/429s, once without and
+             once with hedging, comparing p50/p99 latency and success rate
+  outage   - every request fails; the breaker should open and fail fast
+  recovery - errors stop; after the reset timeout a probe closes the breaker
+
+Run from the backend directory:
+    python -m benchmarks.provider_resilience --calls 200 --concurrency 16
+
+Exits non-zero when the breaker doesn't open during the outage or doesn't close
+after recovery, so it can gate changes to the client layer.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+from benchmarks.run_battle import percentile
+from benchmarks.stub_providers import StubConfig, StubServer
+
+SAMPLE = ("The city council approved a new budget on Tuesday. It increases funding for public "
+          "transport and parks. Critics argue the plan raises taxes too quickly. ") * 4
+
+
+async def run_phase(model, model_id, calls, concurrency):
+    """Fire calls summaries at a fixed concurrency and time each one"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, outcomes = [], []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            result = await model.summarize_async(SAMPLE, model_id)
+            latencies.append(time.perf_counter() - start)
+            outcomes.append(bool(result.get("success")))
+
+    await asyncio.gather(*(one() for _ in range(calls)))
+    return {
+        "calls": calls,
+        "success_rate": round(sum(outcomes) / len(outcomes), 4),
+        "p50": round(percentile(latencies, 50), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "mean": round(statistics.mean(latencies), 3)
+    }
+
+
+def client_counters(client):
+    stats = client.get_stats()
+    return {key: stats[key] for key in ("retries", "hedges", "hedge_wins", "short_circuited")} | {
+        "breaker": stats["breaker"]["state"]
+    }
+
+
+async def exercise(model, model_id, stub, args):
+    client = model.client
+    report = {}
+
+    for hedge in (False, True):
+        client.hedge = hedge
+        before = client_counters(client)
+        phase = await run_phase(model, model_id, args.calls, args.concurrency)
+        after = client_counters(client)
+        phase.update({key: after[key] - before[key] for key in ("retries", "hedges", "hedge_wins")})
+        report["steady_hedged" if hedge else "steady"] = phase
+
+    stub.config.update(error_rate=1.0)
+    phase = await run_phase(model, model_id, args.calls // 2, args.concurrency)
+    phase.update(client_counters(client))
+    report["outage"] = phase
+
+    stub.config.update(error_rate=args.error_rate)
+    await asyncio.sleep(client.breaker.reset_timeout + 0.1)
+    phase = await run_phase(model, model_id, args.calls // 2, args.concurrency)
+    phase.update(client_counters(client))
+    report["recovery"] = phase
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200, help="Calls per steady phase")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--median-ms", type=float, default=150)
+    parser.add_argument("--sigma", type=float, default=1.0, help="Lognormal spread; higher means a heavier tail")
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.02)
+    parser.add_argument("--breaker-reset", type=float, default=2.0, help="Seconds the breaker stays open")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    stub = StubServer(StubConfig(args.median_ms, args.sigma, args.error_rate, args.rate_limit_rate,
+                                 seed=args.seed)).start()
+    os.environ.update(stub.env())
+    for prefix in ("OPENAI", "GEMINI"):
+        os.environ[f"{prefix}_TIMEOUT"] = "10"
+        os.environ[f"{prefix}_DEADLINE"] = "20"
+        os.environ[f"{prefix}_BREAKER_RESET"] = str(args.breaker_reset)
+
+    # Imported after the environment points the adapters at the stub
+    from async_runtime import get_runtime
+    from models.gemini_model import GeminiModel
+    from models.openai_model import OpenAIModel
+
+    runtime = get_runtime()
+    report = {}
+    failures = []
+    try:
+        for model, model_id in ((OpenAIModel(), "gpt-3.5-turbo"), (GeminiModel(), "gemini-1.5-flash")):
+            print(f"⏱️  {model_id}")
+            report[model_id] = result = runtime.run(exercise(model, model_id, stub, args))
+            if result["outage"]["breaker"] != "open" or not result["outage"]["short_circuited"]:
+                failures.append(f"{model_id}: breaker did not open during the outage")
+            if result["recovery"]["breaker"] != "closed":
+                failures.append(f"{model_id}: breaker did not close after recovery")
+    finally:
+        stub.stop()
+
+    for model_id, phases in report.items():
+        print(f"\n{model_id}")
+        print(f"{'phase':<15}{'success':>9}{'p50 s':>9}{'p99 s':>9}{'retries':>9}{'hedges':>9}{'breaker':>10}")
+        for name, phase in phases.items():
+            print(f"{name:<15}{phase['success_rate']:>9}{phase['p50']:>9}{phase['p99']:>9}"
+                  f"{phase.get('retries', '-'):>9}{phase.get('hedges', '-'):>9}{phase.get('breaker', '-'):>10}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n📄 Report written to {args.output}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
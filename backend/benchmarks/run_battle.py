@@ -0,0 +1,262 @@
+"""
+Reproducible end-to-end battle benchmark.
+
+Drives /api/summarize at a fixed concurrency over the sample texts and a set of
+model pairs, with OpenAI and Gemini replaced by the local stub providers (see
+benchmarks/stub_providers.py) so runs are comparable across machines and commits.
+The summary cache and request coalescing are disabled so every request does
+the full work.
+
+Run from the backend directory:
+    python -m benchmarks.run_battle --requests 200 --concurrency 16 --output bench.json
+    python -m benchmarks.run_battle --baseline bench.json --max-regression 0.10
+
+HuggingFace models can be included in the pairs (e.g. a tiny checkpoint listed in
+HF_EXTRA_MODELS); they run for real. Pass --url to benchmark an already running
+server instead of the in-process app (its provider setup is then up to you).
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_providers import StubConfig, StubServer
+
+DEFAULT_PAIRS = "gpt-3.5-turbo:gemini-1.5-flash"
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return round(peak / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+
+
+def make_client(url=None):
+    """Return post(payload) -> (status, body) against the in-process app or a live server"""
+    if url:
+        endpoint = url.rstrip("/") + "/api/summarize"
+
+        def post(payload):
+            request = urllib.request.Request(endpoint, data=json.dumps(payload).encode(),
+                                             headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=300) as response:
+                    return response.status, json.loads(response.read())
+            except urllib.error.HTTPError as e:
+                return e.code, {"error": e.read().decode(errors="replace")}
+        return post
+
+    # Imported here so the stub/cache environment is in place before the models are built
+    from app import app
+    local = threading.local()
+
+    def post(payload):
+        if not hasattr(local, "client"):
+            local.client = app.test_client()
+        response = local.client.post("/api/summarize", json=payload)
+        return response.status_code, response.get_json()
+    return post
+
+
+def run_benchmark(post, texts, pairs, total_requests, concurrency, warmup=0, profile=None):
+    """Send total_requests battles (round-robin over texts x pairs) and time each one"""
+    workload = list(itertools.islice(itertools.cycle(itertools.product(texts, pairs)), total_requests + warmup))
+
+    def one(job):
+        text, (model1, model2) = job
+        start = time.perf_counter()
+        try:
+            payload = {"text": text, "model1": model1, "model2": model2}
+            if profile:
+                payload["profile"] = profile
+            status, body = post(payload)
+        except Exception as e:
+            status, body = 0, {"error": str(e)}
+        latency = time.perf_counter() - start
+        failed_models = [
+            side for side in ("model1", "model2")
+            if status == 200 and not body.get(side, {}).get("success")
+        ]
+        return {"latency": latency, "status": status, "failed_models": failed_models,
+                "pair": f"{model1} vs {model2}"}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warmup requests load models and open connections; they aren't reported
+        list(pool.map(one, workload[:warmup]))
+
+        cpu_start = os.times()
+        wall_start = time.perf_counter()
+        results = list(pool.map(one, workload[warmup:]))
+        wall_time = time.perf_counter() - wall_start
+        cpu_end = os.times()
+
+    return results, wall_time, (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+
+
+def summarize_results(results, wall_time, cpu_time):
+    """Latency percentiles, throughput, error counts and resource use"""
+    latencies = [r["latency"] for r in results if r["status"] == 200]
+    by_pair = {}
+    for r in results:
+        by_pair.setdefault(r["pair"], []).append(r["latency"])
+
+    def latency_stats(values):
+        return {
+            "p50": round(percentile(values, 50), 4) if values else None,
+            "p95": round(percentile(values, 95), 4) if values else None,
+            "p99": round(percentile(values, 99), 4) if values else None,
+            "mean": round(statistics.mean(values), 4) if values else None
+        }
+
+    return {
+        "requests": len(results),
+        "http_errors": sum(1 for r in results if r["status"] != 200),
+        "model_errors": sum(len(r["failed_models"]) for r in results),
+        "latency": latency_stats(latencies),
+        "latency_by_pair": {pair: latency_stats(values) for pair, values in by_pair.items()},
+        "throughput_rps": round(len(results) / wall_time, 2) if wall_time else None,
+        "wall_time": round(wall_time, 2),
+        "cpu_time": round(cpu_time, 2),
+        "cpu_per_request_ms": round(cpu_time / len(results) * 1000, 2) if results else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def compare(report, baseline, max_regression):
+    """List metrics that regressed by more than max_regression (a fraction) against a baseline"""
+    checks = [
+        ("latency.p50", lambda r: r["latency"]["p50"], False),
+        ("latency.p95", lambda r: r["latency"]["p95"], False),
+        ("latency.p99", lambda r: r["latency"]["p99"], False),
+        ("throughput_rps", lambda r: r["throughput_rps"], True),
+        ("cpu_per_request_ms", lambda r: r["cpu_per_request_ms"], False),
+        ("peak_rss_mb", lambda r: r["peak_rss_mb"], False)
+    ]
+    regressions = []
+    for name, get, higher_is_better in checks:
+        current, previous = get(report["results"]), get(baseline["results"])
+        if not current or not previous:
+            continue
+        change = (current - previous) / previous
+        if (-change if higher_is_better else change) > max_regression:
+            regressions.append({"metric": name, "baseline": previous, "current": current,
+                                "change": round(change, 4)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS,
+                        help="Comma-separated model pairs, each model1:model2")
+    parser.add_argument("--requests", type=int, default=100, help="Measured battles to send")
+    parser.add_argument("--warmup", type=int, default=4, help="Unmeasured battles sent first")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--profile", help="HF decoding profile to request (quality, balanced or fast)")
+    parser.add_argument("--median-ms", type=float, default=300, help="Stub provider median latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Stub provider lognormal spread")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Stub provider 500 rate")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Stub provider 429 rate")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Fail when a metric is this fraction worse than the baseline")
+    args = parser.parse_args(argv)
+
+    pairs = [tuple(pair.split(":", 1)) for pair in args.pairs.split(",") if pair.strip()]
+    stub_config = StubConfig(args.median_ms, args.sigma, args.error_rate, args.rate_limit_rate, seed=args.seed)
+
+    stub = None
+    if not args.url:
+        stub = StubServer(stub_config).start()
+        os.environ.update(stub.env())
+        # Measure the pipeline, not the summary cache or request coalescing
+        os.environ["SUMMARY_CACHE_MAX_MB"] = "0"
+        os.environ["SUMMARY_CACHE_DB"] = ""
+        os.environ["COALESCE_REQUESTS"] = "0"
+        # History writes stay on (they're part of the request path) but go to a scratch database
+        os.environ["BATTLE_HISTORY_DB"] = os.path.join(tempfile.mkdtemp(prefix="battle-bench-"), "history.db")
+
+    from sample_texts import get_sample_texts
+    texts = [sample["text"].strip() for sample in get_sample_texts()]
+
+    print(f"⏱️  {args.requests} battles, concurrency {args.concurrency}, pairs {args.pairs}")
+    try:
+        post = make_client(args.url)
+        results, wall_time, cpu_time = run_benchmark(post, texts, pairs, args.requests,
+                                                     args.concurrency, args.warmup, args.profile)
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    report = {
+        "config": {
+            "pairs": args.pairs,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "profile": args.profile,
+            "stub": None if args.url else {
+                "median_ms": args.median_ms,
+                "sigma": args.sigma,
+                "error_rate": args.error_rate,
+                "rate_limit_rate": args.rate_limit_rate,
+                "seed": args.seed
+            },
+            "url": args.url,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count()
+        },
+        "results": summarize_results(results, wall_time, cpu_time)
+    }
+
+    summary = report["results"]
+    print(f"p50 {summary['latency']['p50']}s  p95 {summary['latency']['p95']}s  p99 {summary['latency']['p99']}s")
+    print(f"throughput {summary['throughput_rps']} req/s  cpu {summary['cpu_per_request_ms']} ms/req  "
+          f"peak RSS {summary['peak_rss_mb']} MB")
+    print(f"errors: {summary['http_errors']} HTTP, {summary['model_errors']} model")
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["regressions"] = compare(report, baseline, args.max_regression)
+        for regression in report["regressions"]:
+            print(f"❌ {regression['metric']}: {regression['baseline']} -> {regression['current']} "
+                  f"({regression['change']:+.1%})")
+        if report["regressions"]:
+            exit_code = 1
+        else:
+            print(f"✅ Within {args.max_regression:.0%} of {args.baseline}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,200 @@
+"""
+Load-test the development server against the production (gunicorn) server.
+
+Starts the stub providers, then for each server mode launches the app as a
+subprocess on a free port, waits for /api/ready, replays the same battle
+workload as benchmarks.run_battle against it and stops it with SIGTERM. The
+production run also checks the drain: battles still in flight when SIGTERM
+arrives must complete.
+
+Run from the backend directory:
+    python -m benchmarks.serving --requests 400 --concurrency 32 --output serving.json
+    python -m benchmarks.serving --modes production --workers 4 --threads 16
+
+CPU and memory figures from run_battle describe the load generator; the
+servers' peak RSS is read from /proc where available.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.run_battle import DEFAULT_PAIRS, make_client, run_benchmark, summarize_results
+from benchmarks.stub_providers import StubConfig, StubServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "dev": [sys.executable, "app.py"],
+    "production": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"]
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url, process, timeout=300):
+    """Poll the readiness probe until it answers 200"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode} before becoming ready")
+        try:
+            with urllib.request.urlopen(url + "/api/ready", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"Server at {url} not ready after {timeout}s")
+
+
+def process_tree_peak_rss_mb(pid):
+    """Summed peak RSS (VmHWM) of a process and its children, or None without /proc"""
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(child) for child in f.read().split()]
+        total_kb = 0
+        for each in pids:
+            with open(f"/proc/{each}/status") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        total_kb += int(line.split()[1])
+        return round(total_kb / 1024, 1)
+    except (OSError, ValueError):
+        return None
+
+
+def start_server(mode, port, env, workers, threads):
+    server_env = dict(env, PORT=str(port), HOST="127.0.0.1", WEB_ACCESS_LOG="")
+    if workers:
+        server_env["WEB_WORKERS"] = str(workers)
+    if threads:
+        server_env["WEB_THREADS"] = str(threads)
+    # Own process group: the dev server's reloader runs the app in a child process
+    return subprocess.Popen(MODES[mode], cwd=BACKEND_DIR, env=server_env, start_new_session=True,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def drain_check(post, process, texts, pairs, in_flight):
+    """Start battles, SIGTERM the server while they run, and count how many still completed"""
+    jobs = [(texts[i % len(texts)], pairs[i % len(pairs)]) for i in range(in_flight)]
+
+    def one(job):
+        text, (model1, model2) = job
+        try:
+            status, _ = post({"text": text, "model1": model1, "model2": model2})
+        except Exception:
+            status = 0
+        return status
+
+    with ThreadPoolExecutor(max_workers=in_flight) as pool:
+        futures = [pool.submit(one, job) for job in jobs]
+        # Long enough for the requests to be accepted, well short of a stubbed model call
+        time.sleep(0.1)
+        process.send_signal(signal.SIGTERM)
+        statuses = [future.result() for future in futures]
+    return {"in_flight": in_flight, "completed": sum(1 for status in statuses if status == 200)}
+
+
+def run_mode(mode, args, env, texts, pairs):
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    process = start_server(mode, port, env, args.workers, args.threads)
+    try:
+        wait_ready(url, process)
+        post = make_client(url)
+        results, wall_time, cpu_time = run_benchmark(post, texts, pairs, args.requests,
+                                                     args.concurrency, args.warmup)
+        summary = summarize_results(results, wall_time, cpu_time)
+        summary["server_peak_rss_mb"] = process_tree_peak_rss_mb(process.pid)
+        if mode == "production":
+            summary["drain"] = drain_check(post, process, texts, pairs, min(args.concurrency, 16))
+        return summary
+    finally:
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=60)
+        except ProcessLookupError:
+            pass
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="dev,production", help="Comma-separated: dev, production")
+    parser.add_argument("--pairs", default=DEFAULT_PAIRS, help="Comma-separated model pairs, each model1:model2")
+    parser.add_argument("--requests", type=int, default=200, help="Measured battles per mode")
+    parser.add_argument("--warmup", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, help="WEB_WORKERS for the production server")
+    parser.add_argument("--threads", type=int, help="WEB_THREADS for the production server")
+    parser.add_argument("--median-ms", type=float, default=300, help="Stub provider median latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Stub provider lognormal spread")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Write the report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+    pairs = [tuple(pair.split(":", 1)) for pair in args.pairs.split(",") if pair.strip()]
+
+    from sample_texts import get_sample_texts
+    texts = [sample["text"].strip() for sample in get_sample_texts()]
+
+    stub = StubServer(StubConfig(args.median_ms, args.sigma, seed=args.seed)).start()
+    env = dict(os.environ, **stub.env())
+    # Measure serving, not the summary cache, coalescing or admission shedding
+    env.update({
+        "SUMMARY_CACHE_MAX_MB": "0",
+        "SUMMARY_CACHE_DB": "",
+        "COALESCE_REQUESTS": "0",
+        "ADMISSION_MAX_QUEUE": "100000",
+        "ADMISSION_DEADLINE_SECONDS": "300",
+        "QUALITY_SCORING": "0",
+        "BATTLE_HISTORY_DB": os.path.join(tempfile.mkdtemp(prefix="battle-serving-"), "history.db")
+    })
+
+    report = {"config": vars(args), "results": {}}
+    try:
+        for mode in modes:
+            print(f"⏱️  {mode}: {args.requests} battles, concurrency {args.concurrency}")
+            summary = report["results"][mode] = run_mode(mode, args, env, texts, pairs)
+            print(f"   p50 {summary['latency']['p50']}s  p95 {summary['latency']['p95']}s  "
+                  f"p99 {summary['latency']['p99']}s  throughput {summary['throughput_rps']} req/s  "
+                  f"errors {summary['http_errors']}  server RSS {summary['server_peak_rss_mb']} MB")
+            if "drain" in summary:
+                drain = summary["drain"]
+                print(f"   drain: {drain['completed']}/{drain['in_flight']} in-flight battles completed after SIGTERM")
+    finally:
+        stub.stop()
+
+    if "dev" in report["results"] and "production" in report["results"]:
+        dev, production = report["results"]["dev"], report["results"]["production"]
+        if dev["throughput_rps"] and production["throughput_rps"]:
+            print(f"📈 production/dev throughput: {production['throughput_rps'] / dev['throughput_rps']:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📄 Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Local stand-ins for the OpenAI and Gemini HTTP APIs, so battles can be benchmarked
+without network access, API keys or rate limits.
+
+Each response waits a lognormal latency (median and spread are configurable) and
+fails with the configured error rate, then returns the first sentences of the text.
+
+Run standalone from the backend directory:
+    python -m benchmarks.stub_providers --port 8765 --median-ms 300 --sigma 0.5
+
+then point the app at it with OPENAI_API_BASE=http://127.0.0.1:8765/v1 and
+GEMINI_API_BASE=http://127.0.0.1:8765.
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+PROMPT_TAIL = re.compile(r"\s*(Provide a summary|Summary):\s*$")
+
+
+class StubConfig:
+    """Latency and failure profile shared by every stubbed endpoint"""
+
+    def __init__(self, median_ms: float = 300, sigma: float = 0.5, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, stream_chunk_ms: float = 15, seed: Optional[int] = None):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stream_chunk_ms = stream_chunk_ms
+        self.random = random.Random(seed)
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def update(self, **settings):
+        """Change the latency/failure profile of a running stub (e.g. to simulate an outage)"""
+        for name in ("median_ms", "sigma", "error_rate", "rate_limit_rate", "stream_chunk_ms"):
+            if name in settings:
+                setattr(self, name, float(settings[name]))
+
+    def latency(self) -> float:
+        """Seconds to wait before answering"""
+        return self.random.lognormvariate(math.log(self.median_ms / 1000), self.sigma)
+
+    def failure(self) -> Optional[web.Response]:
+        """An error response for this request, or None to answer normally"""
+        self.stats["requests"] += 1
+        roll = self.random.random()
+        if roll < self.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.json_response({"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                                     status=429, headers={"Retry-After": "1"})
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response({"error": {"message": "Stub provider failure", "type": "server_error"}},
+                                     status=500)
+        return None
+
+
+def fake_summary(prompt: str, sentences: int = 2) -> str:
+    """The first sentences of the text being summarized"""
+    # Both prompts end with the text followed by a short instruction line
+    text = PROMPT_TAIL.sub("", prompt.split("Text to summarize:", 1)[-1])
+    return " ".join(SENTENCE_END.split(" ".join(text.split()))[:sentences]).strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Roughly 4 characters per token, for the usage the real APIs report"""
+    return len(text) // 4 + 1
+
+
+def _words(summary: str):
+    words = summary.split(" ")
+    return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+
+async def openai_chat(request: web.Request) -> web.StreamResponse:
+    """POST /v1/chat/completions"""
+    config = request.app["config"]
+    body = await request.json()
+    await asyncio.sleep(config.latency())
+    failure = config.failure()
+    if failure is not None:
+        return failure
+
+    summary = fake_summary(body["messages"][-1]["content"])
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in body["messages"])
+    created = int(time.time())
+    if not body.get("stream"):
+        return web.json_response({
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": created,
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": summary}, "finish_reason": "stop"}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": estimate_tokens(summary),
+                "total_tokens": prompt_tokens + estimate_tokens(summary)
+            }
+        })
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+    await response.prepare(request)
+    for word in _words(summary):
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": body.get("model"),
+            "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+        }
+        await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await asyncio.sleep(config.stream_chunk_ms / 1000)
+    await response.write(b"data: [DONE]\n\n")
+    await response.write_eof()
+    return response
+
+
+async def gemini_generate(request: web.Request) -> web.Response:
+    """POST /v1beta/models/{model}:generateContent"""
+    config = request.app["config"]
+    body = await request.json()
+    await asyncio.sleep(config.latency())
+    failure = config.failure()
+    if failure is not None:
+        return failure
+
+    prompt = "".join(part.get("text", "") for part in body["contents"][-1]["parts"])
+    summary = fake_summary(prompt)
+    return web.json_response({
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": summary}]},
+            "finishReason": "STOP"
+        }],
+        "usageMetadata": {
+            "promptTokenCount": estimate_tokens(prompt),
+            "candidatesTokenCount": estimate_tokens(summary),
+            "totalTokenCount": estimate_tokens(prompt) + estimate_tokens(summary)
+        }
+    })
+
+
+async def stats(request: web.Request) -> web.Response:
+    return web.json_response(request.app["config"].stats)
+
+
+async def control(request: web.Request) -> web.Response:
+    """POST /control with e.g. {"error_rate": 1.0} to change the profile at runtime"""
+    config = request.app["config"]
+    config.update(**await request.json())
+    return web.json_response({
+        "median_ms": config.median_ms,
+        "sigma": config.sigma,
+        "error_rate": config.error_rate,
+        "rate_limit_rate": config.rate_limit_rate
+    })
+
+
+def create_app(config: StubConfig) -> web.Application:
+    app = web.Application()
+    app["config"] = config
+    app.router.add_post("/v1/chat/completions", openai_chat)
+    app.router.add_post("/v1beta/models/{action}", gemini_generate)
+    app.router.add_get("/stats", stats)
+    app.router.add_post("/control", control)
+    return app
+
+
+class StubServer:
+    """Serve the stub providers from a background thread (for in-process benchmarks)"""
+
+    def __init__(self, config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._runner = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name="stub-providers", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def env(self) -> Dict[str, Any]:
+        """Environment variables that point the model adapters at this server"""
+        return {
+            "OPENAI_API_KEY": "stub",
+            "OPENAI_API_BASE": f"{self.base_url}/v1",
+            "GEMINI_API_KEY": "stub",
+            "GEMINI_API_BASE": self.base_url
+        }
+
+    def start(self) -> "StubServer":
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    async def _start(self):
+        self._runner = web.AppRunner(create_app(self.config), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        # Resolve the ephemeral port when started with port=0
+        self.port = self._runner.addresses[0][1]
+
+    def stop(self):
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--median-ms", type=float, default=300, help="Median response latency")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Lognormal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with a 429")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = StubConfig(args.median_ms, args.sigma, args.error_rate, args.rate_limit_rate, seed=args.seed)
+    print(f"🧪 Stub providers on http://{args.host}:{args.port} "
+          f"(median {args.median_ms:.0f} ms, sigma {args.sigma}, errors {args.error_rate:.0%})")
+    web.run_app(create_app(config), host=args.host, port=args.port, access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
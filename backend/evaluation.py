@@ -0,0 +1,51 @@
+import re
+from collections import Counter
+from typing import Dict, List
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, as used by the ROUGE scorers"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def f1_score(overlap: int, candidate_total: int, reference_total: int) -> Dict[str, float]:
+    """Precision/recall/F1 from an overlap count and the candidate and reference totals"""
+    precision = overlap / candidate_total if candidate_total else 0.0
+    recall = overlap / reference_total if reference_total else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": round(precision, 4), "recall": round(recall, 4), "f1": round(f1, 4)}
+
+
+def rouge_n(candidate: str, reference: str, n: int = 1) -> Dict[str, float]:
+    """ROUGE-N precision/recall/F1 of a candidate against a reference"""
+    candidate_tokens, reference_tokens = tokenize(candidate), tokenize(reference)
+    candidate_ngrams = Counter(zip(*(candidate_tokens[i:] for i in range(n))))
+    reference_ngrams = Counter(zip(*(reference_tokens[i:] for i in range(n))))
+    overlap = sum((candidate_ngrams & reference_ngrams).values())
+    return f1_score(overlap, sum(candidate_ngrams.values()), sum(reference_ngrams.values()))
+
+
+def rouge_l(candidate: str, reference: str) -> Dict[str, float]:
+    """ROUGE-L (longest common subsequence) precision/recall/F1"""
+    candidate_tokens, reference_tokens = tokenize(candidate), tokenize(reference)
+    previous = [0] * (len(reference_tokens) + 1)
+    for token in candidate_tokens:
+        current = [0]
+        for j, reference_token in enumerate(reference_tokens, start=1):
+            if token == reference_token:
+                current.append(previous[j - 1] + 1)
+            else:
+                current.append(max(previous[j], current[j - 1]))
+        previous = current
+    return f1_score(previous[-1], len(candidate_tokens), len(reference_tokens))
+
+
+def rouge_scores(candidate: str, reference: str) -> Dict[str, Dict[str, float]]:
+    """ROUGE-1, ROUGE-2 and ROUGE-L of a candidate against a reference"""
+    return {
+        "rouge1": rouge_n(candidate, reference, 1),
+        "rouge2": rouge_n(candidate, reference, 2),
+        "rougeL": rouge_l(candidate, reference)
+    }
@@ -0,0 +1,75 @@
+"""
+Production server settings. Run from the backend directory:
+    gunicorn -c gunicorn.conf.py app:app
+
+Threaded workers (gthread) suit this app: requests mostly wait on provider
+calls and streams, each of which holds a thread, not a whole process.
+
+With preloading on, the master imports the app and loads and warms the
+prewarmed models (PREWARM_PROVIDERS, HF_PREWARM_MODELS) before forking,
+so every worker starts ready and shares the model weights copy-on-write.
+The event loop and background writer threads are restarted in each worker
+after the fork. Preloading is off by default with HF_WORKERS (the HF
+worker processes belong to one server process) and must be turned off
+for models on a GPU, since CUDA can't be used across a fork.
+
+On SIGTERM each worker reports not ready, stops accepting connections,
+lets in-flight battles and streams finish (up to WEB_GRACEFUL_TIMEOUT)
+and flushes their history writes before exiting.
+"""
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '5001')}"
+worker_class = "gthread"
+workers = int(os.getenv("WEB_WORKERS", "2"))
+threads = int(os.getenv("WEB_THREADS", "32"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+backlog = int(os.getenv("WEB_BACKLOG", "2048"))
+# gthread workers heartbeat from their main loop, so this only catches a wedged worker
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+# The end of the graceful window kept for flushing history writes, before the master's SIGKILL
+drain_flush_reserve = min(5.0, graceful_timeout / 4)
+accesslog = os.getenv("WEB_ACCESS_LOG", "-") or None
+
+hf_workers = int(os.getenv("HF_WORKERS", "0"))
+preload_app = os.getenv("WEB_PRELOAD", "0" if hf_workers > 0 else "1") == "1"
+if preload_app and hf_workers > 0:
+    raise ValueError("WEB_PRELOAD=1 can't be combined with HF_WORKERS; the HF worker pool can't be shared across a fork")
+if preload_app:
+    # Tells battle.py to warm in the foreground instead of in a background thread
+    os.environ["SERVER_PRELOAD"] = "1"
+
+if workers > 1 and not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+    # Must be set before prometheus_client is imported; /metrics then aggregates all workers
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="battle-metrics-")
+
+
+def when_ready(server):
+    server.log.info(f"Serving with {workers} workers x {threads} threads (preload {'on' if preload_app else 'off'})")
+
+
+def post_worker_init(worker):
+    # Runs after gunicorn installs its own signal handlers; ours chains to its graceful stop
+    from serving import serving_state
+    serving_state.drain_on()
+    # The worker's own wait for open connections stops short of the master's deadline,
+    # leaving drain_flush_reserve seconds for worker_exit (this only changes the worker's copy)
+    worker.cfg.set("graceful_timeout", max(1, int(graceful_timeout - drain_flush_reserve)))
+
+
+def worker_exit(server, worker):
+    # Measured from the SIGTERM, so this and gunicorn's own wait share one graceful_timeout
+    from serving import serving_state
+    serving_state.drain(timeout=graceful_timeout, flush_reserve=drain_flush_reserve)
+
+
+def child_exit(server, worker):
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+JSON_MIMETYPE = "application/json"
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> List[str]:
+    """Content codings the client accepts (q > 0), most preferred first; brotli wins ties"""
+    preference = {"br": 0, "gzip": 1, "identity": 2}
+    accepted = []
+    for entry in (accept_encoding or "").split(","):
+        coding, _, params = entry.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.append((-quality, preference.get(coding, 3), coding))
+    return [coding for _, _, coding in sorted(accepted)]
+
+
+def negotiate(accept_encoding: Optional[str], available) -> Optional[str]:
+    """The client's most preferred coding that we can send, or None to send the body as is"""
+    for coding in accepted_encodings(accept_encoding):
+        if coding == "identity":
+            return None
+        if coding == "*":
+            return next((c for c in ("br", "gzip") if c in available), None)
+        if coding in available:
+            return coding
+    return None
+
+
+def compress(body: bytes, coding: str, level: int) -> bytes:
+    if coding == "br":
+        # Brotli qualities run 0-11; map the 1-9 gzip-style level onto them
+        return brotli.compress(body, quality=min(11, level + 2))
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+def available_codings() -> List[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison: W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class EncodedPayload:
+    """
+    A JSON response serialized once and compressed once per coding, each
+    with a strong ETag (the hash of the JSON plus the coding, since the
+    bytes on the wire differ).
+    """
+
+    def __init__(self, data: Any, cache_control: str = "no-cache", level: int = 9):
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        self.cache_control = cache_control
+        self.bodies = {None: body}
+        self.etags = {None: f'"{digest}"'}
+        for coding in available_codings():
+            self.bodies[coding] = compress(body, coding, level)
+            self.etags[coding] = f'"{digest}-{coding}"'
+
+    def respond(self, request) -> Response:
+        """200 with the best encoding the client accepts, or 304 when its cached copy is current"""
+        coding = negotiate(request.headers.get("Accept-Encoding"), self.bodies)
+        headers = {"ETag": self.etags[coding], "Cache-Control": self.cache_control, "Vary": "Accept-Encoding"}
+        if etag_matches(request.headers.get("If-None-Match"), self.etags[coding]):
+            return Response(status=304, headers=headers)
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(self.bodies[coding], mimetype=JSON_MIMETYPE, headers=headers)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {coding or "identity": len(body) for coding, body in self.bodies.items()}
+
+
+class PayloadCache:
+    """
+    EncodedPayloads for endpoints whose data only changes with its source,
+    e.g. the model listing, rebuilt when the registry hands back a new one
+    """
+
+    def __init__(self):
+        self._payloads = {}  # name -> (source, EncodedPayload)
+        self._lock = threading.Lock()
+
+    def get(self, name: str, source: Any, build: Callable[[Any], Any] = lambda source: source,
+            cache_control: str = "no-cache") -> EncodedPayload:
+        """The payload for this exact source object, encoding build(source) on first use"""
+        cached = self._payloads.get(name)
+        if cached is not None and cached[0] is source:
+            return cached[1]
+        payload = EncodedPayload(build(source), cache_control)
+        with self._lock:
+            self._payloads[name] = (source, payload)
+        return payload
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            payloads = dict(self._payloads)
+        return {name: payload.get_stats() for name, (_, payload) in payloads.items()}
+
+
+class ResponseCompressor:
+    """Negotiated compression for dynamic JSON responses, e.g. /api/summarize results"""
+
+    def __init__(self, enabled: bool = True, min_bytes: int = 1024, level: int = 5):
+        self.enabled = enabled
+        self.min_bytes = min_bytes
+        self.level = level
+
+    @classmethod
+    def from_env(cls):
+        """Build the compressor from RESPONSE_COMPRESSION* environment variables"""
+        return cls(
+            enabled=os.getenv("RESPONSE_COMPRESSION", "1") == "1",
+            min_bytes=int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1024")),
+            level=int(os.getenv("RESPONSE_COMPRESSION_LEVEL", "5"))
+        )
+
+    def respond(self, request, body: str) -> Response:
+        """A JSON response, compressed when it's large enough and the client accepts it"""
+        data = body.encode("utf-8")
+        coding = None
+        if self.enabled and len(data) >= self.min_bytes:
+            coding = negotiate(request.headers.get("Accept-Encoding"), available_codings())
+        if coding is None:
+            return Response(data, mimetype=JSON_MIMETYPE, headers={"Vary": "Accept-Encoding"})
+        return Response(compress(data, coding, self.level), mimetype=JSON_MIMETYPE,
+                        headers={"Content-Encoding": coding, "Vary": "Accept-Encoding"})
@@ -0,0 +1,124 @@
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess, CONTENT_TYPE_LATEST
+
+from model_registry import get_model_registry
+
+# Stages: request_parse, queue_wait, model_load, tokenization, generation,
+# provider_network, serialization, compression, summarize (one model end to end)
+# and quality_scoring (off the request path)
+STAGE_SECONDS = Histogram(
+    "battle_stage_seconds",
+    "Time spent in each stage of the summarization pipeline",
+    ["stage", "model_id", "outcome"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+MODEL_CALLS = Counter(
+    "battle_model_calls_total",
+    "Summarization calls per model",
+    ["model_id", "outcome", "cached"]
+)
+COALESCED_CALLS = Counter(
+    "battle_coalesced_calls_total",
+    "Calls that joined an identical in-flight summary instead of starting one",
+    ["model_id", "mode"]
+)
+REQUESTS = Counter(
+    "battle_requests_total",
+    "API requests by endpoint",
+    ["endpoint", "outcome"]
+)
+
+ADMISSIONS = Counter(
+    "battle_admissions_total",
+    "Admission control decisions per model: admitted, queued, shed_queue_full, shed_deadline",
+    ["model_id", "outcome"]
+)
+
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def model_label(model_id: str) -> str:
+    """The model_id label for a metric: ids outside the registry share "unknown", so clients can't add series"""
+    if model_id == "-" or get_model_registry().find(model_id) is not None:
+        return model_id
+    return "unknown"
+
+
+class Trace:
+    """Per-request breakdown of stage timings, returned when debug is on"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, model_id: str, outcome: str):
+        with self._lock:
+            self.spans.append({
+                "stage": stage,
+                "model_id": model_id,
+                "seconds": round(seconds, 4),
+                "outcome": outcome
+            })
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        return {"elapsed": round(time.perf_counter() - self.started, 4), "spans": spans}
+
+
+def record_stage(stage: str, seconds: float, model_id: str = "-", outcome: str = "success"):
+    """Observe a stage duration and add it to the current request's trace, if any"""
+    STAGE_SECONDS.labels(stage, model_label(model_id), outcome).observe(seconds)
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds, model_id, outcome)
+
+
+@contextlib.contextmanager
+def stage(name: str, model_id: str = "-"):
+    """Time a block as one pipeline stage; exceptions mark it as an error"""
+    start = time.perf_counter()
+    outcome = "success"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        record_stage(name, time.perf_counter() - start, model_id, outcome)
+
+
+def record_timings(timings: Optional[Dict[str, float]], model_id: str, outcome: str = "success"):
+    """Record stage timings measured elsewhere (e.g. inside a shared HF batch)"""
+    for name, seconds in (timings or {}).items():
+        record_stage(name, seconds, model_id, outcome)
+
+
+def record_model_call(model_id: str, result: Dict[str, Any], seconds: float):
+    """Count one model result and observe its end-to-end time"""
+    outcome = "success" if result.get("success") else "error"
+    MODEL_CALLS.labels(model_label(model_id), outcome, str(bool(result.get("cached"))).lower()).inc()
+    record_stage("summarize", seconds, model_id, outcome)
+
+
+async def run_traced(coro, trace: Optional[Trace]):
+    """Await a coroutine on the shared loop with the request's trace in context"""
+    current_trace.set(trace)
+    return await coro
+
+
+def render_metrics():
+    """Prometheus exposition payload and content type"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        # Several server workers: aggregate every process's samples, not just this one's
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
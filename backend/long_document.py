@@ -0,0 +1,130 @@
+import asyncio
+import os
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n{2,}")
+MAX_REDUCE_LEVELS = 3
+
+
+def _split_oversized(sentence: str, count_tokens: Callable[[str], int], max_tokens: int) -> List[str]:
+    """Split a single sentence that alone exceeds the budget on word boundaries"""
+    words = sentence.split()
+    pieces = []
+    while words:
+        # Start from a proportional guess and shrink until it fits
+        size = max(1, int(len(words) * max_tokens / max(count_tokens(" ".join(words)), 1)))
+        while size > 1 and count_tokens(" ".join(words[:size])) > max_tokens:
+            size = max(1, int(size * 0.9))
+        pieces.append(" ".join(words[:size]))
+        words = words[size:]
+    return pieces
+
+
+def split_into_chunks(text: str, count_tokens: Callable[[str], int], max_tokens: int,
+                      overlap_tokens: int = 0) -> List[str]:
+    """
+    Pack whole sentences into chunks of at most max_tokens, as counted by the model's
+    tokenizer. Consecutive chunks share up to overlap_tokens of trailing sentences.
+    """
+    pieces = []
+    for sentence in SENTENCE_BOUNDARY.split(text):
+        sentence = " ".join(sentence.split())
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens > max_tokens:
+            pieces.extend((piece, count_tokens(piece)) for piece in _split_oversized(sentence, count_tokens, max_tokens))
+        else:
+            pieces.append((sentence, tokens))
+
+    chunks = []
+    current, current_tokens = [], 0
+    for piece, tokens in pieces:
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(" ".join(p for p, _ in current))
+            carry, carry_tokens = [], 0
+            for previous, previous_tokens in reversed(current):
+                if carry_tokens + previous_tokens > overlap_tokens:
+                    break
+                carry.insert(0, (previous, previous_tokens))
+                carry_tokens += previous_tokens
+            if carry_tokens + tokens > max_tokens:
+                carry, carry_tokens = [], 0
+            current, current_tokens = carry, carry_tokens
+        current.append((piece, tokens))
+        current_tokens += tokens
+    if current:
+        chunks.append(" ".join(p for p, _ in current))
+    return chunks
+
+
+def total_usage(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summed token counts and cost over several calls' results (fields any call lacks are left out)"""
+    usage = {}
+    for field in ("input_tokens", "output_tokens", "estimated_cost"):
+        values = [result.get(field) for result in results]
+        if all(value is not None for value in values):
+            usage[field] = round(sum(values), 6) if field == "estimated_cost" else sum(values)
+    return usage
+
+
+async def summarize_long_async(text: str, model_id: str, handler,
+                               summarize: Callable[[str, str], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Map-reduce summarization: summarize tokenizer-sized chunks concurrently, then
+    summarize the joined chunk summaries (recursively, if they are still too long).
+
+    summarize(text, model_id) is the regular single-pass path, so chunk calls share
+    the summary cache, HF micro-batching and provider concurrency limits.
+    """
+    start_time = time.time()
+    max_tokens = await asyncio.to_thread(handler.get_context_budget, model_id)
+    overlap_tokens = min(int(os.getenv("LONG_DOC_OVERLAP_TOKENS", "64")), max_tokens // 8)
+    count_tokens = lambda chunk: handler.count_tokens(chunk, model_id)
+
+    stages = []
+    calls = []
+    current_text = text
+    for level in range(1, MAX_REDUCE_LEVELS + 1):
+        stage_start = time.time()
+        chunks = await asyncio.to_thread(split_into_chunks, current_text, count_tokens, max_tokens, overlap_tokens)
+        chunking_time = time.time() - stage_start
+
+        if len(chunks) <= 1:
+            break
+
+        map_start = time.time()
+        results = await asyncio.gather(*(summarize(chunk, model_id) for chunk in chunks))
+        failed = [result for result in results if not result.get("success")]
+        stages.append({
+            "level": level,
+            "chunks": len(chunks),
+            "chunking_time": round(chunking_time, 3),
+            "map_time": round(time.time() - map_start, 3)
+        })
+        if failed:
+            return dict(failed[0], long_document={"stages": stages})
+        calls.extend(results)
+
+        current_text = "\n".join(result["summary"] for result in results)
+
+    reduce_start = time.time()
+    result = await summarize(current_text, model_id)
+    reduce_time = time.time() - reduce_start
+
+    result = dict(result)
+    result["processing_time"] = round(time.time() - start_time, 2)
+    if result.get("success"):
+        # Usage and cost cover every map and reduce call, not just the final one
+        result.update(total_usage(calls + [result]))
+    result["long_document"] = {
+        "chunks": stages[0]["chunks"] if stages else 1,
+        "levels": len(stages),
+        "chunk_token_budget": max_tokens,
+        "overlap_tokens": overlap_tokens,
+        "stages": stages,
+        "reduce_time": round(reduce_time, 3)
+    }
+    return result
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+import tomllib
+from importlib.metadata import entry_points
+from typing import Any, Dict, List, Optional
+
+# Adapters shipped with the app: provider -> "module:Class"
+BUILTIN_PROVIDERS = {
+    "openai": "models.openai_model:OpenAIModel",
+    "gemini": "models.gemini_model:GeminiModel",
+    "huggingface": "models.huggingface_models:HuggingFaceModels"
+}
+
+# Third-party adapters register under this entry point group, e.g. in pyproject.toml:
+#   [project.entry-points."llm_battle.providers"]
+#   mistral = "battle_mistral.adapter:MistralModel"
+PLUGIN_GROUP = "llm_battle.providers"
+
+CATEGORIES = ("closed_source", "open_source")
+DEFAULT_CATEGORY = {"openai": "closed_source", "gemini": "closed_source", "huggingface": "open_source"}
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.toml")
+
+SPEC_KEYS = {
+    "id", "name", "provider", "category", "enabled", "params", "max_concurrency", "max_queue", "timeout",
+    "backend", "device", "draft_model", "batch_max_size", "batch_wait_ms",
+    "max_input_tokens", "input_price", "output_price"
+}
+
+
+class ModelSpec:
+    """One model's entry in the registry"""
+
+    def __init__(self, id: str, name: str, provider: str, category: str, enabled: bool = True,
+                 params: Optional[Dict[str, Any]] = None, max_concurrency: Optional[int] = None,
+                 max_queue: Optional[int] = None, timeout: Optional[float] = None, backend: Optional[str] = None,
+                 device: Optional[str] = None, draft_model: Optional[str] = None,
+                 batch_max_size: Optional[int] = None, batch_wait_ms: Optional[float] = None,
+                 max_input_tokens: Optional[int] = None, input_price: Optional[float] = None,
+                 output_price: Optional[float] = None):
+        self.id = id
+        self.name = name
+        self.provider = provider
+        self.category = category
+        self.enabled = enabled
+        self.params = params or {}
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.backend = backend
+        self.device = device
+        self.draft_model = draft_model
+        self.batch_max_size = batch_max_size
+        self.batch_wait_ms = batch_wait_ms
+        self.max_input_tokens = max_input_tokens
+        # USD per million tokens
+        self.input_price = input_price
+        self.output_price = output_price
+
+    @classmethod
+    def from_dict(cls, entry: Dict[str, Any], providers: Dict[str, str]) -> "ModelSpec":
+        """Validate one [[models]] table"""
+        for key in ("id", "provider"):
+            if not entry.get(key):
+                raise ValueError(f"Model entry {entry} is missing '{key}'")
+        unknown = set(entry) - SPEC_KEYS
+        if unknown:
+            raise ValueError(f"Model {entry['id']}: unknown settings {', '.join(sorted(unknown))}")
+        if entry["provider"] not in providers:
+            raise ValueError(f"Model {entry['id']}: unknown provider '{entry['provider']}'")
+        category = entry.get("category") or DEFAULT_CATEGORY.get(entry["provider"], "closed_source")
+        if category not in CATEGORIES:
+            raise ValueError(f"Model {entry['id']}: category must be one of {', '.join(CATEGORIES)}")
+        if entry.get("max_concurrency") is not None and entry["max_concurrency"] < 1:
+            raise ValueError(f"Model {entry['id']}: max_concurrency must be at least 1")
+        if entry.get("max_queue") is not None and entry["max_queue"] < 1:
+            raise ValueError(f"Model {entry['id']}: max_queue must be at least 1")
+        if entry.get("max_input_tokens") is not None and entry["max_input_tokens"] < 1:
+            raise ValueError(f"Model {entry['id']}: max_input_tokens must be at least 1")
+        return cls(**dict(entry, name=entry.get("name") or entry["id"], category=category))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: value for key, value in vars(self).items() if value is not None}
+
+    def estimate_cost(self, input_tokens: Optional[int], output_tokens: Optional[int]) -> Optional[float]:
+        """Estimated USD cost of one call, or None when the model has no prices"""
+        if self.input_price is None and self.output_price is None:
+            return None
+        cost = (input_tokens or 0) * (self.input_price or 0) + (output_tokens or 0) * (self.output_price or 0)
+        return round(cost / 1_000_000, 6)
+
+
+def discover_providers() -> Dict[str, str]:
+    """Built-in adapters plus any installed plugins"""
+    providers = dict(BUILTIN_PROVIDERS)
+    for entry_point in entry_points(group=PLUGIN_GROUP):
+        providers[entry_point.name] = entry_point.value
+    return providers
+
+
+class ModelRegistry:
+    """
+    Maps model ids to the adapter that serves them and their settings, loaded
+    from a TOML file.
+
+    Lookups are a dict access. The file's mtime is checked at most every
+    reload_interval seconds and a changed file is loaded into a new snapshot
+    that replaces the old one in a single assignment, so readers never see a
+    half-applied config. A file that fails to parse is reported and the
+    previous snapshot stays in use.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, reload_interval: float = 2.0):
+        self.path = path
+        self.reload_interval = reload_interval
+        self.providers = discover_providers()
+        self._lock = threading.Lock()
+        self._snapshot = {"models": {}, "listing": {category: [] for category in CATEGORIES}, "version": 0}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._last_error = None
+        self.load()
+
+    @classmethod
+    def from_env(cls):
+        """Build the registry from MODEL_REGISTRY_* environment variables"""
+        return cls(
+            path=os.getenv("MODEL_REGISTRY_PATH") or DEFAULT_PATH,
+            reload_interval=float(os.getenv("MODEL_REGISTRY_RELOAD_SECONDS", "2"))
+        )
+
+    def _parse(self) -> Dict[str, ModelSpec]:
+        with open(self.path, "rb") as f:
+            config = tomllib.load(f)
+        entries = list(config.get("models", []))
+        # Extra seq2seq checkpoints (e.g. a tiny local model for benchmarks)
+        for model_id in os.getenv("HF_EXTRA_MODELS", "").split(","):
+            if model_id.strip() and not any(entry.get("id") == model_id.strip() for entry in entries):
+                entries.append({"id": model_id.strip(), "name": model_id.strip().split("/")[-1], "provider": "huggingface"})
+
+        models = {}
+        for entry in entries:
+            spec = ModelSpec.from_dict(entry, self.providers)
+            if spec.id in models:
+                raise ValueError(f"Model {spec.id} is defined more than once")
+            models[spec.id] = spec
+        return models
+
+    def load(self) -> bool:
+        """(Re)load the file; returns False and keeps the current models if it is invalid"""
+        with self._lock:
+            mtime = None
+            try:
+                mtime = os.path.getmtime(self.path)
+                self.providers = discover_providers()
+                models = self._parse()
+            except Exception as e:
+                # Don't retry the same broken file on every check; wait for the next edit
+                self._mtime = mtime
+                self._last_error = f"{type(e).__name__}: {e}"
+                print(f"⚠️  Failed to load model registry {self.path}: {self._last_error}")
+                return False
+
+            listing = {category: [] for category in CATEGORIES}
+            for spec in models.values():
+                if spec.enabled:
+                    listing[spec.category].append({"id": spec.id, "name": spec.name})
+            self._snapshot = {"models": models, "listing": listing, "version": self._snapshot["version"] + 1}
+            self._mtime = mtime
+            self._checked_at = time.monotonic()
+            self._last_error = None
+            return True
+
+    def maybe_reload(self):
+        """Reload if the file changed, checking at most every reload_interval seconds"""
+        if self.reload_interval <= 0 or time.monotonic() - self._checked_at < self.reload_interval:
+            return
+        self._checked_at = time.monotonic()
+        try:
+            changed = os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return
+        if changed:
+            print(f"🔄 Model registry {self.path} changed; reloading")
+            self.load()
+
+    def get(self, model_id: str) -> ModelSpec:
+        """The enabled model with this id"""
+        self.maybe_reload()
+        spec = self._snapshot["models"].get(model_id)
+        if spec is None or not spec.enabled:
+            raise ValueError(f"Unknown model: {model_id}")
+        return spec
+
+    def find(self, model_id: str) -> Optional[ModelSpec]:
+        """Like get(), but None for unknown (or disabled) models"""
+        try:
+            return self.get(model_id)
+        except ValueError:
+            return None
+
+    def list_models(self, provider: Optional[str] = None) -> List[ModelSpec]:
+        """Enabled models, optionally for one provider"""
+        self.maybe_reload()
+        return [
+            spec for spec in self._snapshot["models"].values()
+            if spec.enabled and (provider is None or spec.provider == provider)
+        ]
+
+    def get_listing(self) -> Dict[str, List[Dict[str, str]]]:
+        """The /api/models payload, built once per load"""
+        self.maybe_reload()
+        return self._snapshot["listing"]
+
+    def get_stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "path": self.path,
+            "version": snapshot["version"],
+            "models": len(snapshot["models"]),
+            "providers": self.providers,
+            "reload_interval": self.reload_interval,
+            "last_error": self._last_error
+        }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry.from_env()
+        return _registry
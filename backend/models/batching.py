@@ -0,0 +1,153 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+
+class MicroBatcher:
+    """
+    Collects requests that arrive within a short window and runs them as one batch.
+
+    Callers block in submit() (or await the future from enqueue()) until the batch
+    containing their item has run. run_batch receives a list of items and must
+    return one result per item, in order. When an executor is given, batches run
+    on it so inference concurrency is bounded across all models; up to
+    max_in_flight batches of this queue may run at once (e.g. one per worker
+    process).
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 8, max_wait_ms: float = 20, executor=None,
+                 max_in_flight: int = 1):
+        self.name = name
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.max_in_flight = max(1, int(max_in_flight)) if executor else 1
+        self._queue = queue.Queue()
+        self._slots = threading.Semaphore(self.max_in_flight)
+        self._lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "max_batch_size_seen": 0,
+            "total_wait_time": 0.0,
+            "max_wait_time": 0.0,
+            "batch_size_counts": {}
+        }
+        self._worker = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._worker.start()
+
+    def enqueue(self, item: Any) -> Future:
+        """Queue an item; the future resolves to its result along with batch details"""
+        future = Future()
+        self._queue.put((item, future, time.time()))
+        return future
+
+    def submit(self, item: Any) -> Dict[str, Any]:
+        """Queue an item and wait for its result along with batch details"""
+        return self.enqueue(item).result()
+
+    def _collect(self):
+        first = self._queue.get()
+        batch = [first]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Items keep accumulating into the next batch while no slot is free
+            self._slots.acquire()
+            try:
+                self._run_once()
+            except Exception as e:
+                # One bad batch must not stop this model's batcher thread
+                print(f"⚠️  Batcher {self.name} failed to run a batch: {e}")
+                self._slots.release()
+
+    def _run_once(self):
+        # Callers that gave up while queued (client gone, timeout) are dropped; the
+        # rest can no longer be cancelled, so resolving them below can't fail
+        batch = [entry for entry in self._collect() if entry[1].set_running_or_notify_cancel()]
+        if not batch:
+            self._slots.release()
+            return
+        started = time.time()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        self._record(len(batch), waits)
+
+        items = [item for item, _, _ in batch]
+        if self.executor:
+            future = self.executor.submit(self.run_batch, items)
+            future.add_done_callback(lambda done, batch=batch, waits=waits: self._finish(batch, waits, done))
+        else:
+            future = Future()
+            try:
+                future.set_result(self.run_batch(items))
+            except Exception as e:
+                future.set_exception(e)
+            self._finish(batch, waits, future)
+
+    def _finish(self, batch, waits, done: Future):
+        """Resolve each caller's future from a finished batch"""
+        self._slots.release()
+        try:
+            results = done.result()
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} inputs")
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result, wait in zip(batch, results, waits):
+            if not future.done():
+                future.set_result({
+                    "result": result,
+                    "batch_size": len(batch),
+                    "queue_wait": wait
+                })
+
+    def _record(self, size, waits):
+        with self._lock:
+            stats = self._stats
+            stats["batches"] += 1
+            stats["items"] += size
+            stats["max_batch_size_seen"] = max(stats["max_batch_size_seen"], size)
+            stats["total_wait_time"] += sum(waits)
+            stats["max_wait_time"] = max(stats["max_wait_time"], max(waits))
+            stats["batch_size_counts"][size] = stats["batch_size_counts"].get(size, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue depth, batch size and wait time metrics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["batch_size_counts"] = dict(self._stats["batch_size_counts"])
+        items = stats.pop("items")
+        batches = stats["batches"]
+        total_wait = stats.pop("total_wait_time")
+        return {
+            "model": self.name,
+            "queue_depth": self._queue.qsize(),
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "max_in_flight": self.max_in_flight,
+            "batches": batches,
+            "requests": items,
+            "avg_batch_size": round(items / batches, 2) if batches else 0.0,
+            "max_batch_size_seen": stats["max_batch_size_seen"],
+            "avg_wait_ms": round(total_wait / items * 1000, 2) if items else 0.0,
+            "max_wait_ms_seen": round(stats["max_wait_time"] * 1000, 2),
+            "batch_size_counts": stats["batch_size_counts"]
+        }
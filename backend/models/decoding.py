@@ -0,0 +1,34 @@
+import os
+from typing import Dict, Optional
+
+# quality:  beam search with 4 beams, the reference setting
+# balanced: beam search with 2 beams
+# fast:     greedy search, assisted by a small draft model when one is configured
+#           (speculative decoding: the draft proposes tokens and the full model
+#           verifies them in one forward pass, so the output matches plain greedy)
+PROFILES = ("quality", "balanced", "fast")
+
+
+def parse_profile(profile: Optional[str]) -> str:
+    """Validate a decoding profile name, falling back to HF_DEFAULT_PROFILE"""
+    profile = profile or os.getenv("HF_DEFAULT_PROFILE", "quality")
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown decoding profile '{profile}'; expected one of {', '.join(PROFILES)}")
+    return profile
+
+
+def draft_model_overrides() -> Dict[str, Optional[str]]:
+    """
+    HF_DRAFT_MODELS="model=draft,..." overrides the registry's draft_model
+    settings; an empty draft disables assisted decoding for that model.
+    Draft models must share their target's tokenizer, as assisted generation requires.
+    """
+    overrides = {}
+    for entry in os.getenv("HF_DRAFT_MODELS", "").split(","):
+        if not entry.strip():
+            continue
+        model_name, separator, draft = entry.partition("=")
+        if not separator or not model_name.strip():
+            raise ValueError(f"Invalid HF draft model setting '{entry}'; expected model_id=draft_model_id")
+        overrides[model_name.strip()] = draft.strip() or None
+    return overrides
@@ -1,47 +1,108 @@
 import google.generativeai as genai
+import asyncio
 import os
-from typing import Dict, Any
+import threading
+from typing import Dict, Any, AsyncIterator
 import time
+from async_runtime import get_runtime
+from provider_client import ProviderError
+from model_registry import get_model_registry
+from preprocessing import token_usage
 
 class GeminiModel:
     def __init__(self):
         api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
+        self.api_key = api_key
+        # Talk to a REST endpoint (e.g. a proxy or the local benchmark stub) instead of the SDK
+        self.api_base = os.getenv('GEMINI_API_BASE')
+        # One SDK model object per registry entry, created on first use
+        self.models = {}
+        # SDK setup happens on first use, off the startup path
+        self.configured = False
+        self._configure_lock = threading.Lock()
+        if api_key and self.api_base:
+            self.configured = True
+            print(f"✅ Using Gemini REST endpoint {self.api_base}")
+        elif not api_key:
             print("⚠️  Warning: GEMINI_API_KEY not found in environment variables")
-            self.model = None
-            self.available_models = []
-        else:
+            self.configured = True
+    
+    @property
+    def client(self):
+        """The runtime's Gemini client (looked up per call; a forked server worker builds its own)"""
+        return get_runtime().get_client("gemini")
+    
+    @property
+    def limit(self):
+        return self.client.limit
+    
+    def discover(self):
+        """Configure the SDK and create the registered Gemini models (once)"""
+        with self._configure_lock:
+            if self.configured:
+                return
             try:
-                genai.configure(api_key=api_key)
-                
-                # Try different model names that are currently available
-                model_names = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro']
-                self.model = None
-                
-                for model_name in model_names:
-                    try:
-                        self.model = genai.GenerativeModel(model_name)
-                        self.model_name = model_name
-                        print(f"✅ Successfully initialized Gemini model: {model_name}")
-                        break
-                    except Exception as e:
-                        print(f"⚠️  Model {model_name} not available: {e}")
-                        continue
-                
-                if not self.model:
-                    print("⚠️  Warning: No available Gemini models found")
-                    
+                genai.configure(api_key=self.api_key)
+                for spec in get_model_registry().list_models("gemini"):
+                    self._get_model(spec.id)
             except Exception as e:
                 print(f"⚠️  Warning: Failed to initialize Gemini client: {e}")
-                self.model = None
+            self.configured = True
+    
+    def _get_model(self, model_name: str):
+        params = self.get_generation_params(model_name)
+        cached = self.models.get(model_name)
+        # Rebuilt when the registry's generation config for the model changes
+        if cached is None or cached[0] != params:
+            cached = (params, genai.GenerativeModel(model_name, generation_config=params or None))
+            self.models[model_name] = cached
+            print(f"✅ Successfully initialized Gemini model: {model_name}")
+        return cached[1]
+    
+    async def _ensure_client(self) -> bool:
+        """Set up the SDK on first use (in a thread) and report whether Gemini can be called"""
+        if not self.configured:
+            await asyncio.to_thread(self.discover)
+        return bool(self.api_key)
+    
+    def build_prompt(self, text: str) -> str:
+        """Build the summarization prompt"""
+        # Create summarization prompt
+        return f"""Please provide a concise and clear summary of the following text. 
+            Focus on extracting the main points and key information while maintaining accuracy.
+            Keep the summary informative but concise.
+            
+            Text to summarize:
+            {text}
+            
+            Provide a summary:"""
         
+    def prepare_input(self, text: str, model_name: str) -> Dict[str, Any]:
+        """The text cut to the model's max_input_tokens (estimated), and the prompt's estimated token count"""
+        budget = get_model_registry().get(model_name).max_input_tokens
+        text_tokens = self.count_tokens(text, model_name)
+        truncated_from = None
+        if budget and text_tokens > budget:
+            text, truncated_from, text_tokens = text[:budget * 4], text_tokens, budget
+        return {
+            "text": text,
+            "input_tokens": self.count_tokens(self.build_prompt(""), model_name) + text_tokens,
+            "truncated_from": truncated_from
+        }
+    
     def summarize(self, text: str, model_name: str = "gemini-1.5-flash") -> Dict[str, Any]:
+        """
+        Summarize text using Google Gemini (blocking wrapper around summarize_async)
+        """
+        return get_runtime().run(self.summarize_async(text, model_name))
+    
+    async def summarize_async(self, text: str, model_name: str = "gemini-1.5-flash") -> Dict[str, Any]:
         """
         Summarize text using Google Gemini
         """
         start_time = time.time()
         
-        if not self.model:
+        if not await self._ensure_client():
             return {
                 "summary": "Error: Gemini client not initialized. Please check your API key or model availability.",
                 "model_name": "Google Gemini",
@@ -51,44 +112,110 @@ class GeminiModel:
             }
         
         try:
-            # Create summarization prompt
-            prompt = f"""Please provide a concise and clear summary of the following text. 
-            Focus on extracting the main points and key information while maintaining accuracy.
-            Keep the summary informative but concise.
+            prepared = self.prepare_input(text, model_name)
+            prompt = self.build_prompt(prepared["text"])
+            # Deadline, retries, hedging and circuit breaking come from the shared client
+            response_text, usage = await self.client.call(lambda: self._generate(prompt, model_name), model_name)
             
-            Text to summarize:
-            {text}
-            
-            Provide a summary:"""
-            
-            response = self.model.generate_content(prompt)
             processing_time = time.time() - start_time
             
-            summary = response.text.strip()
+            summary = response_text.strip()
             
-            return {
+            # Counted by the API when it reports usage, else estimated
+            return dict({
                 "summary": summary,
-                "model_name": f"Google {self.model_name}",
+                "model_name": f"Google {model_name}",
                 "processing_time": round(processing_time, 2),
                 "success": True
-            }
+            }, **token_usage(
+                model_name,
+                usage.get("promptTokenCount") or prepared["input_tokens"],
+                usage.get("candidatesTokenCount") or self.count_tokens(summary, model_name),
+                prepared["truncated_from"]
+            ))
             
         except Exception as e:
             return {
                 "summary": f"Error: {str(e)}",
-                "model_name": f"Google {getattr(self, 'model_name', 'Gemini')}",
+                "model_name": f"Google {model_name}",
                 "processing_time": time.time() - start_time,
                 "success": False,
                 "error": str(e)
             }
     
+    async def _generate(self, prompt: str, model_name: str):
+        """Generate a completion through the SDK or the configured REST endpoint; returns (text, usage)"""
+        if not self.api_base:
+            # The async client keeps its gRPC channel open between calls
+            response = await self._get_model(model_name).generate_content_async(
+                prompt,
+                request_options={"timeout": self.limit.timeout_for(model_name)}
+            )
+            metadata = getattr(response, "usage_metadata", None)
+            usage = {
+                "promptTokenCount": getattr(metadata, "prompt_token_count", None),
+                "candidatesTokenCount": getattr(metadata, "candidates_token_count", None)
+            }
+            return response.text, usage
+        
+        url = f"{self.api_base.rstrip('/')}/v1beta/models/{model_name}:generateContent"
+        session = get_runtime().get_session("gemini")
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        params = self.get_generation_params(model_name)
+        if params:
+            payload["generationConfig"] = params
+        async with session.post(url, params={"key": self.api_key}, json=payload) as response:
+            if response.status != 200:
+                raise ProviderError(
+                    f"Gemini API error {response.status}: {await response.text()}",
+                    status=response.status,
+                    retry_after=response.headers.get("Retry-After")
+                )
+            data = await response.json()
+        text = "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
+        return text, data.get("usageMetadata") or {}
+    
+    async def stream_summary(self, text: str, model_name: str = "gemini-1.5-flash") -> AsyncIterator[str]:
+        """
+        Yield summary text chunks as Gemini streams them back
+        """
+        if not await self._ensure_client():
+            raise RuntimeError("Gemini client not initialized")
+        
+        if self.api_base:
+            # The REST path doesn't stream; emit the whole summary as one chunk
+            prompt = self.build_prompt(self.prepare_input(text, model_name)["text"])
+            response_text, _ = await self.client.call(lambda: self._generate(prompt, model_name), model_name)
+            yield response_text.strip()
+            return
+        
+        # Streams can't be retried once tokens are out, but still feed the circuit breaker
+        async with self.client.guard(), self.limit.slot(model_name):
+            response = await self.limit.wait(self._get_model(model_name).generate_content_async(
+                self.build_prompt(self.prepare_input(text, model_name)["text"]),
+                stream=True,
+                request_options={"timeout": self.limit.timeout_for(model_name)}
+            ), model_name)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+    
+    def count_tokens(self, text: str, model_name: str) -> int:
+        """Estimate tokens locally (~4 characters per token); exact counts need a network call"""
+        return len(text) // 4 + 1
+    
+    def get_context_budget(self, model_name: str) -> int:
+        """Input tokens per chunk in long-document mode"""
+        return int(os.getenv("LONG_DOC_API_CHUNK_TOKENS", "3000"))
+    
+    def get_readable_name(self, model_name: str) -> str:
+        """Convert model ID to readable name"""
+        return f"Google {model_name}"
+    
+    def get_generation_params(self, model_name: str) -> Dict[str, Any]:
+        """Return the generation config used for a model (from the model registry)"""
+        return dict(get_model_registry().get(model_name).params)
+    
     def get_available_models(self):
         """Return list of available Gemini models"""
-        if hasattr(self, 'model_name') and self.model_name:
-            return [
-                {"id": self.model_name, "name": f"Gemini {self.model_name.replace('gemini-', '').title()}"}
-            ]
-        else:
-            return [
-                {"id": "gemini-1.5-flash", "name": "Gemini 1.5 Flash"}
-            ] 
\ No newline at end of file
+        return [{"id": spec.id, "name": spec.name} for spec in get_model_registry().list_models("gemini")]
@@ -0,0 +1,166 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+import torch
+from transformers import pipeline, AutoTokenizer
+
+# eager:   float32 on CPU (float16 on CUDA), the reference path
+# int8:    dynamic int8 quantization of nn.Linear layers (CPU only)
+# bf16:    bfloat16 weights, used only when the CPU has native bf16 support
+# compile: eager weights with torch.compile'd forward
+# onnx:    ONNX Runtime export through optimum (optional dependency)
+BACKENDS = ("eager", "int8", "bf16", "compile", "onnx")
+
+
+def parse_backend_config(value: str) -> Dict[str, str]:
+    """Parse "model_id=backend,model_id=backend" into a dict"""
+    config = {}
+    for entry in (value or "").split(","):
+        if not entry.strip():
+            continue
+        model_name, _, backend = entry.rpartition("=")
+        backend = backend.strip()
+        if not model_name or backend not in BACKENDS:
+            raise ValueError(f"Invalid HF backend setting '{entry}'; expected model_id=<{'|'.join(BACKENDS)}>")
+        config[model_name.strip()] = backend
+    return config
+
+
+def bf16_supported() -> bool:
+    """Whether this CPU runs bfloat16 matmuls natively (AVX512-BF16 / AMX)"""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        pass
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+        return "avx512_bf16" in flags or "amx_bf16" in flags
+    except OSError:
+        return False
+
+
+def _safetensors_files(model_name: str) -> List[str]:
+    """Local paths of a model's safetensors checkpoint (downloaded if needed), or []"""
+    from transformers.utils import cached_file
+
+    single = cached_file(model_name, "model.safetensors", _raise_exceptions_for_missing_entries=False)
+    if single:
+        return [single]
+    index = cached_file(model_name, "model.safetensors.index.json", _raise_exceptions_for_missing_entries=False)
+    if not index:
+        return []
+    with open(index) as f:
+        shards = sorted(set(json.load(f)["weight_map"].values()))
+    return [cached_file(model_name, shard) for shard in shards]
+
+
+def load_mmap_model(model_name: str) -> Optional[torch.nn.Module]:
+    """
+    Build a float32 CPU model whose parameters are views of the memory-mapped
+    safetensors checkpoint instead of private copies. Processes that load the same
+    checkpoint share its page-cache pages, so N inference workers cost roughly one
+    copy of the weights. Returns None when the checkpoint can't be used this way.
+    """
+    from accelerate import init_empty_weights
+    from safetensors.torch import load_file
+    from transformers import AutoConfig, AutoModelForSeq2SeqLM, GenerationConfig
+
+    files = _safetensors_files(model_name)
+    if not files:
+        print(f"⚠️  No safetensors checkpoint for {model_name}; loading a private copy")
+        return None
+
+    state_dict = {}
+    for path in files:
+        # Tensors are backed by a copy-on-write mmap of the file; inference never writes them
+        state_dict.update(load_file(path, device="cpu"))
+    if any(t.is_floating_point() and t.dtype != torch.float32 for t in state_dict.values()):
+        print(f"⚠️  {model_name} checkpoint is not float32; loading a private copy")
+        return None
+
+    with init_empty_weights():
+        model = AutoModelForSeq2SeqLM.from_config(AutoConfig.from_pretrained(model_name))
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.tie_weights()
+    if any(p.is_meta for p in model.parameters()):
+        print(f"⚠️  {model_name} checkpoint doesn't cover every parameter; loading a private copy")
+        return None
+
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(model_name)
+    except OSError:
+        pass  # keep the defaults derived from config.json
+    return model.eval()
+
+
+def cuda_index(device: str) -> int:
+    """GPU index for a "cuda" or "cuda:N" device"""
+    _, _, index = device.partition(":")
+    return int(index) if index else 0
+
+
+def build_pipeline(model_name: str, backend: str = "eager", device: str = "cpu", mmap_weights: bool = False):
+    """Build a summarization pipeline for the requested inference backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HF backend: {backend}")
+
+    on_cuda = device.startswith("cuda")
+    if backend != "eager" and on_cuda:
+        print(f"⚠️  Backend '{backend}' targets CPU inference; using eager for {model_name} on CUDA")
+        backend = "eager"
+
+    if backend == "bf16" and not bf16_supported():
+        print(f"⚠️  CPU lacks native bfloat16 support; using eager float32 for {model_name}")
+        backend = "eager"
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+        except ImportError:
+            raise ImportError("The onnx backend requires `pip install optimum[onnxruntime]`")
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        summarizer = pipeline("summarization", model=model, tokenizer=tokenizer)
+        summarizer.inference_backend = backend
+        return summarizer
+
+    if backend == "eager" and device == "cpu" and mmap_weights:
+        model = load_mmap_model(model_name)
+        if model is not None:
+            summarizer = pipeline("summarization", model=model, tokenizer=AutoTokenizer.from_pretrained(model_name))
+            summarizer.inference_backend = "eager"
+            return summarizer
+
+    if backend == "bf16":
+        dtype = torch.bfloat16
+    elif on_cuda:
+        dtype = torch.float16
+    else:
+        dtype = torch.float32
+
+    summarizer = pipeline(
+        "summarization",
+        model=model_name,
+        device=cuda_index(device) if on_cuda else -1,
+        torch_dtype=dtype
+    )
+
+    if backend == "int8":
+        summarizer.model = torch.quantization.quantize_dynamic(
+            summarizer.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif backend == "compile":
+        # Compile forward only; generate() stays a plain Python loop around it
+        summarizer.model.forward = torch.compile(summarizer.model.forward, dynamic=True)
+
+    summarizer.inference_backend = backend
+    return summarizer
+
+
+def default_backend() -> str:
+    backend = os.getenv("HF_DEFAULT_BACKEND", "eager")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown HF_DEFAULT_BACKEND: {backend}")
+    return backend
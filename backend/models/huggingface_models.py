@@ -1,121 +1,455 @@
-from transformers import pipeline, AutoTokenizer, AutoModelForSeq2SeqLM
+from transformers import AutoTokenizer, TextIteratorStreamer
 import torch
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
+import asyncio
+import os
+import threading
 import time
 import gc
+from models.batching import MicroBatcher
+from models.model_manager import ModelManager
+from models.hf_backends import build_pipeline, parse_backend_config, default_backend
+from models.decoding import draft_model_overrides, parse_profile
+from model_registry import get_model_registry
+from models.worker_pool import WorkerPool
+from async_runtime import get_runtime
+from instrumentation import record_stage, record_timings, stage
+from preprocessing import get_preprocessor, token_usage
+
+WARMUP_TEXT = "The quick brown fox jumps over the lazy dog. " * 8
+
+def pad_batch(sequences, pad_token_id: int):
+    """Right-pad token id lists into input_ids and attention_mask tensors"""
+    longest = max(len(ids) for ids in sequences)
+    input_ids = torch.full((len(sequences), longest), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for row, ids in enumerate(sequences):
+        input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[row, :len(ids)] = 1
+    return {"input_ids": input_ids, "attention_mask": attention_mask}
 
 class HuggingFaceModels:
-    def __init__(self):
-        self.loaded_models = {}
+    def __init__(self, use_worker_pool: bool = True):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        # HF_WORKERS > 0 runs batches in a pool of pinned worker processes
+        num_workers = int(os.getenv("HF_WORKERS", "0"))
+        self.worker_pool = None
+        if use_worker_pool and num_workers > 0 and self.device == "cpu":
+            self.worker_pool = WorkerPool(num_workers, int(os.getenv("HF_WORKER_THREADS", "0")))
+        # Memory-mapped weights let the workers (and in-process streaming) share one copy
+        self.mmap_weights = (os.getenv("HF_MMAP_WEIGHTS") or ("1" if num_workers > 0 else "0")) == "1"
+        self.model_manager = ModelManager(
+            self._load_pipeline,
+            memory_budget_bytes=int(float(os.getenv("HF_MEMORY_BUDGET_MB", "0")) * 1024 * 1024)
+        )
+        self.backends = parse_backend_config(os.getenv("HF_BACKENDS", ""))
+        self.default_backend = default_backend()
+        self.draft_overrides = draft_model_overrides()
+        self.prewarm_models = [m.strip() for m in os.getenv("HF_PREWARM_MODELS", "").split(",") if m.strip()]
+        self.ready = threading.Event()
+        self.batchers = {}
+        self.tokenizers = {}
+        self._tokenizers_lock = threading.Lock()
+        self._batchers_lock = threading.Lock()
+        self.max_batch_size = int(os.getenv("HF_BATCH_MAX_SIZE", "8"))
+        self.max_batch_wait_ms = float(os.getenv("HF_BATCH_WAIT_MS", "20"))
         
+    def _load_pipeline(self, model_name: str):
+        """Build the summarization pipeline for a model"""
+        backend = self.get_backend(model_name)
+        print(f"Loading {model_name} ({backend})...")
+        try:
+            if not self.supports(model_name) and self.get_draft_target(model_name) is None:
+                raise ValueError(f"Unknown HuggingFace model: {model_name}")
+            summarizer = build_pipeline(model_name, backend, self.get_device(model_name), mmap_weights=self.mmap_weights)
+            print(f"✅ {model_name} loaded successfully")
+            return summarizer
+        except Exception as e:
+            print(f"❌ Error loading {model_name}: {str(e)}")
+            raise e
+    
+    def get_spec(self, model_name: str):
+        """The model's registry entry, or None (e.g. for draft models)"""
+        spec = get_model_registry().find(model_name)
+        return spec if spec and spec.provider == "huggingface" else None
+    
+    def get_backend(self, model_name: str) -> str:
+        """Inference backend for a model (HF_BACKENDS, else the registry, else HF_DEFAULT_BACKEND)"""
+        spec = self.get_spec(model_name)
+        return self.backends.get(model_name) or (spec and spec.backend) or self.default_backend
+    
+    def get_device(self, model_name: str) -> str:
+        """Device from the registry; draft models run on their target's device"""
+        spec = self.get_spec(model_name) or self.get_spec(self.get_draft_target(model_name) or "")
+        return (spec and spec.device) or self.device
+    
+    def get_draft_model(self, model_name: str):
+        """Draft model for assisted decoding (HF_DRAFT_MODELS, else the registry), or None"""
+        if model_name in self.draft_overrides:
+            return self.draft_overrides[model_name]
+        spec = self.get_spec(model_name)
+        return spec.draft_model if spec else None
+    
+    def get_draft_target(self, draft_name: str):
+        """The model a draft model assists, if any"""
+        for spec in get_model_registry().list_models("huggingface"):
+            if self.get_draft_model(spec.id) == draft_name:
+                return spec.id
+        return None
+    
+    def get_cache_params(self, model_name: str) -> Dict[str, Any]:
+        """Settings besides decoding parameters that change a model's output"""
+        return {"backend": self.get_backend(model_name), "device": self.get_device(model_name)}
+    
     def load_model(self, model_name: str):
-        """Load a model if not already loaded"""
-        if model_name not in self.loaded_models:
-            print(f"Loading {model_name}...")
+        """Load a model if not already loaded and return its pipeline"""
+        return self.model_manager.get(model_name)
+    
+    def _warmup(self, model_name: str, summarizer):
+        """Run one short inference so the first real request doesn't pay for lazy init"""
+        summarizer(WARMUP_TEXT, max_length=20, min_length=5, num_beams=1)
+    
+    def start_prewarm(self):
+        """Load and warm the HF_PREWARM_MODELS list in the background"""
+        if self.worker_pool:
+            # Each worker prewarms its own models before reporting ready
+            self.worker_pool.start()
+            return
+        if not self.prewarm_models:
+            self.ready.set()
+            return
+        
+        def prewarm():
             try:
-                if model_name == "facebook/bart-large-cnn":
-                    self.loaded_models[model_name] = pipeline(
-                        "summarization",
-                        model=model_name,
-                        device=0 if self.device == "cuda" else -1,
-                        torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-                    )
-                elif model_name == "google/pegasus-xsum":
-                    self.loaded_models[model_name] = pipeline(
-                        "summarization",
-                        model=model_name,
-                        device=0 if self.device == "cuda" else -1,
-                        torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
-                    )
-                print(f"✅ {model_name} loaded successfully")
-            except Exception as e:
-                print(f"❌ Error loading {model_name}: {str(e)}")
-                raise e
+                self.model_manager.prewarm(self.prewarm_models, warmup=self._warmup)
+            finally:
+                self.ready.set()
+        
+        threading.Thread(target=prewarm, name="hf-prewarm", daemon=True).start()
+    
+    def is_ready(self) -> bool:
+        """Whether startup prewarming has finished"""
+        if self.worker_pool:
+            return self.worker_pool.is_ready()
+        return self.ready.is_set()
+    
+    def get_model_stats(self) -> Dict[str, Any]:
+        """Return loaded models, memory use and prewarm status"""
+        stats = self.model_manager.get_stats()
+        stats["prewarm"] = {"models": self.prewarm_models, "done": self.is_ready()}
+        if self.worker_pool:
+            stats["workers"] = self.worker_pool.get_stats()["workers"]
+        return stats
+    
+    def get_worker_stats(self) -> Dict[str, Any]:
+        """Health and utilization of the worker processes (None when running in-process)"""
+        return self.worker_pool.get_stats() if self.worker_pool else None
                 
-    def summarize(self, text: str, model_name: str) -> Dict[str, Any]:
+    def get_batcher(self, model_name: str, profile: str) -> MicroBatcher:
+        """Get (or create) the batching queue for a model and decoding profile"""
+        key = (model_name, profile)
+        spec = self.get_spec(model_name)
+        max_wait_ms = spec.batch_wait_ms if spec and spec.batch_wait_ms is not None else self.max_batch_wait_ms
+        max_batch_size = spec.batch_max_size if spec and spec.batch_max_size else self.max_batch_size
+        # Assisted generation only supports one sequence at a time
+        if "draft_model" in self.get_generation_params(model_name, profile):
+            max_batch_size = 1
+        with self._batchers_lock:
+            batcher = self.batchers.get(key)
+            if batcher is not None:
+                # Batching settings may have changed in the model registry since
+                batcher.max_batch_size = max_batch_size
+                batcher.max_wait = max_wait_ms / 1000.0
+                return batcher
+            name = f"{model_name} [{profile}]"
+            # Worker processes are CPU-only; models placed on a GPU run in-process
+            if self.worker_pool and self.get_device(model_name) == "cpu":
+                # One batch per worker can be in flight for each model
+                batcher = MicroBatcher(
+                    name,
+                    lambda inputs: self.worker_pool.run(model_name, inputs, profile),
+                    max_batch_size=max_batch_size,
+                    max_wait_ms=max_wait_ms,
+                    executor=self.worker_pool.dispatch_executor,
+                    max_in_flight=self.worker_pool.num_workers
+                )
+            else:
+                batcher = MicroBatcher(
+                    name,
+                    lambda inputs: self._summarize_batch(inputs, model_name, profile),
+                    max_batch_size=max_batch_size,
+                    max_wait_ms=max_wait_ms,
+                    executor=get_runtime().hf_executor
+                )
+            self.batchers[key] = batcher
+            return batcher
+    
+    def _summarize_batch(self, inputs, model_name: str, profile: str = None):
+        """Generate summaries for a list of token id sequences (from prepare_input) as one padded batch"""
+        timings = {}
+        params = self.get_generation_params(model_name, profile)
+        draft_name = params.pop("draft_model", None)
+        
+        # Load model (and draft model) if needed
+        load_start = time.perf_counter()
+        was_loaded = model_name in self.model_manager and (not draft_name or draft_name in self.model_manager)
+        summarizer = self.load_model(model_name)
+        if draft_name:
+            params["assistant_model"] = self.load_model(draft_name).model
+        if not was_loaded:
+            timings["model_load"] = time.perf_counter() - load_start
+        
+        # Already tokenized and truncated by prepare_input; only padding is left
+        batch = {
+            name: tensor.to(summarizer.model.device)
+            for name, tensor in pad_batch(inputs, summarizer.tokenizer.pad_token_id).items()
+        }
+        
+        generate_start = time.perf_counter()
+        with torch.inference_mode():
+            output_ids = summarizer.model.generate(**batch, **params)
+        generation_time = time.perf_counter() - generate_start
+        summaries = summarizer.tokenizer.batch_decode(output_ids, skip_special_tokens=True)
+        timings["generation"] = generation_time
+        
+        # Generated tokens per sequence, without padding and the decoder start token
+        output_tokens = ((output_ids != summarizer.tokenizer.pad_token_id).sum(dim=-1) - 1).clamp(min=0).tolist()
+        return [
+            {
+                "summary": summary.strip(),
+                "timings": timings,
+                "output_tokens": tokens,
+                "tokens_per_second": round(tokens / generation_time, 2) if generation_time else None,
+                "draft_model": draft_name
+            }
+            for summary, tokens in zip(summaries, output_tokens)
+        ]
+    
+    def get_input_budget(self, model_name: str) -> int:
+        """Encoder input tokens: max_input_tokens from the registry, else the tokenizer's limit (at most 1024)"""
+        spec = self.get_spec(model_name)
+        if spec and spec.max_input_tokens:
+            return spec.max_input_tokens
+        return min(self.get_tokenizer(model_name).model_max_length, 1024)
+    
+    def prepare_input(self, text: str, model_name: str) -> Dict[str, Any]:
+        """
+        Token ids for the model's encoder, cut to its exact input budget. The full
+        tokenization is memoized by text hash, so it runs once per text and model.
+        """
+        tokenizer = self.get_tokenizer(model_name)
+        ids = get_preprocessor().encode(
+            text, f"hf:{model_name}", lambda t: tokenizer.encode(t, add_special_tokens=True)
+        )
+        budget = self.get_input_budget(model_name)
+        if len(ids) <= budget:
+            return {"input_ids": ids.tolist(), "input_tokens": len(ids), "truncated_from": None}
+        
+        # Keep the special tokens the tokenizer appends (e.g. </s>), as truncation=True would
+        marker = tokenizer.build_inputs_with_special_tokens([-1])
+        suffix = len(marker) - marker.index(-1) - 1
+        input_ids = ids[:budget - suffix].tolist() + ids[len(ids) - suffix:].tolist()
+        return {"input_ids": input_ids, "input_tokens": len(input_ids), "truncated_from": len(ids)}
+    
+    async def _prepare_input_async(self, text: str, model_name: str) -> Dict[str, Any]:
+        # The first call for a model loads its tokenizer, so keep it off the event loop
+        start = time.perf_counter()
+        prepared = await asyncio.to_thread(self.prepare_input, text, model_name)
+        record_stage("tokenization", time.perf_counter() - start, model_name)
+        return prepared
+    
+    def _build_result(self, model_name: str, profile: str, batched: Dict[str, Any], start_time: float,
+                      prepared: Dict[str, Any]) -> Dict[str, Any]:
+        processing_time = time.time() - start_time
+        summary = batched["result"]["summary"]
+        record_timings(dict(batched["result"]["timings"], queue_wait=batched["queue_wait"]), model_name)
+        
+        # Get readable model name
+        readable_name = self.get_readable_name(model_name)
+        
+        result = {
+            "summary": summary,
+            "model_name": readable_name,
+            "processing_time": round(processing_time, 2),
+            "batch_size": batched["batch_size"],
+            "queue_wait": round(batched["queue_wait"], 3),
+            "backend": self.get_backend(model_name),
+            "profile": profile,
+            "tokens_per_second": batched["result"]["tokens_per_second"],
+            "success": True
+        }
+        # Local inference has no price unless one is set in the registry
+        result.update(token_usage(
+            model_name, prepared["input_tokens"], batched["result"]["output_tokens"], prepared["truncated_from"]
+        ))
+        if batched["result"]["draft_model"]:
+            result["draft_model"] = batched["result"]["draft_model"]
+        if "worker" in batched["result"]:
+            result["worker"] = batched["result"]["worker"]
+        return result
+    
+    def _build_error(self, model_name: str, error: Exception, start_time: float) -> Dict[str, Any]:
+        return {
+            "summary": f"Error: {str(error)}",
+            "model_name": self.get_readable_name(model_name),
+            "processing_time": time.time() - start_time,
+            "success": False,
+            "error": str(error)
+        }
+    
+    def summarize(self, text: str, model_name: str, profile: str = None) -> Dict[str, Any]:
         """
         Summarize text using HuggingFace models
         """
         start_time = time.time()
         
         try:
-            # Load model if needed
-            self.load_model(model_name)
-            
-            # Get the pipeline
-            summarizer = self.loaded_models[model_name]
-            
-            # Set parameters based on model
-            if "bart" in model_name.lower():
-                max_length = 150
-                min_length = 50
-                length_penalty = 2.0
-            elif "pegasus" in model_name.lower():
-                max_length = 128
-                min_length = 32
-                length_penalty = 0.8
-            else:
-                max_length = 150
-                min_length = 50
-                length_penalty = 2.0
-            
-            # Truncate text if too long (models have token limits)
-            if len(text.split()) > 800:  # Rough word count check
-                text = ' '.join(text.split()[:800])
-            
-            # Generate summary
-            result = summarizer(
-                text,
-                max_length=max_length,
-                min_length=min_length,
-                length_penalty=length_penalty,
-                num_beams=4,
-                early_stopping=True
-            )
-            
-            processing_time = time.time() - start_time
-            summary = result[0]['summary_text'].strip()
-            
-            # Get readable model name
-            readable_name = self.get_readable_name(model_name)
+            profile = self.resolve_profile(profile)
+            with stage("tokenization", model_name):
+                prepared = self.prepare_input(text, model_name)
+            # Generate summary, batched with any concurrent requests for this model and profile
+            batched = self.get_batcher(model_name, profile).submit(prepared["input_ids"])
+            return self._build_result(model_name, profile, batched, start_time, prepared)
+        except Exception as e:
+            return self._build_error(model_name, e, start_time)
             
-            return {
-                "summary": summary,
-                "model_name": readable_name,
-                "processing_time": round(processing_time, 2),
-                "success": True
-            }
+    async def summarize_async(self, text: str, model_name: str, profile: str = None) -> Dict[str, Any]:
+        """
+        Summarize text without blocking the event loop; inference runs on the
+        shared HF executor via the model's batching queue
+        """
+        start_time = time.time()
             
+        try:
+            profile = self.resolve_profile(profile)
+            prepared = await self._prepare_input_async(text, model_name)
+            future = self.get_batcher(model_name, profile).enqueue(prepared["input_ids"])
+            batched = await asyncio.wrap_future(future)
+            return self._build_result(model_name, profile, batched, start_time, prepared)
         except Exception as e:
-            return {
-                "summary": f"Error: {str(e)}",
-                "model_name": self.get_readable_name(model_name),
-                "processing_time": time.time() - start_time,
-                "success": False,
-                "error": str(e)
-            }
+            return self._build_error(model_name, e, start_time)
+    
+    def get_stream_params(self, model_name: str) -> Dict[str, Any]:
+        """Decoding parameters for streaming; streamers only support greedy search"""
+        params = self.get_generation_params(model_name)
+        return {
+            "max_length": params["max_length"],
+            "min_length": params["min_length"],
+            "num_beams": 1
+        }
+    
+    async def stream_summary(self, text: str, model_name: str) -> AsyncIterator[str]:
+        """
+        Yield summary text chunks as they are generated
+        """
+        runtime = get_runtime()
+        loop = asyncio.get_running_loop()
+        
+        load_start = time.perf_counter()
+        was_loaded = model_name in self.model_manager
+        summarizer = await runtime.run_blocking(self.load_model, model_name)
+        if not was_loaded:
+            record_stage("model_load", time.perf_counter() - load_start, model_name)
+        
+        prepared = await self._prepare_input_async(text, model_name)
+        inputs = {
+            name: tensor.to(summarizer.model.device)
+            for name, tensor in pad_batch([prepared["input_ids"]], summarizer.tokenizer.pad_token_id).items()
+        }
+        streamer = TextIteratorStreamer(summarizer.tokenizer, skip_special_tokens=True)
+        
+        def generate():
+            try:
+                summarizer.model.generate(**inputs, streamer=streamer, **self.get_stream_params(model_name))
+            except Exception:
+                # Unblock the reader below; the error surfaces when generation is awaited
+                streamer.end()
+                raise
+        
+        generate_start = time.perf_counter()
+        generation = runtime.run_blocking(generate)
+        
+        # The streamer is a blocking iterator, so read it off the event loop
+        chunks = iter(streamer)
+        while True:
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            if chunk:
+                yield chunk
+        await generation
+        record_stage("generation", time.perf_counter() - generate_start, model_name)
+    
+    def resolve_profile(self, profile: str = None) -> str:
+        """Decoding profile for a request (HF_DEFAULT_PROFILE when not given)"""
+        return parse_profile(profile)
+    
+    def get_generation_params(self, model_name: str, profile: str = None) -> Dict[str, Any]:
+        """Return the decoding parameters used for a model and decoding profile"""
+        # Length settings come from the model registry
+        spec = self.get_spec(model_name)
+        params = {
+            "max_length": 150,
+            "min_length": 50,
+            "length_penalty": 2.0,
+            "num_beams": 4,
+            "early_stopping": True
+        }
+        if spec:
+            params.update(spec.params)
+        
+        profile = self.resolve_profile(profile)
+        if profile == "balanced":
+            params["num_beams"] = 2
+        elif profile == "fast":
+            # Greedy: the beam-only settings would just trigger warnings
+            params["num_beams"] = 1
+            params.pop("length_penalty", None)
+            params.pop("early_stopping", None)
+            draft_name = self.get_draft_model(model_name)
+            if draft_name:
+                params["draft_model"] = draft_name
+        return params
+    
+    def get_tokenizer(self, model_name: str):
+        """Tokenizer for a model, without loading its weights"""
+        with self._tokenizers_lock:
+            if model_name not in self.tokenizers:
+                self.tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+            return self.tokenizers[model_name]
+    
+    def count_tokens(self, text: str, model_name: str) -> int:
+        """Exact token count with the model's own tokenizer"""
+        return len(self.get_tokenizer(model_name).encode(text, add_special_tokens=True))
+    
+    def get_context_budget(self, model_name: str) -> int:
+        """Input tokens per chunk in long-document mode: the encoder's max length"""
+        return self.get_input_budget(model_name) - 16  # headroom for special tokens added when chunks are joined
     
     def get_readable_name(self, model_name: str) -> str:
         """Convert model ID to readable name"""
-        name_mapping = {
-            "facebook/bart-large-cnn": "BART Large CNN",
-            "google/pegasus-xsum": "Pegasus XSum",
-        }
-        return name_mapping.get(model_name, model_name)
+        spec = self.get_spec(model_name)
+        return spec.name if spec else model_name
     
     def get_available_models(self):
         """Return list of available HuggingFace models"""
-        return [
-            {"id": "facebook/bart-large-cnn", "name": "BART Large CNN"},
-            {"id": "google/pegasus-xsum", "name": "Pegasus XSum"}
-        ]
+        return [{"id": spec.id, "name": spec.name} for spec in get_model_registry().list_models("huggingface")]
+    
+    def supports(self, model_id: str) -> bool:
+        """Whether a model id is served by this handler"""
+        return self.get_spec(model_id) is not None
+    
+    def get_batching_stats(self):
+        """Return batching metrics for every model queue"""
+        with self._batchers_lock:
+            batchers = list(self.batchers.values())
+        return {batcher.name: batcher.get_stats() for batcher in batchers}
     
     def clear_model_cache(self):
         """Clear loaded models to free memory"""
-        for model_name in list(self.loaded_models.keys()):
-            del self.loaded_models[model_name]
-        self.loaded_models = {}
+        if self.worker_pool:
+            self.worker_pool.clear()
+        self.model_manager.clear()
         gc.collect()
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
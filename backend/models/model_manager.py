@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+def estimate_model_bytes(model) -> int:
+    """Resident size of a model's weights, counting tied and quantized tensors once"""
+    if not hasattr(model, "state_dict"):
+        # e.g. ONNX Runtime sessions: fall back to the exported files on disk
+        save_dir = getattr(model, "model_save_dir", None)
+        if not save_dir or not os.path.isdir(save_dir):
+            return 0
+        return sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(save_dir) for name in names
+        )
+
+    seen = set()
+    total = 0
+    pending = list(model.state_dict().values())
+    while pending:
+        value = pending.pop()
+        if isinstance(value, (tuple, list)):
+            # Dynamic quantized Linear layers store (weight, bias) packed together
+            pending.extend(value)
+            continue
+        if not hasattr(value, "numel"):
+            continue
+        key = (value.data_ptr(), value.numel())
+        if key in seen:
+            continue
+        seen.add(key)
+        total += value.numel() * value.element_size()
+    return total
+
+
+class ModelManager:
+    """
+    Keeps loaded pipelines within a RAM budget, evicting the least recently used.
+
+    Loading is guarded by a per-model lock so concurrent first requests share a
+    single load. Sizes seen on earlier loads are remembered so room can be made
+    before a reload instead of after it.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], memory_budget_bytes: int = 0,
+                 size_of: Callable[[Any], int] = None):
+        self.loader = loader
+        self.memory_budget_bytes = memory_budget_bytes
+        self.size_of = size_of or (lambda pipe: estimate_model_bytes(pipe.model))
+        self._models = OrderedDict()  # model_name -> {"pipeline", "size", "loaded_at", "last_used", "load_time"}
+        self._known_sizes = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._stats = {"loads": 0, "hits": 0, "evictions": 0}
+
+    def __contains__(self, model_name: str) -> bool:
+        with self._lock:
+            return model_name in self._models
+
+    def get(self, model_name: str):
+        """Return the pipeline for a model, loading it if needed"""
+        pipe = self._touch(model_name)
+        if pipe is not None:
+            return pipe
+
+        with self._load_lock(model_name):
+            # Another caller may have finished loading while we waited
+            pipe = self._touch(model_name)
+            if pipe is not None:
+                return pipe
+
+            known_size = self._known_sizes.get(model_name)
+            if known_size:
+                self._make_room(known_size, keep=model_name)
+
+            start_time = time.time()
+            pipe = self.loader(model_name)
+            load_time = time.time() - start_time
+            size = self.size_of(pipe)
+
+            with self._lock:
+                now = time.time()
+                self._models[model_name] = {
+                    "pipeline": pipe,
+                    "size": size,
+                    "loaded_at": now,
+                    "last_used": now,
+                    "load_time": load_time
+                }
+                self._known_sizes[model_name] = size
+                self._stats["loads"] += 1
+            self._make_room(0, keep=model_name)
+            return pipe
+
+    def evict(self, model_name: str) -> bool:
+        """Drop one model; returns whether it was loaded"""
+        with self._lock:
+            entry = self._models.pop(model_name, None)
+        if entry:
+            print(f"♻️  Evicted {model_name} ({entry['size'] / 1024 ** 2:.0f} MB)")
+        return entry is not None
+
+    def clear(self):
+        """Drop every loaded model"""
+        with self._lock:
+            self._models.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return resident models, memory use and load/eviction counters"""
+        with self._lock:
+            models = [
+                {
+                    "id": name,
+                    "size_mb": round(entry["size"] / 1024 ** 2, 1),
+                    "load_time": round(entry["load_time"], 2),
+                    "idle_seconds": round(time.time() - entry["last_used"], 1)
+                }
+                for name, entry in self._models.items()
+            ]
+            resident = sum(entry["size"] for entry in self._models.values())
+            stats = dict(self._stats)
+        stats.update({
+            "models": models,
+            "resident_mb": round(resident / 1024 ** 2, 1),
+            "budget_mb": round(self.memory_budget_bytes / 1024 ** 2, 1) if self.memory_budget_bytes else None
+        })
+        return stats
+
+    def _touch(self, model_name: str):
+        with self._lock:
+            entry = self._models.get(model_name)
+            if entry is None:
+                return None
+            entry["last_used"] = time.time()
+            self._models.move_to_end(model_name)
+            self._stats["hits"] += 1
+            return entry["pipeline"]
+
+    def _load_lock(self, model_name: str) -> threading.Lock:
+        with self._lock:
+            return self._load_locks.setdefault(model_name, threading.Lock())
+
+    def _make_room(self, incoming: int, keep: Optional[str] = None):
+        """Evict least recently used models until incoming bytes fit in the budget"""
+        if not self.memory_budget_bytes:
+            return
+        while True:
+            with self._lock:
+                resident = sum(entry["size"] for entry in self._models.values())
+                if resident + incoming <= self.memory_budget_bytes:
+                    return
+                victims = [name for name in self._models if name != keep]
+                if not victims:
+                    return
+                victim = victims[0]
+                self._stats["evictions"] += 1
+            self.evict(victim)
+
+    def prewarm(self, model_names: Iterable[str], warmup: Optional[Callable[[str, Any], None]] = None):
+        """Load each model and optionally run one warmup inference on it"""
+        for model_name in model_names:
+            try:
+                pipe = self.get(model_name)
+                if warmup:
+                    warmup(model_name, pipe)
+                print(f"🔥 Prewarmed {model_name}")
+            except Exception as e:
+                print(f"❌ Failed to prewarm {model_name}: {str(e)}")
@@ -1,7 +1,29 @@
 import openai
 import os
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator
 import time
+from async_runtime import get_runtime
+from model_registry import get_model_registry
+from preprocessing import get_preprocessor, token_usage
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_encodings = {}
+
+def _get_encoding(model_name: str):
+    if model_name not in _encodings:
+        try:
+            _encodings[model_name] = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            _encodings[model_name] = tiktoken.get_encoding("cl100k_base")
+    return _encodings[model_name]
+
+# Chat format framing: tokens per message, plus the tokens priming the reply
+TOKENS_PER_MESSAGE = 3
+REPLY_PRIMING_TOKENS = 3
 
 class OpenAIModel:
     def __init__(self):
@@ -12,8 +34,80 @@ class OpenAIModel:
         else:
             openai.api_key = api_key
             self.api_key = api_key
+        if os.getenv('OPENAI_API_BASE'):
+            # e.g. a proxy or the local stub used by the benchmarks
+            openai.api_base = os.getenv('OPENAI_API_BASE')
+        if tiktoken is None:
+            print("⚠️  Warning: tiktoken is not installed; OpenAI token counts and truncation are estimated "
+                  "(~4 characters per token). Install it with: pip install tiktoken")
+        self._prompt_overhead = {}
+    
+    @property
+    def client(self):
+        """The runtime's OpenAI client (looked up per call; a forked server worker builds its own)"""
+        return get_runtime().get_client("openai")
+    
+    @property
+    def limit(self):
+        return self.client.limit
+    
+    def build_messages(self, text: str):
+        """Build the chat messages for a summarization request"""
+        # Create summarization prompt
+        prompt = f"""Please provide a concise summary of the following text. 
+            Focus on the main points and key information while maintaining clarity and accuracy.
+            
+            Text to summarize:
+            {text}
+            
+            Summary:"""
+        
+        return [
+            {
+                "role": "system", 
+                "content": "You are a professional summarizer. Provide clear, concise, and accurate summaries."
+            },
+            {"role": "user", "content": prompt}
+        ]
+    
+    def prepare_input(self, text: str, model_name: str) -> Dict[str, Any]:
+        """
+        The text cut to the model's max_input_tokens (exactly, with tiktoken) and
+        the token count of the full prompt sent for it
+        """
+        budget = get_model_registry().get(model_name).max_input_tokens
+        if tiktoken is None:
+            text_tokens = self.count_tokens(text, model_name)
+            truncated_from = None
+            if budget and text_tokens > budget:
+                text, truncated_from, text_tokens = text[:budget * 4], text_tokens, budget
+        else:
+            encoding = _get_encoding(model_name)
+            # Memoized by text hash: cache keys, streams and retries of the same text reuse it
+            ids = get_preprocessor().encode(text, f"tiktoken:{encoding.name}", encoding.encode_ordinary)
+            text_tokens, truncated_from = len(ids), None
+            if budget and len(ids) > budget:
+                text, truncated_from, text_tokens = encoding.decode(ids[:budget]), len(ids), budget
+        
+        if model_name not in self._prompt_overhead:
+            # Everything in the request but the text: system prompt, template and chat framing
+            self._prompt_overhead[model_name] = sum(
+                TOKENS_PER_MESSAGE + self.count_tokens(message["content"], model_name)
+                for message in self.build_messages("")
+            ) + REPLY_PRIMING_TOKENS
+        return {
+            "text": text,
+            "input_tokens": self._prompt_overhead[model_name] + text_tokens,
+            "truncated_from": truncated_from
+        }
         
     def summarize(self, text: str, model_name: str = "gpt-3.5-turbo") -> Dict[str, Any]:
+        """
+        Summarize text using OpenAI GPT models (blocking wrapper around summarize_async)
+        """
+        return get_runtime().run(self.summarize_async(text, model_name))
+    
+    async def summarize_async(self, text: str, model_name: str = "gpt-3.5-turbo") -> Dict[str, Any]:
         """
         Summarize text using OpenAI GPT models
         """
@@ -29,37 +123,35 @@ class OpenAIModel:
             }
         
         try:
-            # Create summarization prompt
-            prompt = f"""Please provide a concise summary of the following text. 
-            Focus on the main points and key information while maintaining clarity and accuracy.
+            prepared = self.prepare_input(text, model_name)
             
-            Text to summarize:
-            {text}
+            # Reuse the pooled session for this call
+            openai.aiosession.set(get_runtime().get_session("openai"))
             
-            Summary:"""
-            
-            response = openai.ChatCompletion.create(
+            # Deadline, retries, hedging and circuit breaking come from the shared client
+            response = await self.client.call(lambda: openai.ChatCompletion.acreate(
                 model=model_name,
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a professional summarizer. Provide clear, concise, and accurate summaries."
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.3
-            )
+                messages=self.build_messages(prepared["text"]),
+                request_timeout=self.limit.timeout_for(model_name),
+                **self.get_generation_params(model_name)
+            ), model_name)
             
             processing_time = time.time() - start_time
             summary = response.choices[0].message.content.strip()
             
-            return {
+            # Billed counts when the API reports them, else our own
+            usage = response.get("usage") or {}
+            return dict({
                 "summary": summary,
                 "model_name": f"OpenAI {model_name}",
                 "processing_time": round(processing_time, 2),
                 "success": True
-            }
+            }, **token_usage(
+                model_name,
+                usage.get("prompt_tokens") or prepared["input_tokens"],
+                usage.get("completion_tokens") or self.count_tokens(summary, model_name),
+                prepared["truncated_from"]
+            ))
             
         except Exception as e:
             return {
@@ -70,9 +162,46 @@ class OpenAIModel:
                 "error": str(e)
             }
     
+    async def stream_summary(self, text: str, model_name: str = "gpt-3.5-turbo") -> AsyncIterator[str]:
+        """
+        Yield summary text chunks as OpenAI streams them back
+        """
+        if not self.api_key:
+            raise RuntimeError("OpenAI API key not configured")
+        
+        openai.aiosession.set(get_runtime().get_session("openai"))
+        # Streams can't be retried once tokens are out, but still feed the circuit breaker
+        async with self.client.guard(), self.limit.slot(model_name):
+            response = await self.limit.wait(openai.ChatCompletion.acreate(
+                model=model_name,
+                messages=self.build_messages(self.prepare_input(text, model_name)["text"]),
+                request_timeout=self.limit.timeout_for(model_name),
+                stream=True,
+                **self.get_generation_params(model_name)
+            ), model_name)
+            async for chunk in response:
+                content = chunk.choices[0].delta.get("content")
+                if content:
+                    yield content
+    
+    def count_tokens(self, text: str, model_name: str) -> int:
+        """Count tokens with tiktoken, or estimate ~4 characters per token without it"""
+        if tiktoken is None:
+            return len(text) // 4 + 1
+        return len(_get_encoding(model_name).encode_ordinary(text))
+    
+    def get_context_budget(self, model_name: str) -> int:
+        """Input tokens per chunk in long-document mode"""
+        return int(os.getenv("LONG_DOC_API_CHUNK_TOKENS", "3000"))
+    
+    def get_readable_name(self, model_name: str) -> str:
+        """Convert model ID to readable name"""
+        return f"OpenAI {model_name}"
+    
+    def get_generation_params(self, model_name: str) -> Dict[str, Any]:
+        """Return the completion parameters used for a model (from the model registry)"""
+        return dict(get_model_registry().get(model_name).params)
+    
     def get_available_models(self):
         """Return list of available OpenAI models"""
-        return [
-            {"id": "gpt-3.5-turbo", "name": "GPT-3.5 Turbo"},
-            {"id": "gpt-4", "name": "GPT-4"}
-        ] 
\ No newline at end of file
+        return [{"id": spec.id, "name": spec.name} for spec in get_model_registry().list_models("openai")]
@@ -0,0 +1,332 @@
+"""
+Pool of HuggingFace inference worker processes.
+
+Workers are started as `python -m models.worker_pool` (not forked from the Flask
+process, so they don't inherit its threads or re-run the app's imports) and talk
+to the app over local multiprocessing connections.
+"""
+import argparse
+import atexit
+import itertools
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def split_cores(num_workers: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """Divide the usable cores into num_workers contiguous, disjoint groups"""
+    if cores is None:
+        cores = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count() or 1))
+    if num_workers >= len(cores):
+        # More workers than cores: one core each, round robin
+        return [[cores[i % len(cores)]] for i in range(num_workers)]
+    size, extra = divmod(len(cores), num_workers)
+    groups, start = [], 0
+    for i in range(num_workers):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cores[start:end])
+        start = end
+    return groups
+
+
+class WorkerPool:
+    """
+    Runs HuggingFace batches in separate processes so inference isn't serialized
+    by one interpreter's GIL.
+
+    Each worker is pinned to its own group of cores with a torch thread pool of
+    the same size. Batches go to the ready worker with the fewest outstanding jobs;
+    a reader thread per worker resolves the futures and restarts the worker if its
+    connection drops.
+    """
+
+    def __init__(self, num_workers: int, threads_per_worker: int = 0, start_timeout: float = 300):
+        self.num_workers = max(1, num_workers)
+        self.core_groups = split_cores(self.num_workers)
+        self.threads_per_worker = threads_per_worker
+        self.start_timeout = start_timeout
+        # Dispatch threads only wait on IPC; inference concurrency is the worker count
+        self.dispatch_executor = ThreadPoolExecutor(max_workers=self.num_workers * 2, thread_name_prefix="hf-dispatch")
+        self._authkey = secrets.token_bytes(32)
+        self._listener = None
+        self._workers = {}
+        self._pending = {}  # job_id -> (worker_id, future)
+        self._job_ids = itertools.count()
+        self._changed = threading.Condition()
+        self._started_at = None
+        self._closed = False
+
+    def start(self):
+        """Launch the workers; they report ready once their models are prewarmed"""
+        with self._changed:
+            if self._started_at is not None:
+                return
+            self._started_at = time.time()
+            self._listener = Listener(authkey=self._authkey)
+            for worker_id in range(self.num_workers):
+                self._spawn(worker_id)
+        threading.Thread(target=self._accept, name="hf-worker-accept", daemon=True).start()
+        atexit.register(self.close)
+        print(f"🧵 Starting {self.num_workers} HF workers on cores {self.core_groups}")
+
+    def _spawn(self, worker_id: int):
+        cores = self.core_groups[worker_id]
+        threads = self.threads_per_worker or len(cores)
+        env = dict(os.environ, HF_WORKER_AUTHKEY=self._authkey.hex(),
+                   OMP_NUM_THREADS=str(threads), MKL_NUM_THREADS=str(threads))
+        process = subprocess.Popen(
+            [sys.executable, "-m", "models.worker_pool",
+             "--worker-id", str(worker_id),
+             "--cores", ",".join(map(str, cores)),
+             "--threads", str(threads),
+             "--address", self._listener.address],
+            cwd=BACKEND_DIR,
+            env=env
+        )
+        previous = self._workers.get(worker_id, {})
+        self._workers[worker_id] = {
+            "process": process,
+            "conn": None,
+            "send_lock": threading.Lock(),
+            "cores": cores,
+            "threads": threads,
+            "ready": False,
+            "outstanding": 0,
+            "jobs": previous.get("jobs", 0),
+            "failures": previous.get("failures", 0),
+            "restarts": previous.get("restarts", -1) + 1,
+            "busy_seconds": previous.get("busy_seconds", 0.0),
+            "models": [],
+            "resident_mb": 0.0
+        }
+
+    def _accept(self):
+        """Attach each connecting worker to its slot and start reading from it"""
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+                worker_id = conn.recv()
+            except (OSError, EOFError):
+                if self._closed:
+                    return
+                continue
+            with self._changed:
+                self._workers[worker_id]["conn"] = conn
+                self._changed.notify_all()
+            threading.Thread(target=self._read, args=(worker_id, conn), name=f"hf-worker-{worker_id}",
+                             daemon=True).start()
+
+    def _read(self, worker_id: int, conn):
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except (EOFError, OSError):
+                self._worker_lost(worker_id, conn)
+                return
+
+            with self._changed:
+                worker = self._workers[worker_id]
+                if kind == "ready":
+                    worker["ready"] = True
+                    self._changed.notify_all()
+                    continue
+
+                job_id, ok, result, busy, model_stats = payload
+                _, future = self._pending.pop(job_id, (None, None))
+                worker["outstanding"] = max(0, worker["outstanding"] - 1)
+                worker["jobs"] += 1
+                worker["busy_seconds"] += busy
+                worker["models"] = [model["id"] for model in model_stats["models"]]
+                worker["resident_mb"] = model_stats["resident_mb"]
+                if not ok:
+                    worker["failures"] += 1
+            if future is None:
+                continue
+            if ok:
+                for item in result:
+                    item["worker"] = worker_id
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(result))
+
+    def _worker_lost(self, worker_id: int, conn):
+        """Fail a dead worker's jobs and start a replacement"""
+        failed = []
+        with self._changed:
+            worker = self._workers[worker_id]
+            if worker["conn"] is not conn:
+                return
+            for job_id, (owner, future) in list(self._pending.items()):
+                if owner == worker_id:
+                    failed.append(self._pending.pop(job_id)[1])
+            if not self._closed:
+                try:
+                    exitcode = worker["process"].wait(5)
+                except subprocess.TimeoutExpired:
+                    worker["process"].kill()
+                    exitcode = worker["process"].wait()
+                print(f"❌ HF worker {worker_id} exited with code {exitcode}; restarting")
+                self._spawn(worker_id)
+            self._changed.notify_all()
+        for future in failed:
+            future.set_exception(RuntimeError(f"HF worker {worker_id} exited"))
+
+    def submit(self, model_name: str, inputs: List[List[int]], profile: Optional[str] = None) -> Future:
+        """Send one batch to the least busy ready worker"""
+        future = Future()
+        with self._changed:
+            ready = self._changed.wait_for(
+                lambda: self._closed or any(w["ready"] and w["conn"] for w in self._workers.values()),
+                timeout=self.start_timeout
+            )
+            if self._closed:
+                raise RuntimeError("HF worker pool is shut down")
+            if not ready:
+                raise RuntimeError("No HF workers became ready")
+            worker_id, worker = min(
+                ((i, w) for i, w in self._workers.items() if w["ready"] and w["conn"]),
+                key=lambda item: item[1]["outstanding"]
+            )
+            job_id = next(self._job_ids)
+            worker["outstanding"] += 1
+            self._pending[job_id] = (worker_id, future)
+        try:
+            with worker["send_lock"]:
+                worker["conn"].send(("summarize", (job_id, model_name, inputs, profile)))
+        except (OSError, ValueError):
+            # The reader thread notices the broken connection and restarts the worker
+            with self._changed:
+                self._pending.pop(job_id, None)
+            future.set_exception(RuntimeError(f"HF worker {worker_id} is unavailable"))
+        return future
+
+    def run(self, model_name: str, inputs: List[List[int]], profile: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Run one batch of token id sequences on a worker and wait for its results"""
+        return self.submit(model_name, inputs, profile).result()
+
+    def _broadcast(self, message):
+        with self._changed:
+            workers = [w for w in self._workers.values() if w["conn"]]
+        for worker in workers:
+            try:
+                with worker["send_lock"]:
+                    worker["conn"].send(message)
+            except (OSError, ValueError):
+                pass
+
+    def clear(self):
+        """Drop the loaded models in every worker"""
+        self._broadcast(("clear", None))
+
+    def is_ready(self) -> bool:
+        """Whether every worker has started and prewarmed its models"""
+        with self._changed:
+            return all(w["ready"] and w["conn"] for w in self._workers.values()) and bool(self._workers)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-worker health and utilization"""
+        with self._changed:
+            uptime = time.time() - self._started_at if self._started_at else 0.0
+            workers = []
+            for worker_id, worker in sorted(self._workers.items()):
+                workers.append({
+                    "id": worker_id,
+                    "pid": worker["process"].pid,
+                    "alive": worker["process"].poll() is None,
+                    "ready": worker["ready"],
+                    "cores": worker["cores"],
+                    "threads": worker["threads"],
+                    "outstanding": worker["outstanding"],
+                    "jobs": worker["jobs"],
+                    "failures": worker["failures"],
+                    "restarts": worker["restarts"],
+                    # Fraction of the pool's uptime this worker spent running batches
+                    "utilization": round(min(1.0, worker["busy_seconds"] / uptime), 3) if uptime else 0.0,
+                    "models": worker["models"],
+                    "resident_mb": worker["resident_mb"]
+                })
+        return {
+            "num_workers": self.num_workers,
+            "alive": sum(1 for w in workers if w["alive"]),
+            "ready": sum(1 for w in workers if w["ready"]),
+            "outstanding": sum(w["outstanding"] for w in workers),
+            "uptime": round(uptime, 1),
+            "workers": workers
+        }
+
+    def close(self, timeout: float = 5.0):
+        """Stop the workers, letting each finish its current batch"""
+        with self._changed:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers.values())
+            self._changed.notify_all()
+        self._broadcast(None)
+        for worker in workers:
+            try:
+                worker["process"].wait(timeout)
+            except subprocess.TimeoutExpired:
+                worker["process"].terminate()
+        if self._listener is not None:
+            self._listener.close()
+        self.dispatch_executor.shutdown(wait=False)
+
+
+def worker_main(worker_id: int, cores: List[int], threads: int, address: str):
+    """Serve batches for the pool until told to stop or the app goes away"""
+    # Connect before the heavy imports so the app sees the worker come up
+    conn = Client(address, authkey=bytes.fromhex(os.environ["HF_WORKER_AUTHKEY"]))
+    conn.send(worker_id)
+
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    import torch
+    torch.set_num_threads(threads)
+
+    from models.huggingface_models import HuggingFaceModels
+    hf_models = HuggingFaceModels(use_worker_pool=False)
+    hf_models.model_manager.prewarm(hf_models.prewarm_models, warmup=hf_models._warmup)
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        kind, payload = message
+        if kind == "clear":
+            hf_models.clear_model_cache()
+            continue
+
+        job_id, model_name, inputs, profile = payload
+        started = time.perf_counter()
+        try:
+            result = hf_models._summarize_batch(inputs, model_name, profile)
+            ok = True
+        except Exception as e:
+            # Only the message crosses the process boundary; it's what callers report anyway
+            result = f"{type(e).__name__}: {e}"
+            ok = False
+        busy = time.perf_counter() - started
+        conn.send(("result", (job_id, ok, result, busy, hf_models.model_manager.get_stats())))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HuggingFace inference worker (started by WorkerPool)")
+    parser.add_argument("--worker-id", type=int, required=True)
+    parser.add_argument("--cores", required=True)
+    parser.add_argument("--threads", type=int, required=True)
+    parser.add_argument("--address", required=True)
+    args = parser.parse_args()
+    worker_main(args.worker_id, [int(core) for core in args.cores.split(",")], args.threads, args.address)
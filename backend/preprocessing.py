@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from model_registry import get_model_registry
+
+
+class PreparedText:
+    """A request text normalized once: its hash, word count and length"""
+
+    __slots__ = ("text", "normalized", "text_hash", "word_count", "char_count")
+
+    def __init__(self, text: str):
+        words = text.split()
+        self.text = text
+        # Whitespace-collapsed form; the hash matches summary_cache.text_hash()
+        self.normalized = " ".join(words)
+        self.text_hash = hashlib.sha256(self.normalized.encode("utf-8")).hexdigest()
+        self.word_count = len(words)
+        self.char_count = len(text)
+
+
+class Preprocessor:
+    """
+    Shared preprocessing for request texts.
+
+    prepare() normalizes and hashes each distinct text once; the app, the
+    summary cache, the battle history and the adapters all get the same
+    PreparedText back. encode() memoizes a tokenizer's ids for a text by
+    (text hash, tokenizer), so the HF tokenizer or tiktoken runs once per
+    text rather than once per cache key, token count, truncation and call.
+    Both are LRUs: prepared texts are bounded by count, token ids by the
+    total number of tokens held (stored as 4-byte arrays).
+    """
+
+    def __init__(self, max_texts: int = 256, max_tokens: int = 2_000_000):
+        self.max_texts = max_texts
+        self.max_tokens = max_tokens
+        self._texts = OrderedDict()   # text -> PreparedText
+        self._tokens = OrderedDict()  # (text_hash, encoder) -> array of ids
+        self._token_total = 0
+        self._lock = threading.Lock()
+        self._stats = {"text_hits": 0, "text_misses": 0, "token_hits": 0, "token_misses": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build the preprocessor from PREPROCESS_CACHE_* environment variables"""
+        return cls(
+            max_texts=int(os.getenv("PREPROCESS_CACHE_TEXTS", "256")),
+            max_tokens=int(os.getenv("PREPROCESS_CACHE_TOKENS", "2000000"))
+        )
+
+    def prepare(self, text: str) -> PreparedText:
+        """The normalized form, hash and word count of a text (computed once per distinct text)"""
+        with self._lock:
+            prepared = self._texts.get(text)
+            if prepared is not None:
+                self._texts.move_to_end(text)
+                self._stats["text_hits"] += 1
+                return prepared
+        prepared = PreparedText(text)
+        with self._lock:
+            self._stats["text_misses"] += 1
+            self._texts[text] = prepared
+            while len(self._texts) > self.max_texts:
+                self._texts.popitem(last=False)
+        return prepared
+
+    def encode(self, text: str, encoder: str, encode: Callable[[str], Sequence[int]]) -> array:
+        """Token ids of a text under a named tokenizer, e.g. ("hf:facebook/bart-large-cnn", tokenizer.encode)"""
+        key = (self.prepare(text).text_hash, encoder)
+        with self._lock:
+            ids = self._tokens.get(key)
+            if ids is not None:
+                self._tokens.move_to_end(key)
+                self._stats["token_hits"] += 1
+                return ids
+        ids = array("I", encode(text))
+        with self._lock:
+            self._stats["token_misses"] += 1
+            if key not in self._tokens and len(ids) <= self.max_tokens:
+                self._tokens[key] = ids
+                self._token_total += len(ids)
+                while self._token_total > self.max_tokens:
+                    _, evicted = self._tokens.popitem(last=False)
+                    self._token_total -= len(evicted)
+                    self._stats["evictions"] += 1
+        return ids
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self._stats,
+                texts=len(self._texts),
+                tokenizations=len(self._tokens),
+                tokens=self._token_total,
+                max_tokens=self.max_tokens
+            )
+
+
+def token_usage(model_id: str, input_tokens: Optional[int], output_tokens: Optional[int],
+                truncated_from: Optional[int] = None) -> Dict[str, Any]:
+    """Result fields for a call's token counts and its estimated cost from the registry's prices"""
+    usage = {"input_tokens": input_tokens, "output_tokens": output_tokens}
+    if truncated_from is not None:
+        # The text was cut to the model's input budget; this is its full length in tokens
+        usage["truncated_from"] = truncated_from
+    spec = get_model_registry().find(model_id)
+    cost = spec.estimate_cost(input_tokens, output_tokens) if spec else None
+    if cost is not None:
+        usage["estimated_cost"] = cost
+    return usage
+
+
+_preprocessor = None
+_preprocessor_lock = threading.Lock()
+
+
+def get_preprocessor() -> Preprocessor:
+    """Get the process-wide preprocessor"""
+    global _preprocessor
+    with _preprocessor_lock:
+        if _preprocessor is None:
+            _preprocessor = Preprocessor.from_env()
+        return _preprocessor
+
+
+def prepare(text: str) -> PreparedText:
+    """Shortcut for get_preprocessor().prepare(text)"""
+    return get_preprocessor().prepare(text)
@@ -0,0 +1,294 @@
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# HTTP statuses worth another attempt: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {
+    "APIConnectionError", "Timeout", "RateLimitError", "ServiceUnavailableError", "TryAgain",
+    "ClientConnectionError", "ServerDisconnectedError", "ClientOSError",
+    "DeadlineExceeded", "ServiceUnavailable", "ResourceExhausted", "InternalServerError"
+}
+
+
+class ProviderError(Exception):
+    """An error response from a provider's HTTP API"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the provider while its circuit breaker is open"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} is temporarily unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an error is transient (network, timeout, rate limit, 5xx)"""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "http_status", None) or getattr(error, "status", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Server-requested delay before retrying, if the error carries one"""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(error, "headers", None) or {}
+        value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive transient failures and rejects calls
+    for reset_timeout seconds; then lets one probe through (half-open) and closes
+    again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+        return True
+
+    def retry_in(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def release(self):
+        """End a half-open probe that neither succeeded nor failed transiently"""
+        self._probe_in_flight = False
+
+
+class ProviderClient:
+    """
+    Resilience policy around one provider's calls: an overall deadline, jittered
+    exponential retries on transient errors, optional hedging (a duplicate request
+    once the first has taken longer than the recent p95; the first response wins)
+    and a circuit breaker that fails fast while the provider is unhealthy.
+
+    Calls take a factory rather than a coroutine so every attempt and hedge gets a
+    fresh request. Everything runs on the shared event loop.
+    """
+
+    def __init__(self, provider: str, limit, max_retries: int = 2, retry_base_delay: float = 0.25,
+                 retry_max_delay: float = 4.0, deadline: float = 90, hedge: bool = False,
+                 hedge_min_delay: float = 0.05, hedge_min_samples: int = 20,
+                 failure_threshold: int = 5, reset_timeout: float = 30):
+        self.provider = provider
+        self.limit = limit
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._latencies = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._stats = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "hedges": 0, "hedge_wins": 0, "short_circuited": 0, "deadline_exceeded": 0
+        }
+
+    @classmethod
+    def from_env(cls, provider: str, limit):
+        """Build a client from {PROVIDER}_* environment variables"""
+        prefix = provider.upper()
+        return cls(
+            provider,
+            limit,
+            max_retries=int(os.getenv(f"{prefix}_MAX_RETRIES", "2")),
+            retry_base_delay=float(os.getenv(f"{prefix}_RETRY_BASE_DELAY", "0.25")),
+            retry_max_delay=float(os.getenv(f"{prefix}_RETRY_MAX_DELAY", "4")),
+            deadline=float(os.getenv(f"{prefix}_DEADLINE", "90")),
+            hedge=os.getenv(f"{prefix}_HEDGE", "0") == "1",
+            hedge_min_delay=float(os.getenv(f"{prefix}_HEDGE_MIN_DELAY_MS", "50")) / 1000,
+            failure_threshold=int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv(f"{prefix}_BREAKER_RESET", "30"))
+        )
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(pct / 100 * len(samples)))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging, or None when hedging is off or there's no history yet"""
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self._percentile(95))
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self._count("short_circuited")
+            raise CircuitOpenError(self.provider, self.breaker.retry_in())
+
+    async def call(self, make_coro: Callable[[], Awaitable[Any]], model_id: str = "-") -> Any:
+        """Run a provider request with the deadline, retry, hedging and breaker policy"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        self._count("calls")
+        self._check_breaker()
+
+        attempt = 0
+        while True:
+            remaining = deadline - loop.time()
+            try:
+                result = await self._attempt(make_coro, model_id, remaining)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.release()
+                    self._count("failures")
+                    raise
+                self.breaker.record_failure()
+                delay = retry_after(e)
+                if delay is None:
+                    # Full jitter keeps synchronized clients from retrying in lockstep
+                    delay = random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * 2 ** attempt))
+                remaining = deadline - loop.time()
+                if attempt >= self.max_retries or delay >= remaining:
+                    if delay >= remaining:
+                        self._count("deadline_exceeded")
+                    self._count("failures")
+                    raise
+                attempt += 1
+                self._count("retries")
+                await asyncio.sleep(delay)
+                self._check_breaker()
+                continue
+            self.breaker.record_success()
+            self._count("successes")
+            return result
+
+    async def _timed(self, make_coro, model_id: str, timeout: float):
+        start = time.perf_counter()
+        result = await self.limit.call(make_coro(), model_id, timeout=timeout)
+        with self._lock:
+            self._latencies.append(time.perf_counter() - start)
+        return result
+
+    async def _attempt(self, make_coro, model_id: str, remaining: float):
+        """One attempt, hedged with a duplicate request when the first is slow"""
+        timeout = min(self.limit.timeout_for(model_id), remaining)
+        hedge_delay = self.hedge_delay()
+        if hedge_delay is None or hedge_delay >= timeout:
+            return await self._timed(make_coro, model_id, timeout)
+
+        primary = asyncio.ensure_future(self._timed(make_coro, model_id, timeout))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                self._count("hedges")
+                tasks.add(asyncio.ensure_future(self._timed(make_coro, model_id, timeout - hedge_delay)))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @contextlib.asynccontextmanager
+    async def guard(self):
+        """Breaker bookkeeping for calls that can't be retried or hedged (e.g. streams)"""
+        self._count("calls")
+        self._check_breaker()
+        try:
+            yield
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            self._count("failures")
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        self._count("successes")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Breaker state, retry/hedge counters and recent latency percentiles"""
+        with self._lock:
+            stats = dict(self._stats)
+        p50, p95 = self._percentile(50), self._percentile(95)
+        stats.update({
+            "breaker": {
+                "state": self.breaker.state,
+                "consecutive_failures": self.breaker.consecutive_failures,
+                "trips": self.breaker.trips,
+                "retry_in": round(self.breaker.retry_in(), 1)
+            },
+            "hedging": self.hedge,
+            "hedge_delay": round(self.hedge_delay(), 3) if self.hedge_delay() is not None else None,
+            "latency_p50": round(p50, 3) if p50 is not None else None,
+            "latency_p95": round(p95, 3) if p95 is not None else None
+        })
+        return stats
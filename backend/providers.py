@@ -0,0 +1,138 @@
+import importlib
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List
+
+from model_registry import get_model_registry
+from startup import startup_report
+
+
+def default_warm_families() -> List[str]:
+    """Families to load at startup: PREWARM_PROVIDERS, plus HF when it has prewarming or workers configured"""
+    families = [f.strip() for f in os.getenv("PREWARM_PROVIDERS", "").split(",") if f.strip()]
+    if os.getenv("HF_PREWARM_MODELS", "").strip() or int(os.getenv("HF_WORKERS", "0")) > 0:
+        families.append("huggingface")
+    unknown = set(families) - set(get_model_registry().providers)
+    if unknown:
+        raise ValueError(f"Unknown provider families in PREWARM_PROVIDERS: {', '.join(sorted(unknown))}")
+    return list(dict.fromkeys(families))
+
+
+class ProviderRegistry:
+    """
+    Creates model handlers on first use. Which adapter serves a model comes
+    from the model registry (built-in adapters plus entry-point plugins).
+
+    Importing a handler pulls in its SDK (torch and transformers for
+    HuggingFace), so the server starts without any of them and each family
+    pays its import and init cost when a request first needs it, or up front
+    for the families passed to warm(). Each phase is timed into the startup
+    report.
+    """
+
+    def __init__(self):
+        self.models = get_model_registry()
+        self._handlers = {}
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._warming = set()
+        self._errors = {}
+
+    def _family_lock(self, family: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(family, threading.Lock())
+
+    def get(self, family: str):
+        """Return the handler for a family, importing and constructing it if needed"""
+        handler = self._handlers.get(family)
+        if handler is not None:
+            return handler
+        if family not in self.models.providers:
+            raise ValueError(f"Unknown provider family: {family}")
+
+        with self._family_lock(family):
+            if family in self._handlers:
+                return self._handlers[family]
+            module_name, _, class_name = self.models.providers[family].partition(":")
+            try:
+                with startup_report.phase(f"import:{family}"):
+                    module = importlib.import_module(module_name)
+                with startup_report.phase(f"init:{family}"):
+                    handler = getattr(module, class_name)()
+                    if hasattr(handler, "start_prewarm"):
+                        # Prewarming runs in the background; is_ready() tracks it
+                        handler.start_prewarm()
+            except Exception as e:
+                self._errors[family] = str(e)
+                raise
+            self._errors.pop(family, None)
+            self._handlers[family] = handler
+            return handler
+
+    def peek(self, family: str):
+        """The handler if it has been created, else None (never loads)"""
+        return self._handlers.get(family)
+
+    def handler_for(self, model_id: str):
+        """Get the handler that serves a model id"""
+        return self.get(self.models.get(model_id).provider)
+
+    def peek_for(self, model_id: str):
+        """The handler for a model id if already created, else None"""
+        return self.peek(self.models.get(model_id).provider)
+
+    def warm(self, families: Iterable[str], background: bool = True):
+        """Load families ahead of their first request"""
+        families = [family for family in families if family not in self._handlers]
+        if not families:
+            return
+
+        def load():
+            for family in families:
+                try:
+                    handler = self.get(family)
+                    if hasattr(handler, "discover"):
+                        handler.discover()
+                except Exception as e:
+                    print(f"❌ Failed to warm {family} provider: {str(e)}")
+                finally:
+                    self._warming.discard(family)
+
+        self._warming.update(families)
+        if background:
+            threading.Thread(target=load, name="provider-warm", daemon=True).start()
+        else:
+            load()
+
+    def is_ready(self) -> bool:
+        """Whether every family being warmed has loaded and finished prewarming"""
+        if self._warming:
+            return False
+        return all(handler.is_ready() for handler in self._handlers.values() if hasattr(handler, "is_ready"))
+
+    def wait_ready(self, timeout: float = 600, interval: float = 0.1) -> bool:
+        """Block until is_ready() (e.g. before forking server workers); False on timeout"""
+        deadline = time.monotonic() + timeout
+        while not self.is_ready():
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Load state of each family"""
+        stats = {}
+        for family in self.models.providers:
+            if family in self._handlers:
+                state = "loaded"
+            elif family in self._warming:
+                state = "warming"
+            elif family in self._errors:
+                state = "failed"
+            else:
+                state = "deferred"
+            stats[family] = {"state": state}
+            if family in self._errors:
+                stats[family]["error"] = self._errors[family]
+        return stats
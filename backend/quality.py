@@ -0,0 +1,251 @@
+import concurrent.futures
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from evaluation import f1_score, tokenize
+from instrumentation import record_stage
+
+# Token ids are packed into one int64 per n-gram, 21 bits per token
+ID_BITS = 21
+MAX_ORDER = 3
+NOVEL_ORDERS = (1, 2, 3)
+
+
+def ngram_keys(ids: np.ndarray, n: int) -> np.ndarray:
+    """One int64 key per n-gram of a token id array"""
+    if len(ids) < n:
+        return np.empty(0, dtype=np.int64)
+    keys = ids[:len(ids) - n + 1].copy()
+    for offset in range(1, n):
+        keys = (keys << ID_BITS) | ids[offset:len(ids) - n + 1 + offset]
+    return keys
+
+
+def clipped_overlap(keys: np.ndarray, reference_unique: np.ndarray, reference_counts: np.ndarray) -> int:
+    """Sum over shared n-grams of min(count in keys, count in reference)"""
+    unique, counts = np.unique(keys, return_counts=True)
+    _, index, reference_index = np.intersect1d(unique, reference_unique, assume_unique=True, return_indices=True)
+    return int(np.minimum(counts[index], reference_counts[reference_index]).sum())
+
+
+def lcs_length(candidate: np.ndarray, reference: np.ndarray) -> int:
+    """
+    Longest common subsequence length, one vectorized DP row per candidate token.
+
+    Row j of the LCS table is the running maximum of (previous[j - 1] + 1 where
+    the tokens match, else previous[j]), so each row is a where() plus a
+    maximum.accumulate() over the reference instead of a Python loop.
+    """
+    if not len(candidate) or not len(reference):
+        return 0
+    previous = np.zeros(len(reference) + 1, dtype=np.int32)
+    for token in candidate:
+        row = np.where(reference == token, previous[:-1] + 1, previous[1:])
+        np.maximum.accumulate(row, out=previous[1:])
+    return int(previous[-1])
+
+
+class SourceProfile:
+    """A source text tokenized once: its vocabulary, token ids and n-gram counts"""
+
+    def __init__(self, text: str, embedding: Optional[np.ndarray] = None):
+        tokens = tokenize(text)
+        self.vocabulary = {}
+        self.ids = self.encode(tokens, grow=True)
+        self.ngrams = {}
+        for n in range(1, MAX_ORDER + 1):
+            self.ngrams[n] = np.unique(ngram_keys(self.ids, n), return_counts=True)
+        self.embedding = embedding
+
+    def encode(self, tokens: List[str], grow: bool = False) -> np.ndarray:
+        """Token ids; tokens outside the source vocabulary get ids no source token has"""
+        vocabulary = self.vocabulary
+        if grow:
+            ids = [vocabulary.setdefault(token, len(vocabulary)) for token in tokens]
+        else:
+            unseen = {}
+            ids = [
+                vocabulary[token] if token in vocabulary
+                else unseen.setdefault(token, len(vocabulary) + len(unseen))
+                for token in tokens
+            ]
+        ids = np.fromiter(ids, dtype=np.int64, count=len(tokens))
+        if len(ids) and ids.max() >= 1 << ID_BITS:
+            raise ValueError("Text vocabulary is too large to score")
+        return ids
+
+
+def score_summary(source: SourceProfile, summary: str, summary_embedding: Optional[np.ndarray] = None) -> Dict[str, Any]:
+    """ROUGE-1/2/L against the source, compression ratio, novel n-gram rates and semantic similarity"""
+    ids = source.encode(tokenize(summary))
+    scores = {"summary_tokens": len(ids), "source_tokens": len(source.ids)}
+    for n in (1, 2):
+        keys = ngram_keys(ids, n)
+        reference_unique, reference_counts = source.ngrams[n]
+        overlap = clipped_overlap(keys, reference_unique, reference_counts)
+        scores[f"rouge{n}"] = f1_score(overlap, len(keys), max(len(source.ids) - n + 1, 0))
+    scores["rougeL"] = f1_score(lcs_length(ids, source.ids), len(ids), len(source.ids))
+
+    scores["compression_ratio"] = round(len(source.ids) / len(ids), 2) if len(ids) else None
+    # Share of the summary's n-grams that never appear in the source (abstractiveness)
+    scores["novel_ngrams"] = {}
+    for n in NOVEL_ORDERS:
+        keys = ngram_keys(ids, n)
+        novel = float(np.mean(~np.isin(keys, source.ngrams[n][0]))) if len(keys) else 0.0
+        scores["novel_ngrams"][str(n)] = round(novel, 4)
+
+    scores["semantic_similarity"] = None
+    if source.embedding is not None and summary_embedding is not None:
+        scores["semantic_similarity"] = round(float(np.dot(source.embedding, summary_embedding)), 4)
+    return scores
+
+
+class QualityScorer:
+    """
+    Scores battle summaries against their source on a background thread pool.
+
+    prepare() starts tokenizing (and embedding) the source while the models
+    are still generating; submit() queues the per-summary scoring once the
+    results are in and returns an evaluation id straight away, so responses
+    never wait on it. Evaluations are kept (oldest evicted first) for
+    GET /api/evaluations/<id> and the stream endpoint's follow-up event.
+    """
+
+    def __init__(self, enabled: bool = True, max_workers: int = 2, embedding_model: Optional[str] = None,
+                 max_results: int = 1000):
+        self.enabled = enabled
+        self.embedding_model_name = embedding_model
+        self.max_results = max_results
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="quality")
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self._embedder = None
+        self._embedder_lock = threading.Lock()
+        self._embedder_error = None
+        self._scored = 0
+        self._failed = 0
+        self._seconds = 0.0
+
+    @classmethod
+    def from_env(cls):
+        """Build the scorer from QUALITY_* environment variables"""
+        return cls(
+            enabled=os.getenv("QUALITY_SCORING", "1") == "1",
+            max_workers=int(os.getenv("QUALITY_WORKERS", "2")),
+            embedding_model=os.getenv("QUALITY_EMBEDDING_MODEL", "").strip() or None,
+            max_results=int(os.getenv("QUALITY_MAX_RESULTS", "1000"))
+        )
+
+    def _get_embedder(self):
+        """The sentence-transformers model, loaded on first use; None if disabled or unavailable"""
+        if self.embedding_model_name is None or self._embedder_error:
+            return None
+        with self._embedder_lock:
+            if self._embedder is None and not self._embedder_error:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                    self._embedder = SentenceTransformer(self.embedding_model_name, device="cpu")
+                except Exception as e:
+                    self._embedder_error = str(e)
+                    print(f"⚠️  Semantic similarity disabled ({self.embedding_model_name}): {e}")
+            return self._embedder
+
+    def _embed(self, texts: List[str]) -> Optional[np.ndarray]:
+        embedder = self._get_embedder()
+        if embedder is None:
+            return None
+        return np.asarray(embedder.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+    def _profile(self, text: str) -> SourceProfile:
+        embedding = self._embed([text])
+        return SourceProfile(text, embedding[0] if embedding is not None else None)
+
+    def prepare(self, text: str) -> Optional[concurrent.futures.Future]:
+        """Start profiling the source text in the background; pass the future to submit()"""
+        if not self.enabled:
+            return None
+        return self._executor.submit(self._profile, text)
+
+    def submit(self, text: str, model_ids: List[str], results: List[Dict[str, Any]],
+               source: Optional[concurrent.futures.Future] = None) -> Optional[str]:
+        """Queue scoring of a battle's results; returns the evaluation id (None when disabled)"""
+        if not self.enabled:
+            return None
+        evaluation_id = uuid.uuid4().hex
+        source = source or self.prepare(text)
+        future = self._executor.submit(self._evaluate, evaluation_id, source, model_ids, results)
+        with self._lock:
+            self._results[evaluation_id] = future
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+        return evaluation_id
+
+    def _evaluate(self, evaluation_id, source, model_ids, results) -> Dict[str, Any]:
+        start = time.perf_counter()
+        scores = {}
+        try:
+            profile = source.result()
+            summaries = [result["summary"] if result.get("success") else None for result in results]
+            embeddings = None
+            if profile.embedding is not None and any(summaries):
+                embeddings = self._embed([summary for summary in summaries if summary])
+            position = 0
+            for slot, (model_id, summary) in enumerate(zip(model_ids, summaries), start=1):
+                if summary is None:
+                    scores[f"model{slot}"] = {"model_id": model_id, "error": "No summary to score"}
+                    continue
+                embedding = embeddings[position] if embeddings is not None else None
+                position += 1
+                scores[f"model{slot}"] = dict(score_summary(profile, summary, embedding), model_id=model_id)
+            outcome = "success"
+        except Exception as e:
+            print(f"⚠️  Quality scoring failed: {e}")
+            outcome = "error"
+            scores["error"] = str(e)
+
+        seconds = time.perf_counter() - start
+        record_stage("quality_scoring", seconds, outcome=outcome)
+        with self._lock:
+            self._scored += 1
+            self._failed += outcome == "error"
+            self._seconds += seconds
+        return {
+            "evaluation_id": evaluation_id,
+            "status": "complete" if outcome == "success" else "failed",
+            "scores": scores,
+            "scoring_time": round(seconds, 4)
+        }
+
+    def get(self, evaluation_id: str, timeout: float = 0) -> Optional[Dict[str, Any]]:
+        """An evaluation's scores, waiting up to timeout seconds; None if unknown"""
+        with self._lock:
+            future = self._results.get(evaluation_id)
+        if future is None:
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except concurrent.futures.TimeoutError:
+            return {"evaluation_id": evaluation_id, "status": "pending"}
+
+    def future(self, evaluation_id: str) -> Optional[concurrent.futures.Future]:
+        """The evaluation's future, e.g. to await it with asyncio.wrap_future()"""
+        with self._lock:
+            return self._results.get(evaluation_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "evaluations": self._scored,
+                "failed": self._failed,
+                "stored": len(self._results),
+                "avg_scoring_time": round(self._seconds / self._scored, 4) if self._scored else None,
+                "embedding_model": self.embedding_model_name,
+                "embedding_error": self._embedder_error
+            }
@@ -79,17 +79,36 @@ Central banks face difficult decisions as they balance supporting continued reco
     }
 ]
 
+# Indexes over the (static) samples, built once at import
+SAMPLES_BY_ID = {sample["id"]: sample for sample in SAMPLE_TEXTS}
+SAMPLES_BY_CATEGORY = {}
+for sample in SAMPLE_TEXTS:
+    SAMPLES_BY_CATEGORY.setdefault(sample["category"].lower(), []).append(sample)
+
+# Metadata only, for pickers that fetch a sample's text when it's chosen
+SAMPLE_LISTING = [
+    {
+        "id": sample["id"],
+        "title": sample["title"],
+        "category": sample["category"],
+        "word_count": len(sample["text"].split()),
+        "char_count": len(sample["text"].strip())
+    }
+    for sample in SAMPLE_TEXTS
+]
+
 def get_sample_texts():
     """Return all sample texts"""
     return SAMPLE_TEXTS
 
+def get_sample_listing():
+    """Return every sample's id, title, category and size, without the text"""
+    return SAMPLE_LISTING
+
 def get_sample_by_id(text_id: int):
     """Get a specific sample text by ID"""
-    for text in SAMPLE_TEXTS:
-        if text["id"] == text_id:
-            return text
-    return None
+    return SAMPLES_BY_ID.get(text_id)
 
 def get_samples_by_category(category: str):
     """Get sample texts by category"""
-    return [text for text in SAMPLE_TEXTS if text["category"].lower() == category.lower()] 
\ No newline at end of file
+    return list(SAMPLES_BY_CATEGORY.get(category.lower(), [])) 
\ No newline at end of file
@@ -0,0 +1,112 @@
+import os
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from werkzeug.wsgi import ClosingIterator
+
+
+class ServingState:
+    """
+    In-flight request tracking and shutdown drain for one server process.
+
+    track() wraps the WSGI app so every request counts as in flight until its
+    response body is closed, which for the streaming endpoints is when the
+    last event has been sent. drain() stops the process from reporting ready,
+    waits for those requests to finish and then flushes the work they queued
+    in the background (battle history writes), so a SIGTERM during a battle
+    neither cuts it off nor loses its record.
+    """
+
+    def __init__(self):
+        self.draining = False
+        self.drain_started = None  # time.monotonic() of the SIGTERM (or drain() call)
+        self.in_flight = 0
+        self.served = 0
+        self._idle = threading.Condition()
+        self._on_drain = []
+
+    def _enter(self):
+        with self._idle:
+            self.in_flight += 1
+
+    def _exit(self):
+        with self._idle:
+            self.in_flight -= 1
+            self.served += 1
+            if self.in_flight == 0:
+                self._idle.notify_all()
+
+    def track(self, wsgi_app):
+        """WSGI middleware counting requests until their response is closed"""
+        def app(environ, start_response):
+            self._enter()
+            try:
+                body = wsgi_app(environ, start_response)
+            except BaseException:
+                self._exit()
+                raise
+            return ClosingIterator(body, [self._exit])
+        return app
+
+    def on_drain(self, flush: Callable[..., Any]):
+        """Register background work to flush once in-flight requests are done; called with timeout="""
+        self._on_drain.append(flush)
+
+    def begin_drain(self):
+        """Stop reporting ready; requests already accepted keep running"""
+        if self.drain_started is None:
+            self.drain_started = time.monotonic()
+        self.draining = True
+
+    def wait_idle(self, timeout: float) -> bool:
+        """Wait for in-flight requests to finish; False if some were still running at the timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.in_flight == 0, timeout=timeout)
+
+    def drain(self, timeout: float = 30, flush_reserve: float = 5):
+        """
+        Finish in-flight requests, then flush the background work they queued,
+        all within `timeout` of the drain starting (the SIGTERM, not this call).
+        The last `flush_reserve` seconds are kept for the flush, so it runs
+        even when requests are still in flight.
+        """
+        self.begin_drain()
+        deadline = self.drain_started + timeout
+        if not self.wait_idle(max(0.0, deadline - flush_reserve - time.monotonic())):
+            print(f"⚠️  Shutting down with {self.in_flight} requests still in flight")
+        for flush in self._on_drain:
+            try:
+                flush(timeout=max(0.1, deadline - time.monotonic()))
+            except Exception as e:
+                print(f"⚠️  Failed to flush on shutdown: {e}")
+        print(f"👋 Drained in {time.monotonic() - self.drain_started:.2f}s ({self.served} requests served)")
+
+    def drain_on(self, signum: int = signal.SIGTERM):
+        """
+        Mark the process as draining when the signal arrives, then run the
+        previous handler (e.g. the server's own graceful stop)
+        """
+        previous = signal.getsignal(signum)
+
+        def handler(received, frame):
+            self.begin_drain()
+            if callable(previous):
+                previous(received, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(received, signal.SIG_DFL)
+                os.kill(os.getpid(), received)
+
+        signal.signal(signum, handler)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "draining": self.draining,
+            "in_flight": self.in_flight,
+            "served": self.served
+        }
+
+
+serving_state = ServingState()
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Tuple
+
+
+class _StreamFlight:
+    """One in-flight stream: the chunks produced so far plus its outcome"""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Condition()
+
+
+class StreamSubscription:
+    """Async iterator over a shared stream; replays buffered chunks, then follows live"""
+
+    def __init__(self, group: "SingleFlight", key: str, flight: _StreamFlight, shared: bool):
+        self.group = group
+        self.key = key
+        self.flight = flight
+        self.shared = shared
+
+    async def __aiter__(self):
+        flight = self.flight
+        position = 0
+        try:
+            while True:
+                async with flight.changed:
+                    await flight.changed.wait_for(lambda: position < len(flight.chunks) or flight.done)
+                    pending = flight.chunks[position:]
+                    finished = flight.done
+                for chunk in pending:
+                    yield chunk
+                position += len(pending)
+                if finished and position == len(flight.chunks):
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            self.group._unsubscribe(self.key, flight)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key starts the
+    work and later callers attach to it until it finishes.
+
+    All methods run on the shared event loop. The work runs as its own task, so a
+    caller that goes away (e.g. a closed stream) doesn't cancel it for the others;
+    a stream is only cancelled once every subscriber has left.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls = {}
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "coalesced": 0, "streams": 0, "stream_joins": 0}
+
+    async def do(self, key: str, make_coro: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run make_coro() once per key at a time; returns (result, shared)"""
+        if not self.enabled:
+            return await make_coro(), False
+
+        task = self._calls.get(key)
+        shared = task is not None
+        if not shared:
+            task = asyncio.ensure_future(make_coro())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        self._count("coalesced" if shared else "calls")
+        return await asyncio.shield(task), shared
+
+    def stream(self, key: str, make_stream: Callable[[], AsyncIterator[str]]) -> StreamSubscription:
+        """Subscribe to the stream for a key, starting it if nobody else has"""
+        flight = self._streams.get(key) if self.enabled else None
+        shared = flight is not None
+        if not shared:
+            flight = _StreamFlight()
+            flight.task = asyncio.ensure_future(self._produce(key, flight, make_stream))
+            if self.enabled:
+                self._streams[key] = flight
+        flight.subscribers += 1
+        self._count("stream_joins" if shared else "streams")
+        return StreamSubscription(self, key, flight, shared)
+
+    async def _produce(self, key: str, flight: _StreamFlight, make_stream: Callable[[], AsyncIterator[str]]):
+        try:
+            async for chunk in make_stream():
+                async with flight.changed:
+                    flight.chunks.append(chunk)
+                    flight.changed.notify_all()
+        except BaseException as e:
+            flight.error = e if isinstance(e, Exception) else RuntimeError("Stream was cancelled")
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if self._streams.get(key) is flight:
+                del self._streams[key]
+            async with flight.changed:
+                flight.done = True
+                flight.changed.notify_all()
+
+    def _unsubscribe(self, key: str, flight: _StreamFlight):
+        flight.subscribers -= 1
+        if flight.subscribers <= 0 and not flight.done:
+            # Everyone left; stop generating
+            flight.task.cancel()
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counts of computations started and of calls that joined one in flight"""
+        with self._lock:
+            stats = dict(self._stats)
+        requests = stats["calls"] + stats["coalesced"]
+        stream_requests = stats["streams"] + stats["stream_joins"]
+        stats.update({
+            "enabled": self.enabled,
+            "in_flight": len(self._calls),
+            "streams_in_flight": len(self._streams),
+            "dedup_ratio": round(stats["coalesced"] / requests, 4) if requests else 0.0,
+            "stream_dedup_ratio": round(stats["stream_joins"] / stream_requests, 4) if stream_requests else 0.0
+        })
+        return stats
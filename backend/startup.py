@@ -0,0 +1,59 @@
+import contextlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# The clock starts when app.py first imports this module, before anything heavy
+_started = time.perf_counter()
+
+
+class StartupReport:
+    """Wall time of each import and initialization phase, from process start to serving"""
+
+    def __init__(self):
+        self._phases = []
+        self._ready_at = None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, start)
+
+    def record(self, name: str, seconds: float, start: Optional[float] = None):
+        start = time.perf_counter() - seconds if start is None else start
+        with self._lock:
+            self._phases.append({
+                "phase": name,
+                "seconds": round(seconds, 4),
+                "at": round(start - _started, 4),
+                # Finished after the app was ready: a lazy load or background warm-up
+                "after_ready": self._ready_at is not None
+            })
+
+    def mark_ready(self):
+        """The app can serve requests from here on"""
+        with self._lock:
+            if self._ready_at is None:
+                self._ready_at = time.perf_counter()
+
+    def get_report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = list(self._phases)
+            ready_at = self._ready_at
+        return {
+            "ready_after": round(ready_at - _started, 4) if ready_at is not None else None,
+            "phases": phases
+        }
+
+    def print_summary(self):
+        report = self.get_report()
+        print(f"⏱️  Ready in {report['ready_after']}s")
+        for phase in report["phases"]:
+            print(f"   {phase['phase']:<28}{phase['seconds']:>8.3f}s")
+
+
+startup_report = StartupReport()
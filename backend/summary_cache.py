@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from preprocessing import prepare
+
+
+def text_hash(text: str) -> str:
+    """Stable identifier for a text, independent of whitespace (computed once per distinct text)"""
+    return prepare(text).text_hash
+
+
+def make_cache_key(text: str, model_id: str, params: Dict[str, Any]) -> str:
+    """Hash the normalized text's hash, model ID and generation parameters"""
+    payload = json.dumps(
+        {"text_hash": text_hash(text), "model_id": model_id, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Two-tier cache for summarization results.
+
+    The memory tier is an LRU bounded by a byte budget; the optional disk tier
+    is a SQLite table so entries survive restarts. Both tiers honour the TTL.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 24 * 3600, db_path: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries = OrderedDict()  # key -> (model_id, result, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if db_path:
+            try:
+                self._init_db()
+            except Exception as e:
+                print(f"⚠️  Warning: Failed to open summary cache database {db_path}: {e}")
+                self.db_path = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a cache from SUMMARY_CACHE_* environment variables"""
+        max_mb = float(os.getenv("SUMMARY_CACHE_MAX_MB", "64"))
+        ttl = float(os.getenv("SUMMARY_CACHE_TTL", str(24 * 3600)))
+        db_path = os.getenv("SUMMARY_CACHE_DB") or None
+        return cls(max_bytes=int(max_mb * 1024 * 1024), ttl=ttl, db_path=db_path)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS summary_cache (
+                    key TEXT PRIMARY KEY,
+                    model_id TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_summary_cache_model ON summary_cache (model_id)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result with a cache_tier marker, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                model_id, result, size, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return dict(result, cache_tier="memory")
+                self._remove(key)
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT model_id, result, expires_at FROM summary_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                if row and row[2] > now:
+                    result = json.loads(row[1])
+                    with self._lock:
+                        self._stats["disk_hits"] += 1
+                        self._insert(key, row[0], result, row[2])
+                    return dict(result, cache_tier="disk")
+            except Exception as e:
+                print(f"⚠️  Summary cache read failed: {e}")
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key: str, model_id: str, result: Dict[str, Any]):
+        """Store a successful result in both tiers"""
+        if not result.get("success"):
+            return
+        result = dict(result)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._insert(key, model_id, result, expires_at)
+            self._stats["stores"] += 1
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO summary_cache (key, model_id, result, expires_at) VALUES (?, ?, ?, ?)",
+                        (key, model_id, json.dumps(result), expires_at)
+                    )
+            except Exception as e:
+                print(f"⚠️  Summary cache write failed: {e}")
+
+    def invalidate(self, key: Optional[str] = None, model_id: Optional[str] = None) -> int:
+        """Drop one key, every entry for a model, or everything; returns entries removed"""
+        removed = 0
+        with self._lock:
+            if key:
+                targets = [key] if key in self._entries else []
+            elif model_id:
+                targets = [k for k, entry in self._entries.items() if entry[0] == model_id]
+            else:
+                targets = list(self._entries.keys())
+            for target in targets:
+                self._remove(target)
+            removed += len(targets)
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    if key:
+                        cursor = conn.execute("DELETE FROM summary_cache WHERE key = ?", (key,))
+                    elif model_id:
+                        cursor = conn.execute("DELETE FROM summary_cache WHERE model_id = ?", (model_id,))
+                    else:
+                        cursor = conn.execute("DELETE FROM summary_cache")
+                    removed = max(removed, cursor.rowcount)
+            except Exception as e:
+                print(f"⚠️  Summary cache invalidation failed: {e}")
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update({
+                "memory_entries": len(self._entries),
+                "memory_bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk_enabled": bool(self.db_path)
+            })
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    stats["disk_entries"] = conn.execute("SELECT COUNT(*) FROM summary_cache").fetchone()[0]
+            except Exception as e:
+                stats["disk_error"] = str(e)
+        return stats
+
+    def _insert(self, key, model_id, result, expires_at):
+        # Caller must hold the lock
+        size = len(json.dumps(result).encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (model_id, result, size, expires_at)
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def _remove(self, key):
+        # Caller must hold the lock
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._bytes -= entry[2]
@@ -8,6 +8,8 @@ import {
   getAvailableModels, 
   getSampleTexts, 
   compareSummaries,
+  submitVote,
+  getEvaluation,
   clearModelCache,
   healthCheck 
 } from './services/api';
@@ -78,6 +80,17 @@ function App() {
     try {
       const data = await compareSummaries(inputText, selectedModel1, selectedModel2);
       setResults(data);
+
+      // Quality scores are computed after the response; show them when ready
+      if (data.evaluation_id) {
+        getEvaluation(data.evaluation_id)
+          .then(evaluation => {
+            if (evaluation.status === 'complete') {
+              setResults(prev => (prev === data ? { ...data, evaluation } : prev));
+            }
+          })
+          .catch(err => console.error(err.message));
+      }
     } catch (err) {
       setError(err.message);
     } finally {
@@ -93,6 +106,12 @@ function App() {
         [dimension]: rating
       }
     }));
+
+    // Record the preferred summary for the leaderboard
+    if (model === 'overall' && dimension === 'preference' && results?.battle_id) {
+      submitVote(results.battle_id, rating, { model1: ratings.model1, model2: ratings.model2 })
+        .catch(err => console.error(err.message));
+    }
   };
 
   const handleClearCache = async () => {
@@ -46,6 +46,31 @@ const SummaryComparison = ({
     );
   };
 
+  const QualityScores = ({ scores }) => {
+    if (!scores || scores.error) {
+      return null;
+    }
+    const metrics = [
+      ['ROUGE-1', scores.rouge1.f1],
+      ['ROUGE-2', scores.rouge2.f1],
+      ['ROUGE-L', scores.rougeL.f1],
+      ['Compression', scores.compression_ratio ? `${scores.compression_ratio}x` : '-'],
+      ['Novel bigrams', `${Math.round(scores.novel_ngrams['2'] * 100)}%`]
+    ];
+    if (scores.semantic_similarity !== null) {
+      metrics.push(['Similarity', scores.semantic_similarity]);
+    }
+    return (
+      <div className="flex flex-wrap gap-2 mt-3">
+        {metrics.map(([label, value]) => (
+          <span key={label} className="text-xs px-2 py-1 bg-chat-bg border border-chat-border rounded text-gray-300">
+            {label}: {value}
+          </span>
+        ))}
+      </div>
+    );
+  };
+
   if (loading) {
     return (
       <div className="grid grid-cols-1 lg:grid-cols-2 gap-6 animate-pulse">
@@ -117,6 +142,7 @@ const SummaryComparison = ({
             <p className="text-chat-text leading-relaxed whitespace-pre-wrap">
               {results.model1.summary}
             </p>
+            <QualityScores scores={results.evaluation?.scores?.model1} />
           </div>
 
           {/* Rating Section for Model 1 */}
@@ -188,6 +214,7 @@ const SummaryComparison = ({
             <p className="text-chat-text leading-relaxed whitespace-pre-wrap">
               {results.model2.summary}
             </p>
+            <QualityScores scores={results.evaluation?.scores?.model2} />
           </div>
 
           {/* Rating Section for Model 2 */}
@@ -59,6 +59,9 @@ export const compareSummaries = async (text, model1, model2) => {
     });
     return response.data;
   } catch (error) {
+    if (error.response && error.response.status === 429 && error.response.data) {
+      throw new Error(`${error.response.data.error}. Please try again in ${error.response.data.retry_after}s.`);
+    }
     if (error.response && error.response.data && error.response.data.error) {
       throw new Error(error.response.data.error);
     }
@@ -66,6 +69,29 @@ export const compareSummaries = async (text, model1, model2) => {
   }
 };
 
+// Vote for a battle's winner ("model1", "model2" or "tie")
+export const submitVote = async (battleId, winner, ratings) => {
+  try {
+    const response = await api.post(`/battles/${battleId}/vote`, {
+      winner,
+      ratings
+    });
+    return response.data;
+  } catch (error) {
+    throw new Error('Failed to submit vote: ' + error.message);
+  }
+};
+
+// Get a battle's automatic quality scores, waiting up to `wait` seconds for them
+export const getEvaluation = async (evaluationId, wait = 5) => {
+  try {
+    const response = await api.get(`/evaluations/${evaluationId}`, { params: { wait } });
+    return response.data;
+  } catch (error) {
+    throw new Error('Failed to fetch quality scores: ' + error.message);
+  }
+};
+
 // Clear model cache
 export const clearModelCache = async () => {
   try {
@@ -11,9 +11,15 @@ if [ ! -f "backend/.env" ]; then
 fi
 
 # Start backend in background
-echo "🚀 Starting Flask backend..."
+# SERVER_MODE=production serves through gunicorn (workers, preloaded models, graceful drain)
 cd backend
-python app.py &
+if [ "${SERVER_MODE:-dev}" = "production" ]; then
+    echo "🚀 Starting backend (gunicorn)..."
+    gunicorn -c gunicorn.conf.py app:app &
+else
+    echo "🚀 Starting Flask backend..."
+    python app.py &
+fi
 BACKEND_PID=$!
 cd ..
 